@@ -2,30 +2,36 @@ import streamlit as st
 import osmnx as ox
 import folium
 from streamlit_folium import st_folium
-import networkx as nx
 import os
-from shapely.geometry import Point, LineString, MultiLineString
-import math
+from shapely.geometry import LineString
+import numpy as np
 import json
-import requests
-from folium.plugins import MarkerCluster
-from geopy.distance import geodesic
+from routing import (PROFILES, BanSet, available_profilers, ban_fingerprint, ban_mask, boundary_path,
+                     contains_point, default_route_cache, edges_feature_collection, find_alternative_routes,
+                     find_route_dynamic, find_shortest_path, get_route_instructions, is_point_in_circle,
+                     is_segment_restricted, isochrone_feature_collection, load_boundary, load_cached_graph,
+                     log_to_stderr, node_isochrone, nodes_feature_collection, overlaps, reachable_costs,
+                     route_coordinates, routes_feature_collection, span, start_recording)
 
 st.set_page_config(page_title="Bản đồ chỉ đường Giảng Võ - Ba Đình", layout="wide")
+
+# Đo thời gian từng bước của lần rerun này (bật ở mục "Đo thời gian" cuối sidebar).
+# Lần chạy trước bị st.rerun cắt ngang (vd. ngay sau khi cấm theo vùng tròn) không tới
+# được cuối script: nó được kết thúc ở đây và hiện cùng lần chạy này.
+PROFILE_DIR = os.path.join("graph_cache", "profiles")
+interrupted_run = None
+if st.session_state.get('profiling_recorder') is not None:
+    interrupted_run = st.session_state.profiling_recorder.finish()
+st.session_state.profiling_recorder = None
+if st.session_state.get('profiling_enabled', False):
+    log_to_stderr()  # dòng JSON của mỗi lần chạy ra terminal chạy streamlit
+    profiler = st.session_state.get('profiler_kind')
+    st.session_state.profiling_recorder = start_recording(
+        'rerun', profiler=None if profiler == 'none' else profiler, dump_dir=PROFILE_DIR)
 st.title("Bản đồ chỉ đường Giảng Võ - Ba Đình")
 
 CENTER = [21.0285, 105.8342]
 
-def meters_to_degrees(meters):
-    # 1 độ ~ 111_320 mét (ở xích đạo), dùng gần đúng cho Hà Nội
-    return meters / 111320
-
-def is_point_in_circle(point, circle_center, radius_m):
-    if not circle_center or not radius_m:
-        return False
-    from geopy.distance import geodesic
-    return geodesic(point, circle_center).meters <= radius_m
-
 @st.cache_data
 def load_roads():
     with open('roads.json', 'r', encoding='utf-8') as f:
@@ -33,60 +39,6 @@ def load_roads():
 
 roads = load_roads()
 
-def get_ways_by_name_osm(name, city="Hà Nội"):
-    """Truy vấn Overpass API để lấy các đoạn đường (ways) theo tên ở một thành phố."""
-    overpass_url = "http://overpass-api.de/api/interpreter"
-    query = f"""
-    [out:json][timeout:25];
-    area["name"="{city}"]->.searchArea;
-    (
-      way["name"="{name}"](area.searchArea);
-      way["name"~"^{name}$",i](area.searchArea);
-      way["name"~"{name}",i](area.searchArea);
-    );
-    out geom;
-    """
-    try:
-        response = requests.get(overpass_url, params={'data': query})
-        response.raise_for_status() 
-        data = response.json()
-        if 'elements' in data and data['elements']:
-            return data['elements']
-        else:
-            return []
-    except requests.exceptions.HTTPError as http_err:
-        # Có thể log lỗi này ra terminal nếu muốn, thay vì st.error
-        print(f"Lỗi HTTP khi gọi Overpass API cho '{name}': {http_err}")
-        return []
-    except requests.exceptions.RequestException as req_err:
-        print(f"Lỗi Request khi gọi Overpass API cho '{name}': {req_err}")
-        return []
-    except json.JSONDecodeError as json_err:
-        print(f"Lỗi giải mã JSON từ Overpass API cho '{name}': {json_err}")
-        return []
-
-def ban_all_roads_get_ids(roads_data_json, city="Hà Nội"):
-    banned_ids = set()
-    all_road_names_to_query = set()
-    for district in roads_data_json:
-        for road_name in roads_data_json[district]:
-            if "xe đạp sông tô lịch" not in road_name.lower():
-                 all_road_names_to_query.add(road_name)
-    
-    for road_name in all_road_names_to_query:
-        if road_name in st.session_state.road_name_to_osm_ids_cache:
-            osm_ids_for_road = st.session_state.road_name_to_osm_ids_cache[road_name]
-        else:
-            try:
-                ways = get_ways_by_name_osm(road_name, city)
-                osm_ids_for_road = {way['id'] for way in ways}
-                st.session_state.road_name_to_osm_ids_cache[road_name] = osm_ids_for_road
-            except Exception as e:
-                print(f"Lỗi khi lấy OSM ID cho '{road_name}' trong ban_all_roads_get_ids: {e}")
-                osm_ids_for_road = set()
-        banned_ids.update(osm_ids_for_road)
-    return banned_ids 
-
 if 'restricted_segments' not in st.session_state:
     st.session_state.restricted_segments = []
 if 'restricted_road_names' not in st.session_state:
@@ -151,6 +103,41 @@ if ban_mode_changed and not current_ban_by_circle_mode:
     # Làm mới bản đồ ngay lập tức
     st.rerun()
 
+# Graph được dùng chung (không copy) cho mọi phiên, các lệnh cấm áp dụng theo từng truy vấn.
+# Lần chạy đầu parse GraphML và ghi cache dạng mảng vào graph_cache/, các lần sau
+# chỉ memory-map cache đó (cache tự dựng lại khi file GraphML thay đổi).
+@st.cache_resource
+def load_map_data():
+    if not os.path.exists("giang_vo_ba_dinh.graphml"):
+        st.write("Đang tải dữ liệu bản đồ từ OSM...")
+        G = ox.graph_from_place(
+            ["Giảng Võ, Ba Đình, Hà Nội"],
+            network_type="all"
+        )
+        ox.save_graphml(G, "giang_vo_ba_dinh.graphml")
+    st.write("Đang tải dữ liệu bản đồ từ file...")
+    road_graph = load_cached_graph("giang_vo_ba_dinh.graphml")
+    # Contraction Hierarchies (lưu cạnh cache của graph), KD-tree node và chỉ mục cạnh được dựng
+    # một lần ở đây thay vì ở lần tìm đường/gắn điểm đầu tiên của phiên
+    road_graph.warm()
+    st.write("Đã tải xong dữ liệu bản đồ!")
+    return road_graph
+
+def session_ban_set(road_graph):
+    # Một BanSet mỗi phiên, đồng bộ với các tập cấm trong session_state ở mỗi lần rerun:
+    # chỉ các OSM ID/cạnh vừa thêm hoặc bỏ được tra qua chỉ mục ngược của graph.
+    # Routing, lớp cạnh bị cấm và các bộ lọc cùng đọc mảng cấm của BanSet này.
+    bans = st.session_state.get('ban_set')
+    if bans is None or bans.graph is not road_graph:
+        bans = st.session_state.ban_set = BanSet(road_graph)
+    bans.sync(st.session_state.get('banned_edges_by_circle', set()), st.session_state.clicked_banned_osm_ids)
+    return bans
+
+with span('load_map_data'):
+    road_graph = load_map_data()
+with span('ban_sync'):
+    bans = session_ban_set(road_graph)
+
 # Thêm input nhập bán kính và checkbox bật chế độ cấm theo vùng tròn ở sidebar
 with st.sidebar:
     st.header("Hiển thị node/path")
@@ -163,6 +150,22 @@ with st.sidebar:
         "Hiển thị path", 
         value=st.session_state.show_edges
     )
+    # None: đường ngắn nhất; tên profile: đường nhanh nhất theo thời gian đi của phương tiện
+    st.session_state.route_profile = st.sidebar.selectbox(
+        "Tối ưu theo",
+        [None] + list(PROFILES),
+        index=([None] + list(PROFILES)).index(st.session_state.get('route_profile')),
+        format_func=lambda p: "Quãng đường ngắn nhất" if p is None else f"Thời gian ({PROFILES[p]['label']})"
+    )
+    # Điểm click được gắn vào đoạn đường gần nhất không bị cấm thay vì node gần nhất
+    st.session_state.snap_to_edge = st.sidebar.checkbox(
+        "Gắn điểm vào đoạn đường gần nhất",
+        value=st.session_state.get('snap_to_edge', True)
+    )
+    st.session_state.num_alternatives = st.sidebar.slider(
+        "Số đường thay thế", 0, 4,
+        value=st.session_state.get('num_alternatives', 0)
+    )
     st.header("Quản lý đoạn đường bị cấm")
 
     # st.subheader("Cấm đường bằng Click")
@@ -223,15 +226,7 @@ with st.sidebar:
     # Lọc các tuyến chưa bị cấm
     filtered_suggested_roads = []
     for idx, road in enumerate(st.session_state.suggested_roads):
-        data = road['data']
-        osmid = data.get('osmid')
-        is_banned = False
-        if isinstance(osmid, list):
-            if any(oid in st.session_state.clicked_banned_osm_ids for oid in osmid):
-                is_banned = True
-        elif osmid in st.session_state.clicked_banned_osm_ids:
-            is_banned = True
-        if not is_banned:
+        if not is_segment_restricted(road_graph, road['u'], road['v'], road['key'], bans):
             filtered_suggested_roads.append((idx, road))
     num_suggested = len(filtered_suggested_roads)
     if num_suggested > 0:
@@ -287,28 +282,35 @@ with st.sidebar:
         "Nhập bán kính vùng cấm (mét)", min_value=10, max_value=1000, value=100, step=10, key="circle_ban_radius_input"
     )
 
-# --- KẾT THÚC KHỞI TẠO SESSION STATE ---
-
-@st.cache_data
-def load_map_data():
-    if os.path.exists("giang_vo_ba_dinh.graphml"):
-        st.write("Đang tải dữ liệu bản đồ từ file...")
-        G = ox.load_graphml("giang_vo_ba_dinh.graphml")
+    st.header("Vùng tiếp cận")
+    st.session_state.isochrone_mode = st.checkbox(
+        "Kích hoạt chế độ vùng tiếp cận (click để chọn tâm)",
+        value=st.session_state.get('isochrone_mode', False),
+        key="cb_isochrone_mode"
+    )
+    # Ngưỡng theo mét khi tìm theo quãng đường, theo phút khi tìm theo thời gian
+    if st.session_state.route_profile is None:
+        st.session_state.isochrone_limit = st.slider(
+            "Trong phạm vi (mét)", 100, 3000, value=500, step=100, key="isochrone_limit_m")
     else:
-        st.write("Đang tải dữ liệu bản đồ từ OSM...")
-        G = ox.graph_from_place(
-            ["Giảng Võ, Ba Đình, Hà Nội"],
-            network_type="all"
-        )
-        ox.save_graphml(G, "giang_vo_ba_dinh.graphml")
-    st.write("Đã tải xong dữ liệu bản đồ!")
-    return G
+        st.session_state.isochrone_limit = 60 * st.slider(
+            "Trong thời gian (phút)", 1, 15, value=5, key="isochrone_limit_min")
+
+    st.header("Đo thời gian")
+    st.checkbox("Hiện thời gian từng bước của mỗi lần chạy", key="profiling_enabled")
+    if st.session_state.get('profiling_enabled', False):
+        st.selectbox("Ghi profile cả lần chạy", ('none',) + available_profilers(),
+                     format_func=lambda p: {'none': "Không", 'cprofile': "cProfile (.prof)",
+                                            'pyinstrument': "pyinstrument (.html)"}[p],
+                     key="profiler_kind")
+
+# --- KẾT THÚC KHỞI TẠO SESSION STATE ---
 
-def add_restricted_segment(G, start_point, end_point, description):
-    start_node = ox.nearest_nodes(G, start_point[1], start_point[0])
-    end_node = ox.nearest_nodes(G, end_point[1], end_point[0])
-    line = LineString([(G.nodes[start_node]['x'], G.nodes[start_node]['y']),
-                      (G.nodes[end_node]['x'], G.nodes[end_node]['y'])])
+def add_restricted_segment(road_graph, start_point, end_point, description):
+    start_node = road_graph.nearest_node(*start_point)
+    end_node = road_graph.nearest_node(*end_point)
+    line = LineString([(road_graph.x[start_node], road_graph.y[start_node]),
+                      (road_graph.x[end_node], road_graph.y[end_node])])
     st.session_state.restricted_segments.append({
         'start': start_point,
         'end': end_point,
@@ -316,145 +318,40 @@ def add_restricted_segment(G, start_point, end_point, description):
         'description': description
     })
 
-def is_segment_restricted(G, u, v, k=None):
-    # Kiểm tra thuộc tính cấm trực tiếp trên edge
-    if k is not None and G.has_edge(u, v, k):
-        if G[u][v][k].get('banned_by_circle', False):
-            return True
-    banned_by_click = st.session_state.get('clicked_banned_osm_ids', set())
-    banned_edges_by_circle = st.session_state.get('banned_edges_by_circle', set())
-    if k is not None and (u, v, k) in banned_edges_by_circle:
-        return True
-    edge_data = G.get_edge_data(u, v)
-    if edge_data:
-        actual_edge_data = edge_data[0] if isinstance(edge_data, dict) and 0 in edge_data else edge_data
-        osmid_data = actual_edge_data.get('osmid')
-        if osmid_data:
-            if isinstance(osmid_data, list):
-                for oid in osmid_data:
-                    if oid in banned_by_click:
-                        return True
-            elif osmid_data in banned_by_click:
-                return True
-    return False
-
-def get_route_instructions(G, route):
-    instructions = []
-    total_distance = 0
-    current_street = None
-    current_distance = 0
-    turn_direction = ""
-    for i in range(len(route)-1):
-        u, v = route[i], route[i+1]
-        edge_data = G.get_edge_data(u, v)
-        if edge_data:
-            edge = edge_data[0] if isinstance(edge_data, dict) and 0 in edge_data else edge_data
-            distance = edge.get('length', 0)
-            total_distance += distance
-            street_name = edge.get('name', 'Đường không tên')
-            if isinstance(street_name, list):
-                street_name = street_name[0]
-            if i > 0:
-                prev_u = route[i-1]
-                p1 = (G.nodes[prev_u]['y'], G.nodes[prev_u]['x'])
-                p2 = (G.nodes[u]['y'], G.nodes[u]['x'])
-                p3 = (G.nodes[v]['y'], G.nodes[v]['x'])
-                v1 = (p2[0] - p1[0], p2[1] - p1[1])
-                v2 = (p3[0] - p2[0], p3[1] - p2[1])
-                dot_product = v1[0]*v2[0] + v1[1]*v2[1]
-                v1_mag = (v1[0]**2 + v1[1]**2)**0.5
-                v2_mag = (v2[0]**2 + v2[1]**2)**0.5
-                if v1_mag == 0 or v2_mag == 0:
-                    cos_angle = 1.0
-                else:
-                    cos_angle = dot_product / (v1_mag * v2_mag)
-                cos_angle = max(min(cos_angle, 1.0), -1.0)
-                angle = math.acos(cos_angle)
-                angle_degrees = math.degrees(angle)
-                cross_product = v1[0]*v2[1] - v1[1]*v2[0]
-                turn_direction = ""
-                if angle_degrees > 30:
-                    if cross_product > 0:
-                        turn_direction = "rẽ phải"
-                    else:
-                        turn_direction = "rẽ trái"
-            if current_street is None or street_name != current_street:
-                if current_street is not None:
-                    instructions.append(f"Đi {current_distance:.0f}m trên {current_street}")
-                current_street = street_name
-                current_distance = distance
-                if i > 0 and turn_direction:
-                    instructions[-1] += f", sau đó {turn_direction}"
-            else:
-                current_distance += distance
-    if current_street is not None:
-        instructions.append(f"Đi {current_distance:.0f}m trên {current_street}")
-    return instructions, total_distance
-
-def find_shortest_path(G, start_point, end_point):
-    # Tạo bản sao của graph để không ảnh hưởng tới graph gốc
-    G_copy = G.copy()
-    
-    # Xóa tất cả các edge bị cấm (trong vùng cấm) khỏi graph tạm thời
-    edges_to_remove = []
-    for u, v, k, data in G.edges(data=True, keys=True):
-        if data.get('banned_by_circle', False) or (u, v, k) in st.session_state.get('banned_edges_by_circle', set()):
-            edges_to_remove.append((u, v, k))
-    
-    for u, v, k in edges_to_remove:
-        if G_copy.has_edge(u, v, k):
-            G_copy.remove_edge(u, v, k)
-    
-    # Tìm đường trên graph đã lọc (không có các đoạn bị cấm)
-    start_node = ox.nearest_nodes(G_copy, start_point[1], start_point[0])
-    end_node = ox.nearest_nodes(G_copy, end_point[1], end_point[0])
-    
-    try:
-        route = nx.astar_path(G_copy, start_node, end_node, weight=lambda u, v, d: d.get('length', 1))
-        return route
-    except nx.NetworkXNoPath:
-        return None
-
-def find_nearest_roads(G, point, num_roads=20, max_distance=0.002):
-    """Tìm num_roads tuyến đường gần nhất với điểm cho trước (max_distance ~200m)."""
-    lon, lat = point
-    nearest_edges = []
-    pt = Point(lon, lat)
-    for u, v, k, data in G.edges(data=True, keys=True):
-        if 'geometry' in data:
-            geom = data['geometry']
-            if isinstance(geom, MultiLineString):
-                # Tính khoảng cách nhỏ nhất từ điểm tới từng LineString con
-                distance = min(line.distance(pt) for line in geom.geoms)
-            else:
-                distance = geom.distance(pt)
-            if distance <= max_distance:
-                nearest_edges.append({
-                    'u': u,
-                    'v': v,
-                    'key': k,
-                    'data': data,
-                    'distance': distance
-                })
-    nearest_edges.sort(key=lambda x: x['distance'])
-    return nearest_edges[:num_roads]
-
-def create_map(G, points=None, route=None, suggested_roads=None, show_nodes=False, show_edges=False, circle_ban_center=None, circle_ban_radius=None):
-    m = folium.Map(location=CENTER, zoom_start=14)
+# Các lớp GeoJSON được dựng một lần cho mỗi graph (và mỗi tập OSM ID bị cấm)
+# rồi dùng lại ở các lần rerun sau.
+@st.cache_resource
+def node_layer_data(_road_graph, graph_key):
+    return nodes_feature_collection(_road_graph)
+
+@st.cache_resource
+def edge_layer_data(_road_graph, graph_key):
+    return edges_feature_collection(_road_graph, np.flatnonzero(_road_graph.has_geometry))
+
+@st.cache_resource(max_entries=32)
+def banned_layer_data(_road_graph, graph_key, fingerprint, _edges):
+    return edges_feature_collection(_road_graph, _edges[_road_graph.has_geometry[_edges]])
+
+ALTERNATIVE_COLORS = ['#e67e22', '#16a085', '#8e44ad', '#7f8c8d']
+
+def create_map(road_graph, points=None, route=None, suggested_roads=None, show_nodes=False, show_edges=False, circle_ban_center=None, circle_ban_radius=None, alternatives=None, isochrone=None,
+               bans=(), pending_ban=None):
+    """(bản đồ nền, feature group động).
+
+    Bản đồ nền chỉ chứa các lớp tĩnh (node, cạnh) nên giữ nguyên giữa các lần rerun;
+    các lớp thay đổi theo thao tác (điểm, đường đi, cạnh bị cấm, vùng cấm) nằm trong
+    feature group được st_folium cập nhật mà không vẽ lại bản đồ.
+    bans: BanSet của phiên (lớp cạnh bị cấm, lọc gợi ý), pending_ban: đoạn đang chờ xác nhận cấm.
+    """
+    m = folium.Map(location=CENTER, zoom_start=14, prefer_canvas=True)
+    fg = folium.FeatureGroup(name="Lớp động")
+    graph_key = road_graph.cache_dir
     # Vẽ các tuyến đường gợi ý (nếu có)
     if suggested_roads:
         # Lọc các tuyến chưa bị cấm
         filtered = []
         for idx, road in enumerate(suggested_roads):
-            data = road['data']
-            osmid = data.get('osmid')
-            is_banned = False
-            if isinstance(osmid, list):
-                if any(oid in st.session_state.clicked_banned_osm_ids for oid in osmid):
-                    is_banned = True
-            elif osmid in st.session_state.clicked_banned_osm_ids:
-                is_banned = True
-            if not is_banned:
+            if not is_segment_restricted(road_graph, road['u'], road['v'], road['key'], bans):
                 filtered.append((idx, road))
         suggested_colors = ['blue', 'green', 'orange', 'red', 'brown']
         for order, (idx, road) in enumerate(filtered):
@@ -467,62 +364,63 @@ def create_map(G, points=None, route=None, suggested_roads=None, show_nodes=Fals
                 color=color,
                 opacity=0.8,
                 popup=f"{order+1}. {data.get('name', 'Đường không tên')}"
-            ).add_to(m)
-    # 1. Vẽ các cạnh đã bị cấm chính thức (màu tím)
-    if st.session_state.clicked_banned_osm_ids:
-        for u_b, v_b, data_b in G.edges(data=True):
-            osmid_b = data_b.get('osmid')
-            is_officially_banned = False
-            if osmid_b:
-                if isinstance(osmid_b, list):
-                    if any(oid in st.session_state.clicked_banned_osm_ids for oid in osmid_b):
-                        is_officially_banned = True
-                elif osmid_b in st.session_state.clicked_banned_osm_ids:
-                    is_officially_banned = True
-            if is_officially_banned and 'geometry' in data_b:
-                coords_b = [(coord[1], coord[0]) for coord in data_b['geometry'].coords]
-                folium.PolyLine(coords_b, weight=6, color='purple', opacity=0.8, 
-                                popup=f"Đã cấm (OSM ID(s): {osmid_b})").add_to(m)
+            ).add_to(fg)
+    # 1. Vẽ các cạnh đã bị cấm chính thức (màu tím), một lớp GeoJSON
+    if len(bans):
+        banned_layer = banned_layer_data(road_graph, graph_key, bans.fingerprint(), bans.edges)
+        if banned_layer['features']:
+            folium.GeoJson(
+                banned_layer,
+                style_function=lambda feature: {'color': 'purple', 'weight': 6, 'opacity': 0.8},
+                popup=folium.GeoJsonPopup(fields=['osmid'], aliases=['Đã cấm (OSM ID(s))']),
+            ).add_to(fg)
     # 2. Vẽ đoạn đang chờ xác nhận cấm (màu vàng)
-    if st.session_state.pending_ban_edge_info:
-        pending_info = st.session_state.pending_ban_edge_info
+    if pending_ban:
+        pending_info = pending_ban
         if pending_info.get('geometry'):
-            is_already_banned = False
-            if isinstance(pending_info['osmid'], list):
-                if any(oid in st.session_state.clicked_banned_osm_ids for oid in pending_info['osmid']):
-                    is_already_banned = True
-            elif pending_info['osmid'] in st.session_state.clicked_banned_osm_ids:
-                is_already_banned = True
-            if not is_already_banned:
+            if not is_segment_restricted(road_graph, pending_info['u'], pending_info['v'], pending_info['key'], bans):
                 coords_pending = [(coord[1], coord[0]) for coord in pending_info['geometry'].coords]
                 folium.PolyLine(coords_pending, weight=7, color='yellow', opacity=0.9,
-                                popup=f"Đang chọn để cấm: {pending_info.get('name', '')} (OSM: {pending_info.get('osmid', '')})").add_to(m)
+                                popup=f"Đang chọn để cấm: {pending_info.get('name', '')} (OSM: {pending_info.get('osmid', '')})").add_to(fg)
     if points:
         if len(points) > 0:
-            folium.Marker(points[0], popup='Điểm bắt đầu', icon=folium.Icon(color='green')).add_to(m)
+            folium.Marker(points[0], popup='Điểm bắt đầu', icon=folium.Icon(color='green')).add_to(fg)
         if len(points) > 1:
-            folium.Marker(points[1], popup='Điểm kết thúc', icon=folium.Icon(color='red')).add_to(m)
+            folium.Marker(points[1], popup='Điểm kết thúc', icon=folium.Icon(color='red')).add_to(fg)
+    # Vùng tiếp cận: polygon và các node đi tới được trong một lớp GeoJSON
+    if isochrone is not None:
+        folium.GeoJson(
+            isochrone_feature_collection(road_graph, isochrone),
+            style_function=lambda feature: {'color': '#27ae60', 'weight': 1, 'fillColor': '#2ecc71',
+                                            'fillOpacity': 0.25 if feature['properties']['kind'] == 'area' else 0.9},
+            marker=folium.CircleMarker(radius=2, color='#1e8449', fill=True),
+            tooltip=folium.GeoJsonTooltip(fields=['count'], aliases=['Số node đi tới được']),
+        ).add_to(fg)
+    # Các đường thay thế: một lớp GeoJSON, màu theo thứ tự, vẽ dưới đường chính
+    if alternatives:
+        folium.GeoJson(
+            routes_feature_collection(road_graph, [alt.route for alt in alternatives]),
+            style_function=lambda feature: {
+                'color': ALTERNATIVE_COLORS[(feature['properties']['rank'] - 1) % len(ALTERNATIVE_COLORS)],
+                'weight': 5, 'opacity': 0.7, 'dashArray': '8 6'},
+            tooltip=folium.GeoJsonTooltip(fields=['rank', 'length'], aliases=['Đường thay thế', 'Dài (m)']),
+        ).add_to(fg)
     if route:
-        route_coords = [[G.nodes[n]['y'], G.nodes[n]['x']] for n in route]
-        folium.PolyLine(route_coords, weight=5, color='blue', opacity=0.9).add_to(m)
-    # Thêm marker cho tất cả node nếu show_nodes=True
+        route_coords = route_coordinates(road_graph, route)
+        folium.PolyLine(route_coords, weight=5, color='blue', opacity=0.9).add_to(fg)
+    # Tất cả node: một lớp GeoJSON vẽ bằng CircleMarker trên canvas
     if show_nodes:
-        for node_id, data in G.nodes(data=True):
-            lat = data['y']
-            lon = data['x']
-            folium.Marker(
-                [lat, lon],
-                icon=folium.Icon(color='blue', icon='info-sign'),
-                popup=f"Node {node_id}"
-            ).add_to(m)
-    # Thêm tất cả các tuyến đường nếu show_edges
+        folium.GeoJson(
+            node_layer_data(road_graph, graph_key),
+            marker=folium.CircleMarker(radius=3, color='blue', fill=True, fill_opacity=0.8),
+            popup=folium.GeoJsonPopup(fields=['node'], aliases=['Node']),
+        ).add_to(m)
+    # Tất cả các tuyến đường: một lớp GeoJSON cùng style
     if show_edges:
-        for u, v, data in G.edges(data=True):
-            if 'geometry' in data:
-                geom = data['geometry']
-                if hasattr(geom, 'coords'):
-                    coords = [(y, x) for x, y in geom.coords]
-                    folium.PolyLine(coords, color='blue', weight=3, opacity=0.7).add_to(m)
+        folium.GeoJson(
+            edge_layer_data(road_graph, graph_key),
+            style_function=lambda feature: {'color': 'blue', 'weight': 3, 'opacity': 0.7},
+        ).add_to(m)
     # Vẽ vùng cấm nếu có
     if circle_ban_center and circle_ban_radius:
         folium.Circle(
@@ -534,44 +432,68 @@ def create_map(G, points=None, route=None, suggested_roads=None, show_nodes=Fals
             fill_opacity=0.25,
             opacity=0.5,
             popup='Vùng cấm'
-        ).add_to(m)
+        ).add_to(fg)
         folium.Marker(
             location=[circle_ban_center[0], circle_ban_center[1]],
             icon=folium.Icon(color='red', icon='ban', prefix='fa'),
             popup='Tâm vùng cấm'
-        ).add_to(m)
-    return m
+        ).add_to(fg)
+    return m, fg
+
+def find_session_route(road_graph, start_point, end_point, banned_edges, banned_osmids, profile=None):
+    # Mỗi phiên giữ trạng thái tìm kiếm của đường hiện tại: khi chỉ đổi lệnh cấm thì
+    # dùng lại đường cũ hoặc sửa tăng dần (LPA*) thay vì tìm lại từ đầu, cả khi gắn điểm vào cạnh
+    planner, route = find_route_dynamic(road_graph, st.session_state.get('route_planner'), start_point, end_point,
+                                        banned_edges, banned_osmids, cache=default_route_cache(), profile=profile,
+                                        snap_to_edge=st.session_state.snap_to_edge)
+    st.session_state.route_planner = planner
+    return route
+
+def find_session_alternatives(road_graph, route, start_point, end_point, banned_edges, banned_osmids, count,
+                              profile=None):
+    # Hai cây tìm kiếm (xuôi/ngược) cho mọi đường thay thế; bỏ đường trùng phần lớn với đường đang hiện
+    # (đường chính có thể gắn vào cạnh, đi theo profile khác hoặc do LPA* sửa nên không so từng cạnh được)
+    if not route or count <= 0:
+        return []
+    alternatives = find_alternative_routes(road_graph, start_point, end_point, banned_edges, banned_osmids,
+                                           k=count + 1, profile=profile)
+    return [alt for alt in alternatives if not overlaps(road_graph, route, alt.route)][:count]
+
+def session_isochrone(road_graph, center, limit, banned_edges, banned_osmids, profile=None):
+    # Chi phí một-tới-tất-cả giữ theo (tâm, tập cấm, profile): kéo thanh trượt chỉ lọc lại mảng
+    source = road_graph.nearest_node(*center)
+    banned = ban_mask(road_graph, banned_edges, banned_osmids)
+    key = (road_graph.cache_dir, source, ban_fingerprint(banned_edges, banned_osmids), profile)
+    cached = st.session_state.get('isochrone_costs')
+    if cached is None or cached[0] != key:
+        cached = st.session_state.isochrone_costs = (key, reachable_costs(road_graph, source, banned, profile))
+    return node_isochrone(road_graph, source, limit, banned, profile, costs=cached[1])
 
-G = load_map_data()
 places = ["Giảng Võ, Ba Đình, Hà Nội"]
 
-# Xóa thuộc tính banned_by_circle trên toàn bộ graph nếu cần
-if ban_mode_changed and not current_ban_by_circle_mode:
-    for u, v, k, data in G.edges(data=True, keys=True):
-        if 'banned_by_circle' in data:
-            data['banned_by_circle'] = False
-            
+# Ranh giới phường lưu ở giang_vo_ba_dinh.boundary.geojson (chỉ geocode khi chưa có file),
+# mỗi process chỉ đọc một lần.
+@st.cache_resource
+def load_districts_polygon():
+    return load_boundary(boundary_path("giang_vo_ba_dinh.graphml"), places)
+
 try:
-    gdf_districts = ox.geocode_to_gdf(places)
-    districts_polygon = gdf_districts.iloc[0]['geometry']
+    with span('load_districts_polygon'):
+        districts_polygon = load_districts_polygon()
 except Exception as e:
     st.error(f"Không thể tải polygon cho phường Giảng Võ: {e}")
     districts_polygon = None
 
 route = None
-m = create_map(
-    G, 
-    st.session_state.points, 
-    route, 
-    st.session_state.suggested_roads, 
-    show_nodes=st.session_state.show_nodes,
-    show_edges=st.session_state.show_edges,
-    circle_ban_center=st.session_state.get('last_circle_ban_center'),
-    circle_ban_radius=st.session_state.get('last_circle_ban_radius')
-)
-
+alternatives = []
+profile = st.session_state.route_profile
+route_profile = profile  # profile của đường đang hiển thị (None nếu phải quay về đường ngắn nhất)
 if len(st.session_state.points) == 2:
     start_point_coords, end_point_coords = st.session_state.points
+    # Các đoạn bị cấm được áp dụng theo từng truy vấn, graph dùng chung không bị thay đổi
+    # BanSet thay cho (banned_edges, banned_osmids): cùng mảng cấm với lớp cạnh bị cấm trên bản đồ
+    banned_edges, banned_osmids = bans, None
+    in_ban_start = in_ban_end = False
     # Chỉ kiểm tra vùng cấm nếu đang bật chế độ cấm theo vùng
     if st.session_state.get('ban_by_circle_mode', False):
         circle_center = st.session_state.get('last_circle_ban_center')
@@ -582,26 +504,61 @@ if len(st.session_state.points) == 2:
             route = None
             st.warning("Không có đường đi thỏa mãn (điểm đi hoặc đến nằm trong vùng cấm)")
         else:
-            route = find_shortest_path(G, start_point_coords, end_point_coords)
+            route = find_session_route(road_graph, start_point_coords, end_point_coords, banned_edges, banned_osmids,
+                                       profile)
     else:
-        route = find_shortest_path(G, start_point_coords, end_point_coords)
-    m = create_map(
-        G, 
+        route = find_session_route(road_graph, start_point_coords, end_point_coords, banned_edges, banned_osmids,
+                                   profile)
+    if route is None and profile is not None and not (in_ban_start or in_ban_end):
+        # Phương tiện không tới được (vd. ô tô vào ngõ chỉ có lối đi bộ): tìm đường ngắn nhất theo
+        # quãng đường trên mọi loại đường và báo cho người dùng
+        route = find_shortest_path(road_graph, start_point_coords, end_point_coords, banned_edges, banned_osmids,
+                                   method='ch', cache=default_route_cache(),
+                                   snap_to_edge=st.session_state.snap_to_edge)
+        if route is not None:
+            st.warning(f"Không có đường đi cho {PROFILES[profile]['label'].lower()}; "
+                       "đang hiển thị đường ngắn nhất theo quãng đường (có thể qua lối đi bộ).")
+            route_profile = None
+    with span('find_alternatives'):
+        alternatives = find_session_alternatives(road_graph, route, start_point_coords, end_point_coords,
+                                                 banned_edges, banned_osmids, st.session_state.num_alternatives,
+                                                 route_profile)
+
+isochrone = None
+if st.session_state.isochrone_mode and st.session_state.get('isochrone_center'):
+    with span('isochrone'):
+        isochrone = session_isochrone(road_graph, st.session_state.isochrone_center,
+                                      st.session_state.isochrone_limit, bans, None, profile)
+
+# Bản đồ chỉ dựng một lần mỗi lần rerun, sau khi đã có đường đi
+with span('create_map'):
+    m, dynamic_layers = create_map(
+        road_graph, 
         st.session_state.points, 
         route, 
         st.session_state.suggested_roads, 
         show_nodes=st.session_state.show_nodes,
         show_edges=st.session_state.show_edges,
         circle_ban_center=st.session_state.get('last_circle_ban_center'),
-        circle_ban_radius=st.session_state.get('last_circle_ban_radius')
+        circle_ban_radius=st.session_state.get('last_circle_ban_radius'),
+        alternatives=alternatives,
+        isochrone=isochrone,
+        bans=bans,
+        pending_ban=st.session_state.pending_ban_edge_info
     )
 
-map_data = st_folium(m, width=1200, height=600)
+with span('st_folium'):
+    map_data = st_folium(m, width=1200, height=600, feature_group_to_add=dynamic_layers)
 
-if map_data and map_data['last_clicked']:
+if map_data and map_data['last_clicked'] and st.session_state.isochrone_mode:
+    # Chế độ vùng tiếp cận: click chỉ đổi tâm, không chọn điểm đi/đến hay vùng cấm
+    center = (map_data['last_clicked']['lat'], map_data['last_clicked']['lng'])
+    if st.session_state.get('isochrone_center') != center:
+        st.session_state.isochrone_center = center
+        st.rerun()
+elif map_data and map_data['last_clicked']:
     lat = map_data['last_clicked']['lat']
     lon = map_data['last_clicked']['lng']
-    clicked_point_geom = Point(lon, lat)
 
     # Xử lý khi tắt chế độ cấm theo vùng: xóa điểm chọn và vùng cấm
     if not st.session_state.get('ban_by_circle_mode', False):
@@ -613,31 +570,17 @@ if map_data and map_data['last_clicked']:
         st.session_state.banned_osmids_by_circle = set()
         st.session_state.last_circle_ban_center = None
         st.session_state.last_circle_ban_radius = None
-        # Xóa thuộc tính banned_by_circle trên toàn bộ graph
-        for u, v, k, data in G.edges(data=True, keys=True):
-            if 'banned_by_circle' in data:
-                data['banned_by_circle'] = False
 
     # Nếu bật chế độ cấm theo vùng tròn
     if st.session_state.get('ban_by_circle_mode', False):
         radius = st.session_state.get('circle_ban_radius', 100)
-        radius_deg = meters_to_degrees(radius)
-        circle = clicked_point_geom.buffer(radius_deg)
+        # Vùng cấm tính theo mét trên hệ tọa độ UTM, gồm cả các cạnh thẳng không có geometry
         banned_osmids = set()
         banned_edges_by_circle = set()
-        for u, v, k, data in G.edges(data=True, keys=True):
-            geom = data.get('geometry')
-            if geom and circle.intersects(geom):
-                osmid = data.get('osmid')
-                if isinstance(osmid, list):
-                    banned_osmids.update(osmid)
-                else:
-                    banned_osmids.add(osmid)
-                banned_edges_by_circle.add((u, v, k))
-                # Gán thuộc tính cấm trực tiếp vào edge
-                data['banned_by_circle'] = True
-            else:
-                data['banned_by_circle'] = False
+        with span('circle_ban'):
+            for e in road_graph.spatial_index.edges_in_circle(lat, lon, radius).tolist():
+                banned_osmids.update(road_graph.edge_osmids(e))
+                banned_edges_by_circle.add(road_graph.edge_tuple(e))
         # Xóa các OSM ID đã cấm bởi vùng cấm trước đó
         prev_banned = st.session_state.get('banned_osmids_by_circle', set())
         st.session_state.clicked_banned_osm_ids.difference_update(prev_banned)
@@ -654,7 +597,7 @@ if map_data and map_data['last_clicked']:
         st.rerun()
     else:
         # Khi tắt chế độ cấm theo vùng, chỉ cho phép chọn điểm trong phường Giảng Võ
-        if districts_polygon and districts_polygon.contains(clicked_point_geom):
+        if districts_polygon and contains_point(districts_polygon, lat, lon):
             st.info("✅ Điểm bạn chọn hợp lệ trong phạm vi phường Giảng Võ.")
             if len(st.session_state.points) < 2:
                 st.session_state.points.append((lat, lon))
@@ -667,15 +610,29 @@ if map_data and map_data['last_clicked']:
         else:
             st.error("❌ Điểm bạn chọn nằm ngoài phạm vi phường Giảng Võ! Vui lòng chọn lại.")
 
+if isochrone is not None:
+    unit = (f"{st.session_state.isochrone_limit:.0f} m" if profile is None
+            else f"{st.session_state.isochrone_limit / 60:.0f} phút ({PROFILES[profile]['label']})")
+    st.info(f"Vùng tiếp cận trong {unit}: {len(isochrone.nodes)} node")
+
 if st.session_state.clicked_banned_osm_ids:
     st.info(f"Đang cấm bằng click: {len(st.session_state.clicked_banned_osm_ids)} OSM IDs")
 
 if route:
-    instructions, total_distance = get_route_instructions(G, route)
+    with span('instructions'):
+        instructions, total_distance = get_route_instructions(road_graph, route)
     st.success(f"**Tổng quãng đường: {total_distance/1000:.2f} km**")
+    if route.duration is not None:
+        st.info(f"Thời gian ước tính ({PROFILES[profile]['label']}): {route.duration/60:.1f} phút")
     st.markdown("### Hướng dẫn chi tiết:")
     for i, instruction in enumerate(instructions, 1):
         st.markdown(f"{i}. {instruction}")
+    for rank, alt in enumerate(alternatives, 1):
+        duration = "" if alt.route.duration is None else f", {alt.route.duration/60:.1f} phút"
+        with st.expander(f"Đường thay thế {rank}: {alt.distance/1000:.2f} km{duration} "
+                         f"(+{(alt.distance - total_distance)/1000:.2f} km)"):
+            for i, instruction in enumerate(alt.instructions, 1):
+                st.markdown(f"{i}. {instruction}")
     if st.button("Chọn lại điểm"):
         st.session_state.points = []
         st.session_state.ban_by_click_mode = False
@@ -696,4 +653,26 @@ if 'banned_osmids_by_circle' not in st.session_state:
     st.session_state.banned_osmids_by_circle = set()
 # Thêm biến lưu các edge bị cấm bởi vùng cấm vào session_state
 if 'banned_edges_by_circle' not in st.session_state:
-    st.session_state.banned_edges_by_circle = set()
\ No newline at end of file
+    st.session_state.banned_edges_by_circle = set()
+
+def show_profiling(record, title):
+    # Các bước lồng nhau thụt vào theo độ sâu, kèm bộ đếm của lần chạy và thống kê RouteCache
+    with st.sidebar.expander(title, expanded=True):
+        st.caption(f"Tổng: {record['total_ms']:.1f} ms")
+        st.text("\n".join(f"{'  ' * s['depth']}{s['name']}: {s['ms']:.1f} ms" for s in record['spans']))
+        if record['counters']:
+            st.text("\n".join(f"{name}: {value}" for name, value in sorted(record['counters'].items())))
+        if record['profile']:
+            st.caption(f"Profile: {record['profile']}")
+        if record['profile_error']:
+            st.caption(f"Không ghi profile: {record['profile_error']}")
+
+if st.session_state.get('profiling_recorder') is not None:
+    record = st.session_state.profiling_recorder.finish()
+    st.session_state.profiling_recorder = None
+    show_profiling(record, "Lần chạy này")
+    if interrupted_run is not None:
+        show_profiling(interrupted_run, "Lần chạy trước (bị rerun cắt ngang)")
+    cache_stats = default_route_cache().stats()
+    st.sidebar.caption(f"RouteCache: {cache_stats['entries']} đường, {cache_stats['hits']} hit / "
+                       f"{cache_stats['misses']} miss ({cache_stats['hit_rate']:.0%})")
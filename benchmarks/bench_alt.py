@@ -0,0 +1,75 @@
+"""So sánh A* heuristic haversine với ALT (landmark) trên giang_vo_ba_dinh.graphml, có và không có vùng cấm.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_alt --pairs 500 --seed 42 --landmarks 4 8 16
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+
+from routing.alt import build_landmarks, Landmarks
+from routing.engine import ban_mask
+from routing.search import astar, distance_heuristic
+from routing.store import load_cached_graph
+
+
+def run(graph, pairs, bans, heuristic_for):
+    expanded, times, lengths = [], [], []
+    for (s, t), banned in zip(pairs, bans):
+        stats = {}
+        start = time.perf_counter()
+        path = astar(graph, s, t, banned, heuristic=heuristic_for(t), stats=stats)
+        times.append(time.perf_counter() - start)
+        expanded.append(stats['expanded'])
+        lengths.append(None if path is None else float(graph.lengths[path].sum()))
+    return expanded, times, lengths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--graph', default='giang_vo_ba_dinh.graphml')
+    parser.add_argument('--pairs', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--landmarks', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--ban-radius', type=float, default=150, help='bán kính vùng cấm ngẫu nhiên (mét)')
+    args = parser.parse_args()
+
+    graph = load_cached_graph(args.graph)
+    rng = random.Random(args.seed)
+    pairs = [(rng.randrange(graph.n_nodes), rng.randrange(graph.n_nodes)) for _ in range(args.pairs)]
+    index = graph.spatial_index
+    circle_bans = []
+    for _ in pairs:
+        c = rng.randrange(graph.n_nodes)
+        edges = index.edges_in_circle(graph.y[c], graph.x[c], args.ban_radius).tolist()
+        circle_bans.append(ban_mask(graph, {graph.edge_tuple(e) for e in edges}))
+    print(f"Graph: {graph.n_nodes} node, {graph.n_edges} cạnh; {len(pairs)} cặp OD, seed={args.seed}")
+
+    heuristics = [('astar', lambda t: distance_heuristic(graph, t))]
+    for count in args.landmarks:
+        start = time.perf_counter()
+        landmarks = Landmarks(graph, build_landmarks(graph, count))
+        print(f"ALT {count} landmark: tiền xử lý {time.perf_counter() - start:.2f}s, "
+              f"{(landmarks.from_landmarks.nbytes + landmarks.to_landmarks.nbytes) / 1024:.0f} KB")
+        heuristics.append((f'alt-{count}', landmarks.heuristic))
+
+    print(f"{'method':<14}{'cấm':>6}{'settled TB':>12}{'trung vị':>10}{'ms TB':>10}{'ms p95':>10}")
+    for scenario, bans in (('không', [None] * len(pairs)), (f'{args.ban_radius:.0f}m', circle_bans)):
+        reference = None
+        for name, heuristic_for in heuristics:
+            expanded, times, lengths = run(graph, pairs, bans, heuristic_for)
+            if reference is None:
+                reference = lengths
+            else:
+                for a, b in zip(reference, lengths):
+                    if (a is None) != (b is None) or (a is not None and not math.isclose(a, b)):
+                        raise SystemExit(f"{name}: độ dài đường đi khác A* ({a} != {b})")
+            ms = sorted(t * 1000 for t in times)
+            print(f"{name:<14}{scenario:>6}{statistics.mean(expanded):>12.1f}{statistics.median(expanded):>10.1f}"
+                  f"{statistics.mean(ms):>10.3f}{ms[int(0.95 * (len(ms) - 1))]:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
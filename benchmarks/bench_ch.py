@@ -0,0 +1,94 @@
+"""So sánh truy vấn Contraction Hierarchies với A* và nx.astar_path trên giang_vo_ba_dinh.graphml.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_ch --pairs 500 --seed 42
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+
+import networkx as nx
+import osmnx as ox
+
+from routing.ch import ContractionHierarchy, build_ch
+from routing.engine import ban_mask
+from routing.graph import RoadGraph
+from routing.search import astar, distance_heuristic
+
+
+def summarize(name, times, expanded=None):
+    ms = sorted(t * 1000 for t in times)
+    exp = f"{statistics.mean(expanded):>14.1f}" if expanded else f"{'-':>14}"
+    print(f"{name:<24}{exp}{statistics.mean(ms):>10.3f}{ms[len(ms) // 2]:>10.3f}{ms[int(0.95 * (len(ms) - 1))]:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--graph', default='giang_vo_ba_dinh.graphml')
+    parser.add_argument('--pairs', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--ban-radius', type=float, default=200, help='bán kính vùng cấm ngẫu nhiên (mét)')
+    args = parser.parse_args()
+
+    G = ox.load_graphml(args.graph)
+    graph = RoadGraph.from_networkx(G)
+    start = time.perf_counter()
+    ch = ContractionHierarchy(build_ch(graph))
+    print(f"Graph: {graph.n_nodes} node, {graph.n_edges} cạnh; tiền xử lý CH {time.perf_counter() - start:.2f}s, "
+          f"{ch.n_shortcuts} shortcut")
+
+    rng = random.Random(args.seed)
+    pairs = [(rng.randrange(graph.n_nodes), rng.randrange(graph.n_nodes)) for _ in range(args.pairs)]
+    print(f"{'method':<24}{'expanded TB':>14}{'ms TB':>10}{'ms p50':>10}{'ms p95':>10}")
+
+    results = {}
+    for name in ('ch', 'astar'):
+        times, expanded, lengths = [], [], []
+        for s, t in pairs:
+            stats = {}
+            begin = time.perf_counter()
+            if name == 'ch':
+                path = ch.query(s, t, stats=stats)
+            else:
+                path = astar(graph, s, t, heuristic=distance_heuristic(graph, t), stats=stats)
+            times.append(time.perf_counter() - begin)
+            expanded.append(stats['expanded'])
+            lengths.append(None if path is None else float(graph.lengths[path].sum()))
+        results[name] = lengths
+        summarize(name, times, expanded)
+    for a, b in zip(results['ch'], results['astar']):
+        if (a is None) != (b is None) or (a is not None and not math.isclose(a, b)):
+            raise SystemExit(f"CH cho độ dài khác A* ({a} != {b})")
+
+    # Lời gọi trong app trước đây: nx.astar_path không heuristic, trọng số 'length'
+    times = []
+    for s, t in pairs:
+        begin = time.perf_counter()
+        try:
+            nx.astar_path(G, int(graph.node_ids[s]), int(graph.node_ids[t]), weight='length')
+        except nx.NetworkXNoPath:
+            pass
+        times.append(time.perf_counter() - begin)
+    summarize('nx.astar_path', times)
+
+    # Có vùng cấm: CH chỉ dùng được khi đường của nó không đi qua cạnh bị cấm
+    index = graph.spatial_index
+    times, fallbacks = [], 0
+    for s, t in pairs:
+        i = rng.randrange(graph.n_nodes)
+        banned = ban_mask(graph, {graph.edge_tuple(e) for e in
+                                  index.edges_in_circle(graph.y[i], graph.x[i], args.ban_radius).tolist()})
+        begin = time.perf_counter()
+        path = ch.query(s, t)
+        if path is not None and banned is not None and banned[path].any():
+            fallbacks += 1
+            astar(graph, s, t, banned, heuristic=distance_heuristic(graph, t))
+        times.append(time.perf_counter() - begin)
+    summarize(f'ch + cấm {args.ban_radius:.0f}m', times)
+    print(f"Quay về A* ở {fallbacks}/{len(pairs)} truy vấn có vùng cấm")
+
+
+if __name__ == '__main__':
+    main()
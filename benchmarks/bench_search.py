@@ -0,0 +1,82 @@
+"""So sánh Dijkstra, A* (haversine) và A* hai chiều trên giang_vo_ba_dinh.graphml.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_search --pairs 500 --seed 42
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+
+import networkx as nx
+import osmnx as ox
+
+from routing.graph import RoadGraph
+from routing.search import astar, bidirectional_astar, distance_heuristic
+
+
+def run_method(graph, pairs, method):
+    expanded = []
+    times = []
+    lengths = []
+    for s, t in pairs:
+        stats = {}
+        start = time.perf_counter()
+        if method == 'bidirectional':
+            path = bidirectional_astar(graph, s, t, stats=stats)
+        else:
+            heuristic = distance_heuristic(graph, t) if method == 'astar' else None
+            path = astar(graph, s, t, heuristic=heuristic, stats=stats)
+        times.append(time.perf_counter() - start)
+        expanded.append(stats['expanded'])
+        lengths.append(None if path is None else float(graph.lengths[path].sum()))
+    return expanded, times, lengths
+
+
+def run_networkx(G, pairs):
+    """Lời gọi cũ trong app: nx.astar_path không có heuristic."""
+    times = []
+    for s, t in pairs:
+        start = time.perf_counter()
+        try:
+            nx.astar_path(G, s, t, weight='length')
+        except nx.NetworkXNoPath:
+            pass
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--graph', default='giang_vo_ba_dinh.graphml')
+    parser.add_argument('--pairs', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    G = ox.load_graphml(args.graph)
+    graph = RoadGraph.from_networkx(G)
+    rng = random.Random(args.seed)
+    pairs = [(rng.randrange(graph.n_nodes), rng.randrange(graph.n_nodes)) for _ in range(args.pairs)]
+    print(f"Graph: {args.graph} ({graph.n_nodes} node, {graph.n_edges} cạnh), {len(pairs)} cặp OD, seed={args.seed}")
+
+    reference = None
+    print(f"{'method':<16}{'expanded TB':>14}{'expanded trung vị':>20}{'ms TB':>10}{'ms p95':>10}")
+    for method in ('dijkstra', 'astar', 'bidirectional'):
+        expanded, times, lengths = run_method(graph, pairs, method)
+        if reference is None:
+            reference = lengths
+        else:
+            for a, b in zip(reference, lengths):
+                if (a is None) != (b is None) or (a is not None and not math.isclose(a, b)):
+                    raise SystemExit(f"{method}: độ dài đường đi khác Dijkstra ({a} != {b})")
+        ms = sorted(t * 1000 for t in times)
+        print(f"{method:<16}{statistics.mean(expanded):>14.1f}{statistics.median(expanded):>20.1f}"
+              f"{statistics.mean(ms):>10.3f}{ms[int(0.95 * (len(ms) - 1))]:>10.3f}")
+    node_pairs = [(int(graph.node_ids[s]), int(graph.node_ids[t])) for s, t in pairs]
+    ms = sorted(t * 1000 for t in run_networkx(G, node_pairs))
+    print(f"{'nx.astar_path':<16}{'-':>14}{'-':>20}{statistics.mean(ms):>10.3f}{ms[int(0.95 * (len(ms) - 1))]:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
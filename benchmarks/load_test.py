@@ -0,0 +1,101 @@
+"""Tải thử dịch vụ HTTP của router (routing.server) trên localhost.
+
+Chạy server trước, rồi từ thư mục gốc của repo:
+    python -m routing.server --port 8000 --workers 4
+    python -m benchmarks.load_test --port 8000 --endpoint route --requests 5000 --concurrency 32
+
+In ra số request/giây và độ trễ p50/p99 (ms).
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from routing.store import load_cached_graph
+
+
+def make_requests(graph, endpoint, n, seed, ban_radius):
+    """n request (method, path, body) ngẫu nhiên có seed, tọa độ lấy từ các node của graph."""
+    rng = random.Random(seed)
+
+    def point():
+        i = rng.randrange(graph.n_nodes)
+        return [float(graph.y[i]), float(graph.x[i])]
+
+    requests = []
+    for _ in range(n):
+        if endpoint == 'nearest':
+            lat, lon = point()
+            requests.append(('GET', f'/nearest?lat={lat}&lon={lon}&k=20', None))
+            continue
+        body = {'start': point(), 'end': point()}
+        if endpoint == 'route-ban':
+            lat, lon = point()
+            body['circles'] = [{'lat': lat, 'lon': lon, 'radius': ban_radius}]
+        requests.append(('POST', '/route', json.dumps(body).encode('utf-8')))
+    return requests
+
+
+async def worker(host, port, queue, latencies, errors):
+    """Một kết nối keep-alive, gửi lần lượt các request lấy từ hàng đợi."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while not queue.empty():
+            method, path, body = queue.get_nowait()
+            head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+            if body is not None:
+                head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            begin = time.perf_counter()
+            writer.write(head.encode('latin-1') + b"\r\n" + (body or b''))
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - begin)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(host, port, requests, concurrency):
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+    latencies, errors = [], []
+    begin = time.perf_counter()
+    await asyncio.gather(*(worker(host, port, queue, latencies, errors) for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - begin
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--graph', default='giang_vo_ba_dinh.graphml')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--endpoint', choices=('route', 'route-ban', 'nearest'), default='route')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--ban-radius', type=float, default=200, help='bán kính vùng cấm cho route-ban (mét)')
+    args = parser.parse_args()
+
+    graph = load_cached_graph(args.graph)
+    requests = make_requests(graph, args.endpoint, args.requests, args.seed, args.ban_radius)
+    latencies, errors, elapsed = asyncio.run(run(args.host, args.port, requests, args.concurrency))
+    ms = sorted(t * 1000 for t in latencies)
+    print(f"{args.endpoint}: {len(ms)} request, {args.concurrency} kết nối, {elapsed:.2f}s")
+    print(f"RPS {len(ms) / elapsed:.0f}, p50 {ms[len(ms) // 2]:.2f}ms, p99 {ms[int(0.99 * (len(ms) - 1))]:.2f}ms, "
+          f"lỗi {len(errors)}")
+
+
+if __name__ == '__main__':
+    main()
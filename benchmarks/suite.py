@@ -0,0 +1,287 @@
+"""Bộ benchmark tìm đường với tập truy vấn tái lập được (seed), ghi JSON để so sánh giữa các commit.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.suite --pairs 200 --seed 42
+    python -m benchmarks.suite --graph giang_vo_ba_dinh.graphml --graph grid:80x80 --output new.json \
+        --compare old.json --threshold 1.25
+
+--graph (lặp lại được): đường dẫn GraphML, 'grid:RxC' (lưới đường sinh theo seed) hoặc
+'place:<tên>' (tải từ OSM). Graph sinh ra hoặc tải về được ghi GraphML một lần vào
+graph_cache/bench/ và dùng lại ở các lần chạy sau.
+
+Mỗi graph đo riêng từng giai đoạn (ms mỗi thao tác, mean/p50/p95). Các giai đoạn theo
+từng truy vấn chạy --warmup lượt không đo trước, rồi mỗi truy vấn chạy --repeat lần và lấy
+lần nhanh nhất, để nhiễu (GC, cache CPU, tiến trình khác) không thành hồi quy giả:
+    load_cold      parse GraphML và ghi cache mảng (thư mục cache tạm)
+    load_warm      mở lại cache đó (memory-map)
+    ch_build       dựng Contraction Hierarchies (khi có method 'ch')
+    nearest_node   node gần nhất (KD-tree), từng điểm
+    snap           gắn điểm vào cạnh gần nhất, từng điểm; snap_batch: cả tập một lần, chia theo điểm
+    route_<method>_<cấm>  find_shortest_path(snap_to_edge=True), cấm: none, click (1-10 OSM way ID
+                   ngẫu nhiên) hoặc circle (vùng tròn 100-1000 m như trong app)
+    nearest_roads  danh sách đường gợi ý quanh một điểm
+    render         bản đồ folium (lớp cạnh bị cấm + đường đi) xuất ra HTML, với đường của method
+                   đầu tiên trong --methods và kịch bản cấm cuối cùng trong --bans
+Kèm theo là checksum tổng độ dài đường đi của mỗi kịch bản, để thấy khi thay đổi làm đổi kết quả.
+
+Với --compare, giai đoạn có p50 chậm hơn --threshold lần file cũ (và chậm thêm quá --min-ms)
+được báo là hồi quy và chương trình thoát với mã 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from routing.engine import ban_mask, find_shortest_path, route_coordinates
+from routing.geojson import edges_feature_collection
+from routing.search import METHODS, haversine
+from routing.snap import snap_points
+from routing.spatial import find_nearest_roads
+from routing.store import CACHE_ROOT, load_cached_graph
+
+BENCH_DIR = os.path.join(CACHE_ROOT, 'bench')
+BAN_SCENARIOS = ('none', 'click', 'circle')
+
+
+def summarize(times):
+    ms = np.sort(np.asarray(times, dtype=np.float64) * 1000)
+    return {'n': len(ms), 'mean_ms': float(ms.mean()), 'p50_ms': float(np.percentile(ms, 50)),
+            'p95_ms': float(np.percentile(ms, 95))}
+
+
+def timed(fn, items, repeat=1, warmup=0):
+    """Thời gian (giây) của fn(item) cho từng item: nhanh nhất trong repeat lần, sau warmup lượt không đo."""
+    items = list(items)
+    for _ in range(warmup):
+        for item in items:
+            fn(item)
+    times = []
+    for item in items:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(item)
+            best = min(best, time.perf_counter() - start)
+        times.append(best)
+    return times
+
+
+def grid_graphml(rows, cols, seed, spacing_m=120):
+    """GraphML lưới rows x cols quanh Hà Nội: tọa độ lệch ngẫu nhiên, ~10% phố một chiều."""
+    path = os.path.join(BENCH_DIR, f"grid-{rows}x{cols}-s{seed}.graphml")
+    if os.path.exists(path):
+        return path
+    import networkx as nx
+    import osmnx as ox
+
+    rng = random.Random(seed)
+    lat0, lon0 = 21.0, 105.8
+    dlat = spacing_m / 111_320
+    dlon = dlat / np.cos(np.radians(lat0))
+    G = nx.MultiDiGraph(crs='epsg:4326')
+    for r in range(rows):
+        for c in range(cols):
+            G.add_node(r * cols + c + 1, x=lon0 + (c + rng.uniform(-0.2, 0.2)) * dlon,
+                       y=lat0 + (r + rng.uniform(-0.2, 0.2)) * dlat)
+    highways = ['residential'] * 6 + ['tertiary'] * 3 + ['secondary', 'primary']
+    streets = [(f"Phố {r + 1}", [(r * cols + c + 1, r * cols + c + 2) for c in range(cols - 1)]) for r in range(rows)]
+    streets += [(f"Ngõ {c + 1}", [(r * cols + c + 1, (r + 1) * cols + c + 1) for r in range(rows - 1)])
+                for c in range(cols)]
+    for way, (name, segments) in enumerate(streets, 1):
+        highway = rng.choice(highways)
+        oneway = rng.random() < 0.1
+        for u, v in segments:
+            nu, nv = G.nodes[u], G.nodes[v]
+            length = haversine(nu['y'], nu['x'], nv['y'], nv['x'])
+            attrs = {'osmid': way, 'name': name, 'highway': highway, 'oneway': oneway, 'length': length}
+            G.add_edge(u, v, **attrs)
+            if not oneway:
+                G.add_edge(v, u, **attrs)
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    ox.save_graphml(G, path)
+    return path
+
+
+def place_graphml(place):
+    """GraphML của một địa danh, tải từ OSM ở lần đầu."""
+    path = os.path.join(BENCH_DIR, re.sub(r'\W+', '_', place).strip('_').lower() + '.graphml')
+    if not os.path.exists(path):
+        import osmnx as ox
+
+        os.makedirs(BENCH_DIR, exist_ok=True)
+        ox.save_graphml(ox.graph_from_place(place, network_type='all'), path)
+    return path
+
+
+def resolve_graph(spec, seed):
+    match = re.fullmatch(r'grid:(\d+)x(\d+)', spec)
+    if match:
+        return grid_graphml(int(match.group(1)), int(match.group(2)), seed)
+    if spec.startswith('place:'):
+        return place_graphml(spec[len('place:'):])
+    return spec
+
+
+def make_queries(graph, pairs, seed):
+    """Các cặp điểm (lat, lon) lệch khỏi node tối đa ~50 m, và một lệnh cấm mỗi kịch bản cho từng cặp."""
+    rng = np.random.default_rng(seed)
+    nodes = rng.integers(0, graph.n_nodes, size=(pairs, 2))
+    jitter = rng.uniform(-0.00045, 0.00045, size=(pairs, 2, 2))
+    points = np.stack((graph.y[nodes], graph.x[nodes]), axis=-1) + jitter
+    bans = {'none': [(None, None)] * pairs, 'click': [], 'circle': []}
+    index = graph.spatial_index
+    for _ in range(pairs):
+        ids = rng.choice(graph.osmids, size=int(rng.integers(1, 11)))
+        bans['click'].append((None, set(ids.tolist())))
+        center = int(rng.integers(graph.n_nodes))
+        edges = index.edges_in_circle(graph.y[center], graph.x[center], rng.uniform(100, 1000)).tolist()
+        bans['circle'].append(({graph.edge_tuple(e) for e in edges},
+                               {oid for e in edges for oid in graph.edge_osmids(e)}))
+    return [tuple(map(tuple, pair)) for pair in points.tolist()], bans
+
+
+def render_map(graph, route, banned):
+    import folium
+
+    m = folium.Map(location=[float(np.mean(graph.y)), float(np.mean(graph.x))], zoom_start=14, prefer_canvas=True)
+    if banned is not None:
+        edges = np.flatnonzero(banned & graph.has_geometry)
+        if len(edges):
+            folium.GeoJson(edges_feature_collection(graph, edges)).add_to(m)
+    if route is not None:
+        folium.PolyLine(route_coordinates(graph, route), weight=5).add_to(m)
+    return m.get_root().render()
+
+
+def bench_graph(path, args):
+    stages, checksums = {}, {}
+    with tempfile.TemporaryDirectory(prefix='bench-cache-') as cache_root:
+        start = time.perf_counter()
+        graph = load_cached_graph(path, cache_root)
+        stages['load_cold'] = summarize([time.perf_counter() - start])
+        stages['load_warm'] = summarize(timed(lambda _: load_cached_graph(path, cache_root), range(5)))
+        info = {'nodes': graph.n_nodes, 'edges': graph.n_edges}
+        if 'ch' in args.methods:
+            start = time.perf_counter()
+            graph.hierarchy()
+            stages['ch_build'] = summarize([time.perf_counter() - start])
+        points, bans = make_queries(graph, args.pairs, args.seed)
+        flat = [p for pair in points for p in pair]
+        graph.warm(hierarchy=False)  # dựng chỉ mục trước khi đo
+        repeat, warmup = args.repeat, args.warmup
+        stages['nearest_node'] = summarize(timed(lambda p: graph.nearest_node(*p), flat, repeat, warmup))
+        stages['snap'] = summarize(timed(lambda p: snap_points(graph, [p]), flat, repeat, warmup))
+        batch = timed(lambda _: snap_points(graph, flat), range(3), repeat, warmup)
+        stages['snap_batch'] = summarize([t / len(flat) for t in batch])
+        routes = {}  # (method, kịch bản cấm) -> Route theo từng cặp
+        for method in args.methods:
+            for scenario in args.bans:
+                queries = list(enumerate(zip(points, bans[scenario])))
+                results = routes[method, scenario] = [None] * len(queries)
+
+                def route(query):
+                    i, ((start_point, end_point), (banned_edges, banned_osmids)) = query
+                    results[i] = find_shortest_path(graph, start_point, end_point, banned_edges, banned_osmids,
+                                                    method=method, profile=args.profile, snap_to_edge=True)
+                stages[f'route_{method}_{scenario}'] = summarize(timed(route, queries, repeat, warmup))
+                found = [r.length for r in results if r is not None]
+                checksums[f'route_{method}_{scenario}'] = {'found': len(found), 'length': round(sum(found), 3)}
+        stages['nearest_roads'] = summarize(timed(lambda p: find_nearest_roads(graph, (p[1], p[0])), flat,
+                                                  repeat, warmup))
+        samples = range(min(args.render_samples, args.pairs))
+        # Cố định method và kịch bản để giai đoạn render so được giữa các lần chạy
+        shown = routes[args.methods[0], args.bans[-1]]
+        masks = [ban_mask(graph, *bans[args.bans[-1]][i]) for i in samples]
+        stages['render'] = summarize(timed(lambda i: render_map(graph, shown[i], masks[i]), samples, repeat))
+    return {'graph': info, 'stages': stages, 'checksums': checksums}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new, threshold, min_ms):
+    """In bảng so sánh p50 và trả về danh sách (graph, giai đoạn) bị hồi quy."""
+    regressions = []
+    print(f"{'graph / giai đoạn':<48}{'cũ p50':>10}{'mới p50':>10}{'tỉ lệ':>8}")
+    for name, result in new['graphs'].items():
+        previous = old.get('graphs', {}).get(name)
+        if previous is None:
+            continue
+        for stage, summary in result['stages'].items():
+            before = previous['stages'].get(stage)
+            if before is None:
+                continue
+            ratio = summary['p50_ms'] / before['p50_ms'] if before['p50_ms'] > 0 else float('inf')
+            slower = ratio > threshold and summary['p50_ms'] - before['p50_ms'] > min_ms
+            if slower:
+                regressions.append((name, stage))
+            print(f"{name + ' / ' + stage:<48}{before['p50_ms']:>10.3f}{summary['p50_ms']:>10.3f}{ratio:>8.2f}"
+                  f"{'  HỒI QUY' if slower else ''}")
+        for key, checksum in result['checksums'].items():
+            if key in previous['checksums'] and previous['checksums'][key] != checksum:
+                print(f"Chú ý: kết quả {name} / {key} khác lần trước ({previous['checksums'][key]} -> {checksum})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--graph', action='append', help="GraphML, 'grid:RxC' hoặc 'place:<tên>' (lặp lại được)")
+    parser.add_argument('--pairs', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--methods', nargs='+', choices=METHODS, default=['ch', 'astar'])
+    parser.add_argument('--bans', nargs='+', choices=BAN_SCENARIOS, default=list(BAN_SCENARIOS))
+    parser.add_argument('--profile', default=None, help="None (độ dài) hoặc 'car', 'motorbike', 'bicycle'")
+    parser.add_argument('--render-samples', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3, help='số lần chạy mỗi truy vấn, lấy lần nhanh nhất')
+    parser.add_argument('--warmup', type=int, default=1, help='số lượt chạy cả tập truy vấn trước khi đo')
+    parser.add_argument('--output', help='file JSON kết quả (mặc định graph_cache/bench/results-<commit>.json)')
+    parser.add_argument('--compare', help='file JSON của lần chạy trước để so sánh')
+    parser.add_argument('--threshold', type=float, default=1.25, help='tỉ lệ p50 mới/cũ coi là hồi quy')
+    parser.add_argument('--min-ms', type=float, default=0.1, help='bỏ qua chênh lệch p50 nhỏ hơn (ms)')
+    args = parser.parse_args()
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'args': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'graphs': {},
+    }
+    for spec in args.graph or ['giang_vo_ba_dinh.graphml']:
+        result = report['graphs'][spec] = bench_graph(resolve_graph(spec, args.seed), args)
+        print(f"{spec}: {result['graph']['nodes']} node, {result['graph']['edges']} cạnh")
+        for stage, summary in result['stages'].items():
+            print(f"  {stage:<28}{summary['mean_ms']:>10.3f}{summary['p50_ms']:>10.3f}{summary['p95_ms']:>10.3f}")
+
+    output = args.output or os.path.join(BENCH_DIR, f"results-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Đã ghi {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            old = json.load(f)
+        regressions = compare(old, report, args.threshold, args.min_ms)
+        if regressions:
+            print(f"{len(regressions)} giai đoạn chậm hơn {args.threshold} lần so với {args.compare}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
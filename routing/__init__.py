@@ -0,0 +1,75 @@
+"""Lõi tìm đường dùng chung cho app Streamlit và các script khác (không phụ thuộc Streamlit).
+
+Các tên bên dưới được import lười khi dùng lần đầu, nên `import routing` không kéo
+theo shapely, pyproj, scipy, requests hay osmnx (osmnx chỉ cần khi dựng lại cache).
+"""
+import importlib
+
+_EXPORTS = {
+    'boundary_path': 'routing.boundary',
+    'contains_point': 'routing.boundary',
+    'load_boundary': 'routing.boundary',
+    'Landmarks': 'routing.alt',
+    'Alternative': 'routing.alternatives',
+    'alternative_routes': 'routing.alternatives',
+    'find_alternative_routes': 'routing.alternatives',
+    'overlaps': 'routing.alternatives',
+    'BanSet': 'routing.bans',
+    'RouteCache': 'routing.cache',
+    'ban_fingerprint': 'routing.cache',
+    'default_route_cache': 'routing.cache',
+    'ContractionHierarchy': 'routing.ch',
+    'DynamicRoute': 'routing.dynamic',
+    'SnappedDynamicRoute': 'routing.dynamic',
+    'find_route_dynamic': 'routing.dynamic',
+    'Route': 'routing.engine',
+    'ban_mask': 'routing.engine',
+    'find_shortest_path': 'routing.engine',
+    'is_edge_banned': 'routing.engine',
+    'is_point_in_circle': 'routing.engine',
+    'is_segment_restricted': 'routing.engine',
+    'route_coordinates': 'routing.engine',
+    'edges_feature_collection': 'routing.geojson',
+    'isochrone_feature_collection': 'routing.geojson',
+    'nodes_feature_collection': 'routing.geojson',
+    'routes_feature_collection': 'routing.geojson',
+    'RoadGraph': 'routing.graph',
+    'get_route_instructions': 'routing.instructions',
+    'Isochrone': 'routing.isochrone',
+    'node_isochrone': 'routing.isochrone',
+    'point_isochrone': 'routing.isochrone',
+    'reachable_costs': 'routing.isochrone',
+    'distance_matrix': 'routing.matrix',
+    'ban_all_roads_get_ids': 'routing.overpass',
+    'get_ways_by_name_osm': 'routing.overpass',
+    'PROFILES': 'routing.profiles',
+    'travel_times': 'routing.profiles',
+    'Recorder': 'routing.profiling',
+    'available_profilers': 'routing.profiling',
+    'count': 'routing.profiling',
+    'log_to_stderr': 'routing.profiling',
+    'span': 'routing.profiling',
+    'start_recording': 'routing.profiling',
+    'Snap': 'routing.snap',
+    'snap_points': 'routing.snap',
+    'snap_route': 'routing.snap',
+    'EdgeIndex': 'routing.spatial',
+    'find_nearest_roads': 'routing.spatial',
+    'load_cached_graph': 'routing.store',
+    'TiledGraph': 'routing.tiles',
+    'build_tiles': 'routing.tiles',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'routing' has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,123 @@
+"""ALT (A*, Landmarks, bất đẳng thức Tam giác): heuristic từ khoảng cách tới các landmark.
+
+Với landmark L, bất đẳng thức tam giác cho hai cận dưới của d(v, t):
+    d(L, t) - d(L, v)    và    d(v, L) - d(t, L)
+Heuristic là cận lớn nhất trên mọi landmark (và cả khoảng cách haversine), nên
+vẫn admissible và nhất quán. Khoảng cách tới landmark tính trên graph không cấm;
+lệnh cấm chỉ làm đường dài ra nên các cận dưới vẫn đúng khi có cấm.
+
+Landmark được chọn theo kiểu "xa nhất": mỗi landmark mới là node xa nhất so với
+các landmark đã chọn. Mảng khoảng cách được lưu cạnh cache của graph (thư mục
+con 'alt-<số landmark>/', hoặc 'alt-<số landmark>-<profile>-<băm>/' với trọng số thời gian).
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+from routing.matrix import adjacency_matrix
+from routing.search import EARTH_RADIUS_M
+
+DEFAULT_LANDMARKS = 8
+BOUNDS_CACHE_SIZE = 4  # số đích gần nhất giữ mảng cận dưới (vd. tìm lại đường tới cùng đích khi đổi lệnh cấm)
+
+ALT_ARRAYS = ('landmarks', 'from_landmarks', 'to_landmarks')
+
+
+def build_landmarks(graph, count=DEFAULT_LANDMARKS, weights=None):
+    """Chọn count landmark và tính khoảng cách (theo weights, mặc định độ dài) từ/tới chúng,
+    trả về dict mảng (xem ALT_ARRAYS)."""
+    count = min(count, graph.n_nodes)
+    matrix, _ = adjacency_matrix(graph, weights=weights)
+    reverse = matrix.T.tocsr()
+    landmarks, from_rows, to_rows = [], [], []
+    # Bắt đầu từ node xa nhất so với node 0 (bỏ qua node không tới được)
+    coverage = np.zeros(graph.n_nodes)
+    seed = dijkstra(matrix, indices=0) + dijkstra(reverse, indices=0)
+    candidate = int(np.argmax(np.where(np.isfinite(seed), seed, -1)))
+    for _ in range(count):
+        landmarks.append(candidate)
+        from_rows.append(dijkstra(matrix, indices=candidate))
+        to_rows.append(dijkstra(reverse, indices=candidate))
+        d = from_rows[-1] + to_rows[-1]
+        d = np.where(np.isfinite(d), d, 0)
+        coverage = d if len(landmarks) == 1 else np.minimum(coverage, d)
+        coverage[landmarks] = -1
+        candidate = int(np.argmax(coverage))
+    return {
+        'landmarks': np.array(landmarks, dtype=np.int32),
+        'from_landmarks': np.vstack(from_rows),
+        'to_landmarks': np.vstack(to_rows),
+    }
+
+
+class Landmarks:
+    """Khoảng cách từ/tới landmark; heuristic(target) trả về hàm h(node) cho astar.
+
+    scale đổi haversine sang đơn vị của trọng số (graph.heuristic_scale).
+    """
+
+    def __init__(self, graph, arrays, scale=1.0):
+        self.graph = graph
+        self.scale = scale
+        for name in ALT_ARRAYS:
+            setattr(self, name, arrays[name])
+        lat = np.radians(np.asarray(graph.y))
+        self._lat = lat
+        self._lon = np.radians(np.asarray(graph.x))
+        self._bounds = OrderedDict()  # đích -> list cận dưới, LRU
+        self._lock = threading.Lock()
+
+    @property
+    def count(self):
+        return len(self.landmarks)
+
+    def lower_bounds(self, target):
+        """Mảng cận dưới của d(v, target) cho mọi node v (mét).
+
+        Cộng dồn từng landmark vào một mảng n phần tử thay vì dựng mảng count x n.
+        """
+        d_lat = self._lat - self._lat[target]
+        d_lon = self._lon - self._lon[target]
+        a = np.sin(d_lat / 2) ** 2 + np.cos(self._lat) * np.cos(self._lat[target]) * np.sin(d_lon / 2) ** 2
+        bound = 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(1.0, np.sqrt(a))) * self.scale
+        from_landmarks, to_landmarks = np.asarray(self.from_landmarks), np.asarray(self.to_landmarks)
+        with np.errstate(invalid='ignore'):
+            for k in range(self.count):
+                # fmax bỏ qua nan (inf - inf: node không liên quan tới landmark, không cho thông tin gì)
+                np.fmax(bound, from_landmarks[k, target] - from_landmarks[k], out=bound)
+                np.fmax(bound, to_landmarks[k] - to_landmarks[k, target], out=bound)
+        return bound
+
+    def heuristic(self, target):
+        with self._lock:
+            bounds = self._bounds.get(target)
+            if bounds is not None:
+                self._bounds.move_to_end(target)
+                return bounds.__getitem__
+        bounds = self.lower_bounds(target).tolist()
+        with self._lock:
+            self._bounds[target] = bounds
+            while len(self._bounds) > BOUNDS_CACHE_SIZE:
+                self._bounds.popitem(last=False)
+        return bounds.__getitem__
+
+
+def load_or_build_landmarks(graph, count=DEFAULT_LANDMARKS, profile=None):
+    """Landmarks theo graph.weights(profile), đọc từ <graph.cache_dir>/alt-<count>[-<profile>-<băm>] nếu đã có,
+    nếu không thì dựng và lưu."""
+    from routing.profiles import cache_suffix
+    from routing.store import load_arrays, save_arrays
+
+    name = f'alt-{count}' + cache_suffix(graph, profile)
+    directory = os.path.join(graph.cache_dir, name) if graph.cache_dir else None
+    scale = graph.heuristic_scale(profile)
+    if directory and os.path.exists(os.path.join(directory, 'meta.json')):
+        arrays, _ = load_arrays(directory, ALT_ARRAYS)
+        return Landmarks(graph, arrays, scale)
+    arrays = build_landmarks(graph, count, graph.weights(profile))
+    if directory:
+        save_arrays(directory, arrays, {'landmarks': count, 'profile': profile})
+    return Landmarks(graph, arrays, scale)
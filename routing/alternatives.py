@@ -0,0 +1,126 @@
+"""Nhiều đường đi thay thế giữa hai điểm bằng phương pháp plateau (via-node).
+
+Chỉ cần hai lần Dijkstra một-tới-tất-cả (scipy.sparse.csgraph): cây đường ngắn
+nhất xuôi từ node đầu và cây ngược tới node cuối. Mỗi node v cho một đường qua v
+dài df(v) + db(v) ghép từ hai cây, không phải tìm lại. Các cạnh nằm trên cả hai
+cây nối thành "plateau"; mọi node trên cùng một plateau cho cùng một đường nên
+mỗi plateau chỉ xét một lần, và đường qua plateau tối ưu cục bộ trên cả đoạn đó.
+
+Ứng viên được xét theo độ dài tăng dần, nhận nếu:
+- không dài hơn max_stretch lần đường ngắn nhất,
+- là đường đơn (đoạn xuôi và đoạn ngược không gặp nhau ngoài v),
+- phần trùng (theo độ dài) với mỗi đường đã chọn không quá max_overlap.
+Lệnh cấm giống find_shortest_path (ban_mask). Với profile, cây tìm kiếm và giới hạn
+max_stretch tính theo thời gian đi; phần trùng vẫn tính theo độ dài.
+"""
+from collections import namedtuple
+
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+from routing.engine import ban_mask, route_from_edges
+from routing.instructions import get_route_instructions
+from routing.matrix import _path_edges, adjacency_matrix
+
+# route: Route, instructions: danh sách câu hướng dẫn, distance: mét (như get_route_instructions)
+Alternative = namedtuple('Alternative', ['route', 'instructions', 'distance'])
+
+
+def _edge_to(matrix, edge_of, u, v):
+    """Chỉ số cạnh u -> v được giữ trong ma trận kề."""
+    start, end = matrix.indptr[u], matrix.indptr[u + 1]
+    return int(edge_of[start + np.searchsorted(matrix.indices[start:end], v)])
+
+
+def overlaps(graph, route, other, max_overlap=0.6):
+    """True nếu phần cạnh chung của hai Route dài hơn max_overlap lần đường ngắn hơn (như alternative_routes).
+
+    Độ dài tính theo cả cạnh nên dùng được cho Route gắn điểm vào giữa cạnh.
+    """
+    lengths = graph.lengths
+    shared = list(set(route.edges) & set(other.edges))
+    shorter = min(float(lengths[list(route.edges)].sum()), float(lengths[list(other.edges)].sum()))
+    return float(lengths[shared].sum()) > max_overlap * shorter
+
+
+def _mark_plateau(pf, pb, on_plateau, visited, v, end_node):
+    """Đánh dấu visited cả plateau chứa v: đi lùi theo cây xuôi, đi tới theo cây ngược.
+
+    Cạnh u -> pb[u] chỉ thuộc plateau nếu cũng là cạnh của cây xuôi, tức pf[pb[u]] == u.
+    """
+    u = v
+    while on_plateau[u] and not visited[u]:
+        visited[u] = True
+        u = pf[u]
+    visited[u] = True
+    u = v
+    while u != end_node and pb[u] >= 0 and pf[pb[u]] == u and not visited[pb[u]]:
+        u = pb[u]
+        visited[u] = True
+
+
+def alternative_routes(graph, start_node, end_node, banned=None, k=3, max_overlap=0.6, max_stretch=1.4,
+                       stats=None, profile=None):
+    """Tối đa k Route (chỉ số node, mảng cấm có sẵn), phần tử đầu là đường ngắn nhất.
+
+    max_overlap: tỉ lệ độ dài tối đa một đường mới được trùng với mỗi đường đã chọn.
+    max_stretch: đường mới dài (hoặc lâu, nếu có profile) tối đa max_stretch lần đường tốt nhất.
+    stats (dict, tùy chọn): 'expanded' là số node hai cây đã chạm tới, 'candidates'
+    là số plateau đã xét.
+    """
+    matrix, edge_of = adjacency_matrix(graph, banned, graph.weights(profile))
+    df, pf = dijkstra(matrix, indices=start_node, return_predecessors=True)
+    db, pb = dijkstra(matrix.T.tocsr(), indices=end_node, return_predecessors=True)
+    if stats is not None:
+        stats['expanded'] = int(np.isfinite(df).sum() + np.isfinite(db).sum())
+        stats['candidates'] = 0
+    best = df[end_node]
+    if not np.isfinite(best):
+        return []
+    lengths = graph.lengths
+    routes = []
+    chosen = []  # (tập cạnh, độ dài) của các đường đã nhận
+    via = df + db
+    # Node v thuộc plateau cùng node trước nó nếu cạnh pf[v] -> v nằm trên cả hai cây
+    nodes = np.arange(graph.n_nodes)
+    on_plateau = (pf >= 0) & (pb[np.maximum(pf, 0)] == nodes)
+    visited = np.zeros(graph.n_nodes, dtype=np.bool_)
+    for v in np.argsort(via, kind='stable').tolist():
+        if len(routes) >= k or not via[v] <= max_stretch * best:
+            break
+        if visited[v]:
+            continue
+        _mark_plateau(pf, pb, on_plateau, visited, v, end_node)
+        if stats is not None:
+            stats['candidates'] += 1
+        head = _path_edges(matrix, edge_of, pf, start_node, v)
+        tail = []
+        u = v
+        while u != end_node:
+            tail.append(_edge_to(matrix, edge_of, u, pb[u]))
+            u = pb[u]
+        edges = head + tail
+        visits = graph.targets[edges].tolist() + [start_node]
+        if len(set(visits)) != len(visits):
+            continue
+        length = float(lengths[edges].sum())
+        edge_set = set(edges)
+        if any(float(lengths[list(edge_set & other)].sum()) > max_overlap * min(length, other_length)
+               for other, other_length in chosen):
+            continue
+        chosen.append((edge_set, length))
+        routes.append(route_from_edges(graph, edges, start_node, profile))
+    return routes
+
+
+def find_alternative_routes(graph, start_point, end_point, banned_edges=None, banned_osmids=None, k=3,
+                            max_overlap=0.6, max_stretch=1.4, stats=None, profile=None):
+    """Tối đa k Alternative giữa hai điểm (lat, lon), sắp theo độ dài; [] nếu không có đường.
+
+    Tham số cấm và profile giống find_shortest_path, max_overlap/max_stretch như alternative_routes.
+    """
+    start_node = graph.nearest_node(*start_point)
+    end_node = graph.nearest_node(*end_point)
+    routes = alternative_routes(graph, start_node, end_node, ban_mask(graph, banned_edges, banned_osmids),
+                                k, max_overlap, max_stretch, stats, profile)
+    return [Alternative(route, *get_route_instructions(graph, route)) for route in routes]
@@ -0,0 +1,104 @@
+"""Tập cấm đang hiệu lực (vd. của một phiên app), giữ dưới dạng mảng bool theo cạnh.
+
+OSM way ID được đổi sang cạnh qua chỉ mục ngược của RoadGraph (osmid_edges), nên
+thêm, bỏ hay so sánh lệnh cấm chỉ tốn thời gian theo số cạnh bị ảnh hưởng chứ không
+theo số cạnh của graph. Một cạnh có thể bị cấm bởi nhiều nguồn (từng OSM ID của nó,
+cạnh cấm theo vùng tròn): mỗi cạnh giữ số lệnh cấm đang phủ lên nó và chỉ được mở
+lại khi số đó về 0.
+"""
+import numpy as np
+
+from routing.cache import ban_fingerprint
+
+
+class BanSet:
+    """Các cạnh (u, v, key) và OSM way ID bị cấm trên một graph.
+
+    mask: mảng bool theo cạnh (True = bị cấm), dùng trực tiếp làm mảng cấm cho tìm kiếm.
+    BanSet truyền được thay cho banned_edges ở mọi hàm nhận (banned_edges, banned_osmids).
+    """
+
+    def __init__(self, graph, banned_edges=(), banned_osmids=()):
+        self.graph = graph
+        self.osmids = set()
+        self._edge_of = {}  # (u, v, key) -> chỉ số cạnh, None nếu không có trong graph
+        self.mask = np.zeros(graph.n_edges, dtype=np.bool_)
+        self._counts = np.zeros(graph.n_edges, dtype=np.int32)
+        self._banned = set()
+        self._fingerprint = None
+        self.add(banned_edges, banned_osmids)
+
+    def __len__(self):
+        """Số cạnh đang bị cấm."""
+        return len(self._banned)
+
+    def __contains__(self, e):
+        return bool(self.mask[e])
+
+    @property
+    def edge_tuples(self):
+        return self._edge_of.keys()
+
+    @property
+    def edges(self):
+        """Chỉ số (tăng dần) các cạnh đang bị cấm."""
+        return np.array(sorted(self._banned), dtype=np.int64)
+
+    def fingerprint(self):
+        """Như ban_fingerprint(edge_tuples, osmids), tính lại chỉ khi tập cấm đổi."""
+        if self._fingerprint is None:
+            self._fingerprint = ban_fingerprint(self._edge_of, self.osmids)
+        return self._fingerprint
+
+    def _apply(self, edges, delta):
+        """Cộng delta vào số lệnh cấm của các cạnh, trả về các cạnh đổi trạng thái."""
+        if not len(edges):
+            return np.empty(0, dtype=np.int64)
+        np.add.at(self._counts, edges, delta)
+        edges = np.unique(edges)
+        now = self._counts[edges] > 0
+        changed = edges[now != self.mask[edges]]
+        self.mask[edges] = now
+        if delta > 0:
+            self._banned.update(changed.tolist())
+        else:
+            self._banned.difference_update(changed.tolist())
+        self._fingerprint = None
+        return changed
+
+    def _resolve(self, banned_edges, banned_osmids, delta):
+        edges = [self._edge_of[t] for t in banned_edges if self._edge_of.get(t) is not None]
+        edges = np.concatenate((np.array(edges, dtype=np.int64),
+                                self.graph.osmid_edges(banned_osmids, unique=False)))
+        return self._apply(edges, delta)
+
+    def add(self, banned_edges=(), banned_osmids=()):
+        """Thêm lệnh cấm, trả về chỉ số các cạnh vừa bị cấm."""
+        banned_edges = [t for t in set(banned_edges) if t not in self._edge_of]
+        for u, v, k in banned_edges:
+            self._edge_of[u, v, k] = self.graph.edge_index(u, v, k)
+        banned_osmids = {int(oid) for oid in banned_osmids
+                         if isinstance(oid, (int, np.integer)) and oid not in self.osmids}
+        self.osmids |= banned_osmids
+        return self._resolve(banned_edges, banned_osmids, 1)
+
+    def remove(self, banned_edges=(), banned_osmids=()):
+        """Bỏ lệnh cấm, trả về chỉ số các cạnh vừa được mở lại."""
+        banned_edges = [t for t in set(banned_edges) if t in self._edge_of]
+        banned_osmids = self.osmids & set(banned_osmids)
+        self.osmids -= banned_osmids
+        changed = self._resolve(banned_edges, banned_osmids, -1)
+        for t in banned_edges:
+            del self._edge_of[t]
+        return changed
+
+    def sync(self, banned_edges=(), banned_osmids=()):
+        """Đặt tập cấm thành đúng các phần tử cho trước, chỉ xử lý phần khác biệt.
+
+        Trả về (cạnh vừa bị cấm, cạnh vừa được mở lại).
+        """
+        banned_edges = set(banned_edges)
+        banned_osmids = {int(oid) for oid in banned_osmids if isinstance(oid, (int, np.integer))}
+        removed = self.remove(self._edge_of.keys() - banned_edges, self.osmids - banned_osmids)
+        added = self.add(banned_edges - self._edge_of.keys(), banned_osmids - self.osmids)
+        return np.setdiff1d(added, removed), np.setdiff1d(removed, added)
@@ -0,0 +1,38 @@
+"""Ranh giới phường (polygon) lưu cục bộ cạnh file graph, dùng để kiểm tra điểm click.
+
+Lần đầu polygon được lấy bằng osmnx.geocode_to_gdf rồi ghi ra file GeoJSON; các
+lần sau chỉ đọc file nên không cần mạng. Polygon được prepare (shapely) để phép
+kiểm tra điểm nằm trong chỉ tốn vài micro giây.
+"""
+import json
+import os
+
+import shapely
+
+
+def boundary_path(graphml_path):
+    """File GeoJSON ranh giới đi kèm file graph, vd. giang_vo_ba_dinh.boundary.geojson."""
+    return os.path.splitext(graphml_path)[0] + '.boundary.geojson'
+
+
+def load_boundary(path, places=None):
+    """Polygon ranh giới đã prepare, đọc từ path; nếu chưa có file thì geocode places rồi lưu."""
+    if not os.path.exists(path):
+        if not places:
+            raise FileNotFoundError(path)
+        import osmnx as ox
+        geometry = ox.geocode_to_gdf(places).union_all()
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'type': 'Feature', 'properties': {'places': list(places)},
+                       'geometry': json.loads(shapely.to_geojson(geometry))}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    with open(path, encoding='utf-8') as f:
+        geometry = shapely.geometry.shape(json.load(f)['geometry'])
+    shapely.prepare(geometry)
+    return geometry
+
+
+def contains_point(boundary, lat, lon):
+    """Điểm (lat, lon) có nằm trong ranh giới không."""
+    return bool(shapely.contains_xy(boundary, lon, lat))
@@ -0,0 +1,115 @@
+"""Cache LRU dùng chung trong process cho kết quả tìm đường.
+
+Khóa là (node đầu, node cuối, method, dấu vân tay của tập cấm), nên kết quả chỉ
+được dùng lại khi cả hai điểm gắn vào cùng node và tập cấm y hệt; đổi lệnh cấm
+là đổi khóa, không cần xóa cache thủ công. Kết quả "không có đường" (None) cũng
+được cache. Cache giới hạn cả số phần tử lẫn dung lượng ước lượng, bỏ phần tử
+dùng lâu nhất trước.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from routing.profiling import count
+
+MISSING = object()
+
+
+def ban_fingerprint(banned_edges=None, banned_osmids=None):
+    """Dấu vân tay (bytes) của tập cấm, không phụ thuộc thứ tự phần tử; b'' nếu không cấm gì.
+
+    banned_edges có thể là BanSet (routing.bans), khi đó dùng dấu vân tay nó đã tính sẵn.
+    """
+    if hasattr(banned_edges, 'fingerprint'):
+        return banned_edges.fingerprint()
+    if not banned_edges and not banned_osmids:
+        return b''
+    digest = hashlib.blake2b(digest_size=16)
+    edges = np.array(sorted(banned_edges or ()), dtype=np.int64).reshape(-1, 3)
+    osmids = np.array(sorted(oid for oid in banned_osmids or () if isinstance(oid, (int, np.integer))),
+                      dtype=np.int64)
+    digest.update(edges.tobytes())
+    digest.update(b'|')
+    digest.update(osmids.tobytes())
+    return digest.digest()
+
+
+def route_nbytes(route):
+    """Dung lượng ước lượng của một Route trong cache (list số nguyên Python)."""
+    if route is None:
+        return 64
+    return 200 + 40 * (len(route.nodes) + len(route.edges))
+
+
+class RouteCache:
+    """LRU thread-safe (Streamlit chạy mỗi phiên trên một thread) với bộ đếm hit/miss."""
+
+    def __init__(self, max_entries=1024, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Route (hoặc None) đã cache cho key, MISSING nếu chưa có."""
+        with self._lock:
+            entry = self._entries.get(key, MISSING)
+            if entry is MISSING:
+                self.misses += 1
+                count('route_cache_misses')
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            count('route_cache_hits')
+            return entry[0]
+
+    def put(self, key, route):
+        size = route_nbytes(route)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (route, size)
+            self.nbytes += size
+            while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.nbytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+_default_cache = None
+
+
+def default_route_cache():
+    """RouteCache dùng chung cho cả process (mọi phiên Streamlit)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RouteCache()
+    return _default_cache
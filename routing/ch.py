@@ -0,0 +1,274 @@
+"""Contraction Hierarchies (CH) cho truy vấn điểm-điểm không có lệnh cấm.
+
+Tiền xử lý co (contract) lần lượt từng node theo thứ tự ưu tiên (edge difference),
+thêm cạnh tắt (shortcut) u->x qua v khi không có đường chứng (witness) ngắn hơn.
+Truy vấn là Dijkstra hai chiều chỉ đi lên theo thứ hạng nên chỉ chạm vài chục node.
+
+Kết quả tiền xử lý được lưu cạnh cache của graph (thư mục con 'ch/') để các lần
+khởi động sau chỉ cần memory-map.
+
+Lệnh cấm chỉ làm đường dài ra: nếu đường ngắn nhất không cấm không đi qua cạnh
+nào bị cấm thì nó vẫn là đường ngắn nhất khi có cấm. Vì vậy router thử CH trước
+và chỉ quay về A* có cấm khi đường CH đi qua cạnh bị cấm.
+
+Giới hạn: việc co viết bằng Python thuần nên chi phí dựng tăng nhanh hơn tuyến tính,
+vd. khoảng 3 s cho lưới 1600 node và 22 s cho 6400 node. Với khu vực cỡ quận (bản đồ
+của app) chỉ dựng một lần rồi dùng cache; với graph cỡ thành phố việc dựng CH không
+còn thực tế, nên dùng method='astar' hoặc 'alt', hoặc A* theo ô của routing.tiles.
+"""
+import heapq
+import math
+import os
+
+import numpy as np
+
+# Số node tối đa mà một lần tìm đường chứng được duyệt; hết giới hạn thì coi như
+# không có đường chứng và thêm shortcut (luôn đúng, chỉ thừa vài cạnh). Khi chỉ ước
+# lượng độ ưu tiên của node thì dùng giới hạn nhỏ hơn cho nhanh.
+WITNESS_SETTLE_LIMIT = 500
+PRIORITY_SETTLE_LIMIT = 30
+
+CH_ARRAYS = (
+    'rank',
+    'up_offsets', 'up_heads', 'up_weights', 'up_mids', 'up_edges',
+    'down_offsets', 'down_heads', 'down_weights', 'down_mids', 'down_edges',
+)
+
+
+def _base_arcs(graph, weights):
+    """Cung u->v với trọng số nhỏ nhất trong các cạnh song song: {u: {v: (w, mid, edge)}}.
+
+    Cạnh có trọng số inf (phương tiện không đi được) bị bỏ qua.
+    """
+    out = [dict() for _ in range(graph.n_nodes)]
+    inn = [dict() for _ in range(graph.n_nodes)]
+    for e, (u, v, w) in enumerate(zip(graph.sources.tolist(), graph.targets.tolist(), weights.tolist())):
+        if u == v or w == math.inf:
+            continue
+        if v not in out[u] or w < out[u][v][0]:
+            out[u][v] = inn[v][u] = (w, -1, e)
+    return out, inn
+
+
+def _witness_distances(out, source, skip, targets, limit, settle_limit):
+    """Dijkstra giới hạn từ source trên graph chưa co, bỏ qua node skip.
+
+    Dừng khi đã chốt hết các node trong targets, khi khoảng cách vượt limit hoặc khi
+    đã chốt settle_limit node.
+    """
+    dist = {source: 0.0}
+    queue = [(0.0, source)]
+    remaining = set(targets)
+    settled = 0
+    while queue and remaining and settled < settle_limit:
+        d, node = heapq.heappop(queue)
+        if d > dist[node]:
+            continue
+        if d > limit:
+            break
+        settled += 1
+        remaining.discard(node)
+        for nbr, (w, _, _) in out[node].items():
+            if nbr == skip:
+                continue
+            nd = d + w
+            if nd < dist.get(nbr, math.inf):
+                dist[nbr] = nd
+                heapq.heappush(queue, (nd, nbr))
+    return dist
+
+
+def _shortcuts(out, inn, v, settle_limit=WITNESS_SETTLE_LIMIT):
+    """Các shortcut (u, x, w) cần thêm nếu co node v."""
+    shortcuts = []
+    outs = list(out[v].items())
+    for u, (w_uv, _, _) in inn[v].items():
+        targets = [(x, w_uv + w_vx) for x, (w_vx, _, _) in outs if x != u]
+        if not targets:
+            continue
+        dist = _witness_distances(out, u, v, [x for x, _ in targets], max(w for _, w in targets), settle_limit)
+        for x, w in targets:
+            if dist.get(x, math.inf) > w:
+                shortcuts.append((u, x, w))
+    return shortcuts
+
+
+def _priority(out, inn, v, deleted):
+    return len(_shortcuts(out, inn, v, PRIORITY_SETTLE_LIMIT)) - len(out[v]) - len(inn[v]) + deleted[v]
+
+
+def _to_csr(n, arcs):
+    """arcs[v] = {đầu mút: (w, mid, edge)} -> các mảng CSR theo v."""
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(a) for a in arcs])
+    heads, weights, mids, edges = [], [], [], []
+    for a in arcs:
+        for head, (w, mid, edge) in a.items():
+            heads.append(head)
+            weights.append(w)
+            mids.append(mid)
+            edges.append(edge)
+    return (offsets, np.array(heads, dtype=np.int32), np.array(weights, dtype=np.float64),
+            np.array(mids, dtype=np.int32), np.array(edges, dtype=np.int32))
+
+
+def build_ch(graph, weights=None):
+    """Tiền xử lý CH cho graph theo trọng số weights (mặc định độ dài), trả về dict các mảng (xem CH_ARRAYS)."""
+    n = graph.n_nodes
+    out, inn = _base_arcs(graph, graph.lengths if weights is None else np.asarray(weights))
+    deleted = [0] * n
+    queue = [(_priority(out, inn, v, deleted), v) for v in range(n)]
+    heapq.heapify(queue)
+    rank = np.full(n, -1, dtype=np.int32)
+    up = [None] * n    # cung v -> x với x co sau v
+    down = [None] * n  # cung u -> v với u co sau v (tìm kiếm ngược đi từ v lên u)
+    order = 0
+    while queue:
+        _, v = heapq.heappop(queue)
+        if rank[v] >= 0:
+            continue
+        # Cập nhật lười: nếu ưu tiên đã tăng so với phần tử kế tiếp thì đưa lại vào hàng đợi
+        priority = _priority(out, inn, v, deleted)
+        if queue and priority > queue[0][0]:
+            heapq.heappush(queue, (priority, v))
+            continue
+        for u, x, w in _shortcuts(out, inn, v):
+            if x not in out[u] or w < out[u][x][0]:
+                out[u][x] = inn[x][u] = (w, v, -1)
+        rank[v] = order
+        order += 1
+        up[v] = out[v]
+        down[v] = inn[v]
+        for x in out[v]:
+            del inn[x][v]
+            deleted[x] += 1
+        for u in inn[v]:
+            del out[u][v]
+            deleted[u] += 1
+    up_csr = _to_csr(n, up)
+    down_csr = _to_csr(n, down)
+    arrays = {'rank': rank}
+    for prefix, csr in (('up', up_csr), ('down', down_csr)):
+        for name, array in zip(('offsets', 'heads', 'weights', 'mids', 'edges'), csr):
+            arrays[f"{prefix}_{name}"] = array
+    return arrays
+
+
+class ContractionHierarchy:
+    """Truy vấn trên CH đã tiền xử lý; đường đi được bung ra thành chỉ số cạnh của RoadGraph."""
+
+    def __init__(self, arrays):
+        for name in CH_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.up = tuple(memoryview(arrays[f"up_{name}"]) for name in ('offsets', 'heads', 'weights'))
+        self.down = tuple(memoryview(arrays[f"down_{name}"]) for name in ('offsets', 'heads', 'weights'))
+
+    @property
+    def n_shortcuts(self):
+        return int((self.up_mids >= 0).sum() + (self.down_mids >= 0).sum())
+
+    def _search_step(self, side, queues, dists, preds, settled):
+        offsets, heads, weights = self.up if side == 0 else self.down
+        d, node = heapq.heappop(queues[side])
+        if d > dists[side][node]:
+            return None
+        settled[side] += 1
+        settled[2] += offsets[node + 1] - offsets[node]
+        for i in range(offsets[node], offsets[node + 1]):
+            nbr = heads[i]
+            nd = d + weights[i]
+            if nd < dists[side].get(nbr, math.inf):
+                dists[side][nbr] = nd
+                preds[side][nbr] = i
+                heapq.heappush(queues[side], (nd, nbr))
+        return node
+
+    def query(self, source, target, stats=None):
+        """Đường ngắn nhất source -> target (chỉ số node) dạng list chỉ số cạnh, None nếu không có."""
+        queues = ([(0.0, source)], [(0.0, target)])
+        dists = ({source: 0.0}, {target: 0.0})
+        preds = ({source: None}, {target: None})
+        settled = [0, 0, 0]  # số node đã chốt theo hướng lên, xuống và tổng số cung đã duyệt
+        best = math.inf
+        meet = None
+        while True:
+            # Mỗi hướng dừng khi khóa nhỏ nhất không nhỏ hơn đường tốt nhất đã gặp
+            active = [side for side in (0, 1) if queues[side] and queues[side][0][0] < best]
+            if not active:
+                break
+            side = min(active, key=lambda s: queues[s][0][0])
+            node = self._search_step(side, queues, dists, preds, settled)
+            if node is not None and node in dists[1 - side]:
+                total = dists[0][node] + dists[1][node]
+                if total < best:
+                    best = total
+                    meet = node
+        if stats is not None:
+            stats['expanded'] = settled[0] + settled[1]
+            stats['scanned'] = int(settled[2])
+        if meet is None:
+            return None
+        path = []
+        node = meet
+        while preds[0][node] is not None:
+            i = preds[0][node]
+            path.append(('up', i))
+            node = self._arc_owner('up', i)
+        path.reverse()
+        node = meet
+        while preds[1][node] is not None:
+            i = preds[1][node]
+            path.append(('down', i))
+            node = self._arc_owner('down', i)
+        edges = []
+        for kind, i in path:
+            self._unpack(kind, i, edges)
+        return edges
+
+    def _arc_owner(self, kind, i):
+        """Node sở hữu cung i trong CSR up/down (node có thứ hạng thấp hơn của cung)."""
+        offsets = self.up_offsets if kind == 'up' else self.down_offsets
+        return int(np.searchsorted(offsets, i, side='right') - 1)
+
+    def _find_arc(self, owner, other, kind):
+        offsets = self.up_offsets if kind == 'up' else self.down_offsets
+        heads = self.up_heads if kind == 'up' else self.down_heads
+        for i in range(offsets[owner], offsets[owner + 1]):
+            if heads[i] == other:
+                return i
+        raise KeyError((owner, other, kind))
+
+    def _unpack(self, kind, i, edges):
+        """Bung cung i (up: tail->head, down: head->tail) thành các cạnh gốc theo thứ tự đi."""
+        mids = self.up_mids if kind == 'up' else self.down_mids
+        mid = int(mids[i])
+        if mid < 0:
+            edges.append(int(self.up_edges[i] if kind == 'up' else self.down_edges[i]))
+            return
+        # Cung a -> b qua mid: mid co trước a và b nên cả a -> mid (down của mid)
+        # và mid -> b (up của mid) đều lưu tại mid
+        if kind == 'up':
+            a = self._arc_owner('up', i)
+            b = int(self.up_heads[i])
+        else:
+            a = int(self.down_heads[i])
+            b = self._arc_owner('down', i)
+        self._unpack('down', self._find_arc(mid, a, 'down'), edges)
+        self._unpack('up', self._find_arc(mid, b, 'up'), edges)
+
+
+def load_or_build_ch(graph, profile=None):
+    """ContractionHierarchy theo graph.weights(profile), đọc từ <graph.cache_dir>/ch (hoặc
+    ch-<profile>-<băm thời gian đi>, xem profiles.cache_suffix) nếu đã có, nếu không thì dựng và lưu."""
+    from routing.profiles import cache_suffix
+    from routing.store import load_arrays, save_arrays
+
+    name = 'ch' + cache_suffix(graph, profile)
+    directory = os.path.join(graph.cache_dir, name) if graph.cache_dir else None
+    if directory and os.path.exists(os.path.join(directory, 'meta.json')):
+        arrays, _ = load_arrays(directory, CH_ARRAYS)
+        return ContractionHierarchy(arrays)
+    arrays = build_ch(graph, graph.weights(profile))
+    if directory:
+        save_arrays(directory, arrays, {'witness_settle_limit': WITNESS_SETTLE_LIMIT, 'profile': profile})
+    return ContractionHierarchy(arrays)
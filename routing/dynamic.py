@@ -0,0 +1,282 @@
+"""Sửa đường đi tăng dần khi tập cấm thay đổi (Lifelong Planning A*, LPA*).
+
+DynamicRoute giữ đường đi giữa hai node cố định cùng trạng thái tìm kiếm của nó:
+- Nếu so với lần tính trước chỉ có thêm lệnh cấm và không cạnh nào của đường hiện
+  tại bị cấm, đường cũ vẫn là ngắn nhất (cấm chỉ làm đường dài ra) nên dùng lại.
+- Ngược lại, LPA* chỉ cập nhật các node có cạnh vào vừa đổi trạng thái cấm rồi mở
+  rộng lại phần cây đường đi ngắn nhất bị ảnh hưởng, thay vì tìm lại từ đầu.
+
+Lần tính đầu dùng route_between (mặc định CH) vì nhanh hơn; trạng thái LPA* chỉ
+được dựng ở lần đầu cần sửa đường, sau đó được dùng lại cho các lần cấm/bỏ cấm tiếp.
+
+SnappedDynamicRoute làm tương tự cho hai điểm gắn vào cạnh (routing.snap): một
+DynamicRoute cho mỗi cặp node hai đầu, chỉ gắn lại điểm khi cạnh được gắn bị cấm.
+"""
+import heapq
+import math
+
+import numpy as np
+
+from routing.cache import MISSING
+from routing.engine import ban_mask, route_between, route_cache_key, route_from_edges, snap_cache_key
+from routing.profiling import active_recorder, count_stats, span
+from routing.search import distance_heuristic
+from routing.snap import join_snapped, snap_points
+
+
+class DynamicRoute:
+    """Đường đi source -> target (chỉ số node) cập nhật theo mảng cấm qua các lần gọi route().
+
+    profile: như find_shortest_path (None = theo độ dài, nếu không theo thời gian đi).
+    """
+
+    def __init__(self, graph, source, target, method='ch', profile=None):
+        self.graph = graph
+        self.source = source
+        self.target = target
+        self.method = method
+        self.profile = profile
+        self._weights = graph.weight_view(profile)
+        self.edges = None
+        self._banned = None   # mảng cấm mà self.edges là đường ngắn nhất
+        self._g = None        # trạng thái LPA*, None nếu chưa dựng
+        self._rhs = None
+        self._queue = None
+        self._applied = None  # mảng cấm mà trạng thái LPA* đang nhất quán
+        self._h = distance_heuristic(graph, target, graph.heuristic_scale(profile))
+
+    def route(self, banned=None, stats=None):
+        """Route ngắn nhất với mảng cấm banned (ban_mask, None = không cấm), None nếu không có đường.
+
+        stats (dict, tùy chọn): 'expanded' là số node đã mở rộng, 'repair' là 'reuse',
+        'initial' hoặc 'lpa'.
+        """
+        banned = np.zeros(self.graph.n_edges, dtype=np.bool_) if banned is None else np.asarray(banned)
+        if self._banned is None:
+            route = route_between(self.graph, self.source, self.target, banned, self.method, stats, self.profile)
+            self.edges = None if route is None else route.edges
+            mode = 'initial'
+        elif not (self._banned & ~banned).any() and (self.edges is None or not banned[self.edges].any()):
+            # Chỉ thêm cấm và đường hiện tại không bị chạm: vẫn là đường ngắn nhất
+            if stats is not None:
+                stats['expanded'] = 0
+            mode = 'reuse'
+        else:
+            self.edges = self._repair(banned, stats)
+            mode = 'lpa'
+        if stats is not None:
+            stats['repair'] = mode
+        self._banned = banned.copy()
+        if self.edges is None:
+            return None
+        return route_from_edges(self.graph, self.edges, self.source, self.profile)
+
+    def _key(self, node):
+        m = min(self._g[node], self._rhs[node])
+        return (m + self._h(node), m)
+
+    @staticmethod
+    def _key_less(a, b):
+        """a < b theo thứ tự từ điển, bỏ qua sai số làm tròn ở thành phần đầu.
+
+        h(u) + g(u) và g(goal) bằng nhau về lý thuyết (cạnh thẳng tới đích) có thể lệch
+        1e-10 khi tính bằng float; khi đó phải so theo thành phần thứ hai như LPA* gốc.
+        """
+        if abs(a[0] - b[0]) > 1e-9 * max(1.0, abs(b[0])):
+            return a[0] < b[0]
+        return a[1] < b[1]
+
+    def _update_vertex(self, node, blocked):
+        if node != self.source:
+            rev_offsets, sources, _ = self.graph.rev_adjacency
+            lengths = self._weights
+            rev_edges = self.graph.rev_edges_view
+            g = self._g
+            best = math.inf
+            for i in range(rev_offsets[node], rev_offsets[node + 1]):
+                e = rev_edges[i]
+                if not blocked[e]:
+                    d = g[sources[e]] + lengths[e]
+                    if d < best:
+                        best = d
+            self._rhs[node] = best
+        if self._g[node] != self._rhs[node]:
+            heapq.heappush(self._queue, (*self._key(node), node))
+
+    def _repair(self, banned, stats):
+        blocked = memoryview(banned)
+        if self._g is None:
+            n = self.graph.n_nodes
+            self._g = [math.inf] * n
+            self._rhs = [math.inf] * n
+            self._rhs[self.source] = 0.0
+            self._queue = [(*self._key(self.source), self.source)]
+        else:
+            targets = self.graph.targets
+            for v in np.unique(targets[np.flatnonzero(self._applied != banned)]).tolist():
+                self._update_vertex(v, blocked)
+        self._applied = banned.copy()
+        expanded = self._compute(blocked)
+        if stats is not None:
+            stats['expanded'] = expanded
+        return self._extract(blocked)
+
+    def _compute(self, blocked):
+        offsets, targets, _ = self.graph.adjacency
+        g, rhs, queue = self._g, self._rhs, self._queue
+        goal = self.target
+        expanded = 0
+        while queue:
+            k1, k2, node = queue[0]
+            # Bỏ phần tử cũ: khóa đã đổi hoặc node đã nhất quán
+            if g[node] == rhs[node] or (k1, k2) != self._key(node):
+                heapq.heappop(queue)
+                continue
+            if rhs[goal] == g[goal] and not self._key_less((k1, k2), self._key(goal)):
+                break
+            heapq.heappop(queue)
+            expanded += 1
+            if g[node] > rhs[node]:
+                g[node] = rhs[node]
+            else:
+                g[node] = math.inf
+                self._update_vertex(node, blocked)
+            for e in range(offsets[node], offsets[node + 1]):
+                self._update_vertex(targets[e], blocked)
+        return expanded
+
+    def _extract(self, blocked):
+        """Đi ngược từ target theo cạnh vào có g(u) + độ dài nhỏ nhất."""
+        if math.isinf(self._g[self.target]):
+            return None
+        rev_offsets, sources, _ = self.graph.rev_adjacency
+        lengths = self._weights
+        rev_edges = self.graph.rev_edges_view
+        g = self._g
+        path = []
+        node = self.target
+        while node != self.source:
+            best, best_edge = math.inf, None
+            for i in range(rev_offsets[node], rev_offsets[node + 1]):
+                e = rev_edges[i]
+                # Độ dài cạnh dương nên g giảm ngặt dọc đường đi, không thể đi vòng
+                if not blocked[e] and g[sources[e]] < g[node]:
+                    d = g[sources[e]] + lengths[e]
+                    if d < best:
+                        best, best_edge = d, e
+            if best_edge is None:
+                route = route_between(self.graph, self.source, self.target, np.asarray(blocked), self.method,
+                                      profile=self.profile)
+                return None if route is None else route.edges
+            path.append(best_edge)
+            node = sources[best_edge]
+        path.reverse()
+        return path
+
+
+class SnappedDynamicRoute:
+    """Đường đi giữa hai điểm (lat, lon) gắn vào cạnh (routing.snap), cập nhật theo mảng cấm.
+
+    Snap của hai điểm được giữ lại khi so với lần trước chỉ thêm lệnh cấm và không cạnh được
+    gắn nào bị cấm (thêm cấm không thể làm lộ ra cạnh gần hơn), nếu không thì gắn lại. Mỗi cặp
+    (node đầu, node cuối) của hai Snap có một DynamicRoute riêng, nên cấm/bỏ cấm ở giữa đường
+    được sửa bằng LPA* như DynamicRoute; chỉ cặp node mới (khi điểm gắn sang cạnh khác) phải
+    tìm từ đầu.
+    """
+
+    def __init__(self, graph, start_point, end_point, method='ch', profile=None):
+        self.graph = graph
+        self.start_point = start_point
+        self.end_point = end_point
+        self.method = method
+        self.profile = profile
+        self.start = None
+        self.end = None
+        self._banned = None   # mảng cấm của lần gắn điểm gần nhất
+        self._pairs = {}      # (node đầu, node cuối) -> DynamicRoute
+
+    def snaps(self, banned):
+        """(Snap đầu, Snap cuối) với mảng cấm banned, mỗi cái None nếu không gắn được."""
+        snapped = [snap for snap in (self.start, self.end) if snap is not None]
+        if (self._banned is None or (self._banned & ~banned).any()
+                or any(banned[snap.edges].any() for snap in snapped)):
+            self.start, self.end = snap_points(self.graph, (self.start_point, self.end_point), banned, self.profile)
+            pairs = {(int(self.graph.targets[e]), int(self.graph.sources[f]))
+                     for e in (self.start.edges if self.start is not None else ())
+                     for f in (self.end.edges if self.end is not None else ())}
+            self._pairs = {pair: planner for pair, planner in self._pairs.items() if pair in pairs}
+        self._banned = banned.copy()
+        return self.start, self.end
+
+    def _between(self, banned, repairs):
+        def between(u, v, part):
+            planner = self._pairs.get((u, v))
+            if planner is None:
+                planner = self._pairs[u, v] = DynamicRoute(self.graph, u, v, self.method, self.profile)
+            route = planner.route(banned, part)
+            repairs.append(part['repair'])
+            return route
+        return between
+
+    def route(self, banned=None, stats=None):
+        """Route giữa hai điểm đã gắn (như snap_route) với mảng cấm banned, None nếu không có đường.
+
+        stats (dict, tùy chọn): như DynamicRoute.route, 'expanded' cộng dồn qua các cặp node;
+        'repair' là 'lpa' nếu có cặp phải sửa bằng LPA*, 'initial' nếu có cặp tìm từ đầu, nếu không 'reuse'.
+        """
+        banned = np.zeros(self.graph.n_edges, dtype=np.bool_) if banned is None else np.asarray(banned)
+        start, end = self.snaps(banned)
+        repairs = []
+        route = None
+        if start is not None and end is not None:
+            route = join_snapped(self.graph, start, end, self._between(banned, repairs), stats, self.profile)
+        if stats is not None:
+            stats.setdefault('expanded', 0)
+            stats['repair'] = next((mode for mode in ('lpa', 'initial') if mode in repairs), 'reuse')
+        return route
+
+
+def find_route_dynamic(graph, planner, start_point, end_point, banned_edges=None, banned_osmids=None,
+                       cache=None, stats=None, profile=None, snap_to_edge=False):
+    """Như find_shortest_path nhưng sửa tiếp đường của planner (DynamicRoute) khi chỉ tập cấm thay đổi.
+
+    planner: DynamicRoute của lần gọi trước (vd. lưu trong session), None để tạo mới;
+    được tạo lại khi điểm đầu/cuối gắn vào node khác hoặc đổi profile.
+    snap_to_edge: như find_shortest_path; planner khi đó là SnappedDynamicRoute (tạo lại khi đổi
+    điểm đầu/cuối hoặc profile), chỉ gắn lại điểm khi cạnh được gắn bị cấm hoặc có cạnh được bỏ cấm.
+    Trả về (planner, Route hoặc None).
+    """
+    if stats is None and active_recorder() is not None:
+        stats = {}
+    with span('find_route_dynamic'):
+        banned = ban_mask(graph, banned_edges, banned_osmids)
+        if snap_to_edge:
+            if (not isinstance(planner, SnappedDynamicRoute) or planner.graph is not graph
+                    or planner.profile != profile
+                    or (planner.start_point, planner.end_point) != (start_point, end_point)):
+                planner = SnappedDynamicRoute(graph, start_point, end_point, profile=profile)
+            start, end = planner.snaps(np.zeros(graph.n_edges, dtype=np.bool_) if banned is None else banned)
+            key = None
+            if cache is not None and start is not None and end is not None:
+                key = snap_cache_key(graph, start, end, planner.method, banned_edges, banned_osmids, profile)
+        else:
+            start_node = graph.nearest_node(*start_point)
+            end_node = graph.nearest_node(*end_point)
+            if (not isinstance(planner, DynamicRoute) or planner.graph is not graph or planner.profile != profile
+                    or (planner.source, planner.target) != (start_node, end_node)):
+                planner = DynamicRoute(graph, start_node, end_node, profile=profile)
+            key = None
+            if cache is not None:
+                key = route_cache_key(graph, start_node, end_node, planner.method, banned_edges, banned_osmids, profile)
+        route = MISSING
+        if key is not None:
+            route = cache.get(key)
+            if route is not MISSING and stats is not None:
+                stats['expanded'] = 0
+                stats['repair'] = 'cache'
+        if route is MISSING:
+            route = planner.route(banned, stats)
+            if key is not None:
+                cache.put(key, route)
+    count_stats(stats)
+    return planner, route
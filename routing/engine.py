@@ -0,0 +1,210 @@
+"""Tìm đường trên graph dùng chung, áp dụng các đoạn bị cấm theo từng truy vấn.
+
+Graph (RoadGraph) chỉ đọc và được dùng chung: không copy, không ghi thuộc tính
+lên cạnh. Các đoạn bị cấm (theo vùng tròn hoặc theo OSM ID) được gom thành một
+mảng bool theo cạnh, thuật toán tìm kiếm bỏ qua các cạnh có giá trị True.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from routing.bans import BanSet
+from routing.cache import MISSING, ban_fingerprint
+from routing.profiles import PROFILES
+from routing.profiling import active_recorder, count_stats, span
+from routing.search import METHODS, astar, bidirectional_astar, distance_heuristic, haversine
+
+# nodes: OSM ID các node trên đường đi, edges: chỉ số cạnh trong RoadGraph, length: mét,
+# duration: giây theo profile phương tiện (None nếu tìm theo độ dài);
+# với điểm gắn vào cạnh (routing.snap): points là hai điểm (lat, lon) đầu/cuối trên cạnh,
+# fractions là vị trí bắt đầu trên edges[0] và kết thúc trên edges[-1] (None nếu gắn vào node)
+Route = namedtuple('Route', ['nodes', 'edges', 'length', 'duration', 'points', 'fractions'],
+                   defaults=(None, None, None))
+
+
+def is_edge_banned(u, v, k, data, banned_edges, banned_osmids):
+    """Cạnh (u, v, k) bị cấm nếu nằm trong tập cạnh cấm hoặc có OSM ID bị cấm."""
+    if (u, v, k) in banned_edges:
+        return True
+    if not banned_osmids:
+        return False
+    osmid = data.get('osmid')
+    if isinstance(osmid, list):
+        return any(oid in banned_osmids for oid in osmid)
+    return osmid in banned_osmids
+
+
+def is_segment_restricted(graph, u, v, k=0, banned_edges=(), banned_osmids=()):
+    """Cạnh (u, v, k) theo OSM ID node có bị cấm bởi các tập cấm cho trước (hoặc BanSet) không."""
+    e = graph.edge_index(u, v, k)
+    if e is None:
+        return False
+    if isinstance(banned_edges, BanSet):
+        return e in banned_edges
+    return is_edge_banned(u, v, k, {'osmid': graph.edge_osmid(e)}, banned_edges, banned_osmids)
+
+
+def is_point_in_circle(point, circle_center, radius_m):
+    """Điểm (lat, lon) có nằm trong vòng tròn tâm circle_center bán kính radius_m mét không."""
+    if not circle_center or not radius_m:
+        return False
+    return haversine(point[0], point[1], circle_center[0], circle_center[1]) <= radius_m
+
+
+def ban_mask(graph, banned_edges=None, banned_osmids=None):
+    """Mảng bool theo cạnh của graph (True = bị cấm), None nếu không có lệnh cấm nào.
+
+    banned_edges: tập (u, v, key) theo OSM ID node, hoặc BanSet (khi đó banned_osmids bị bỏ qua);
+    banned_osmids: tập OSM way ID, đổi sang cạnh qua chỉ mục ngược của graph.
+    """
+    if isinstance(banned_edges, BanSet):
+        if banned_edges.graph is not graph:
+            return ban_mask(graph, banned_edges.edge_tuples, banned_edges.osmids)
+        return banned_edges.mask if len(banned_edges) else None
+    if not banned_edges and not banned_osmids:
+        return None
+    banned = np.zeros(graph.n_edges, dtype=np.bool_)
+    for u, v, k in banned_edges or ():
+        e = graph.edge_index(u, v, k)
+        if e is not None:
+            banned[e] = True
+    if banned_osmids:
+        banned[graph.osmid_edges(banned_osmids)] = True
+    return banned
+
+
+def route_cache_key(graph, start_node, end_node, method, banned_edges=None, banned_osmids=None, profile=None):
+    """Khóa RouteCache: cùng graph, cùng node đầu/cuối, cùng method, profile và cùng tập cấm."""
+    return (id(graph), start_node, end_node, method, profile, ban_fingerprint(banned_edges, banned_osmids))
+
+
+def snap_cache_key(graph, start, end, method, banned_edges=None, banned_osmids=None, profile=None):
+    """Khóa RouteCache cho hai Snap (routing.snap): theo cạnh và vị trí hai điểm đã gắn thay cho node."""
+    return route_cache_key(graph, (tuple(start.edges), round(start.fractions[0], 9)),
+                           (tuple(end.edges), round(end.fractions[0], 9)), method, banned_edges, banned_osmids,
+                           profile)
+
+
+def route_from_edges(graph, edges, start_node, profile=None):
+    """Route từ danh sách chỉ số cạnh bắt đầu ở start_node, kèm thời gian đi nếu có profile."""
+    duration = None if profile is None else float(graph.weights(profile)[edges].sum())
+    return Route(graph.route_nodes(edges, start_node), edges, float(graph.lengths[edges].sum()), duration)
+
+
+def traversed_lengths(graph, route):
+    """Độ dài (mét) đã đi trên từng cạnh của route, tính cả phần cạnh ở hai đầu nếu điểm gắn vào cạnh."""
+    lengths = graph.lengths[route.edges].astype(np.float64)
+    if route.fractions is not None and len(lengths):
+        start, end = route.fractions
+        if len(lengths) == 1:
+            lengths[0] *= end - start
+        else:
+            lengths[0] *= 1 - start
+            lengths[-1] *= end
+    return lengths
+
+
+def route_coordinates(graph, route):
+    """Danh sách [lat, lon] để vẽ route: các node đi qua, thêm hai điểm đầu/cuối nếu gắn vào cạnh."""
+    idx = [graph.node_index(n) for n in route.nodes]
+    coords = [[float(graph.y[i]), float(graph.x[i])] for i in idx]
+    if route.points is not None:
+        coords = [list(route.points[0])] + coords + [list(route.points[1])]
+    return coords
+
+
+def find_shortest_path(graph, start_point, end_point, banned_edges=None, banned_osmids=None,
+                       method='astar', stats=None, cache=None, profile=None, snap_to_edge=False):
+    """Tìm đường ngắn nhất giữa hai điểm (lat, lon) trên graph dùng chung.
+
+    banned_edges: tập (u, v, key) bị cấm (vd. theo vùng tròn).
+    banned_osmids: tập OSM ID bị cấm (vd. cấm bằng click).
+    method: 'astar' (heuristic haversine), 'alt' (A* với heuristic landmark, xem routing.alt),
+        'bidirectional' (A* hai chiều), 'dijkstra' hoặc 'ch' (Contraction Hierarchies,
+        quay về A* nếu đường CH đi qua cạnh bị cấm).
+    stats: dict tùy chọn, nhận số node đã mở rộng ở khóa 'expanded' (và số cạnh đã duyệt ở
+        'scanned' với astar/alt/bidirectional/dijkstra); khi đang ghi (routing.profiling) hai số
+        này được cộng vào bộ đếm nodes_expanded / edges_scanned.
+    cache: RouteCache tùy chọn (xem routing.cache), khóa theo node đầu/cuối và tập cấm.
+    profile: None tìm đường ngắn nhất, 'car'/'motorbike'/'bicycle' tìm đường nhanh nhất theo
+        thời gian đi của phương tiện (routing.profiles); Route.duration là số giây.
+    snap_to_edge: gắn hai điểm vào điểm gần nhất trên đoạn đường gần nhất không bị cấm
+        (routing.snap) thay vì vào node gần nhất.
+    Trả về Route, hoặc None nếu không có đường đi.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method phải là một trong {METHODS}, nhận được {method!r}")
+    if profile is not None and profile not in PROFILES:
+        raise ValueError(f"profile phải là None hoặc một trong {tuple(PROFILES)}, nhận được {profile!r}")
+    if stats is None and active_recorder() is not None:
+        stats = {}
+    with span('find_shortest_path'):
+        route = _find_shortest_path(graph, start_point, end_point, banned_edges, banned_osmids, method, stats, cache,
+                                    profile, snap_to_edge)
+    count_stats(stats)
+    return route
+
+
+def _find_shortest_path(graph, start_point, end_point, banned_edges, banned_osmids, method, stats, cache, profile,
+                        snap_to_edge):
+    if snap_to_edge:
+        return find_snapped_path(graph, start_point, end_point, banned_edges, banned_osmids, method, stats, cache,
+                                 profile)
+    start_node = graph.nearest_node(*start_point)
+    end_node = graph.nearest_node(*end_point)
+    if cache is not None:
+        key = route_cache_key(graph, start_node, end_node, method, banned_edges, banned_osmids, profile)
+        route = cache.get(key)
+        if route is not MISSING:
+            if stats is not None:
+                stats['expanded'] = 0
+            return route
+    route = route_between(graph, start_node, end_node, ban_mask(graph, banned_edges, banned_osmids), method, stats,
+                          profile)
+    if cache is not None:
+        cache.put(key, route)
+    return route
+
+
+def find_snapped_path(graph, start_point, end_point, banned_edges=None, banned_osmids=None,
+                      method='astar', stats=None, cache=None, profile=None):
+    """find_shortest_path với snap_to_edge=True; khóa cache theo cạnh và vị trí hai điểm đã gắn."""
+    from routing.snap import snap_points, snap_route
+
+    banned = ban_mask(graph, banned_edges, banned_osmids)
+    start, end = snap_points(graph, (start_point, end_point), banned, profile)
+    if start is None or end is None:
+        return None
+    if cache is not None:
+        key = snap_cache_key(graph, start, end, method, banned_edges, banned_osmids, profile)
+        route = cache.get(key)
+        if route is not MISSING:
+            if stats is not None:
+                stats['expanded'] = 0
+            return route
+    route = snap_route(graph, start, end, banned, method, stats, profile)
+    if cache is not None:
+        cache.put(key, route)
+    return route
+
+
+def route_between(graph, start_node, end_node, banned=None, method='astar', stats=None, profile=None):
+    """Như find_shortest_path nhưng nhận chỉ số node và mảng cấm (ban_mask) có sẵn, không cache."""
+    weights = graph.weight_view(profile)
+    scale = graph.heuristic_scale(profile)
+    if method == 'ch':
+        edges = graph.hierarchy(profile).query(start_node, end_node, stats=stats)
+        if edges is not None and banned is not None and banned[edges].any():
+            edges = astar(graph, start_node, end_node, banned,
+                          heuristic=distance_heuristic(graph, end_node, scale), stats=stats, weights=weights)
+    elif method == 'alt':
+        edges = astar(graph, start_node, end_node, banned,
+                      heuristic=graph.landmarks(profile=profile).heuristic(end_node), stats=stats, weights=weights)
+    elif method == 'bidirectional':
+        edges = bidirectional_astar(graph, start_node, end_node, banned, stats=stats, weights=weights, scale=scale)
+    else:
+        heuristic = distance_heuristic(graph, end_node, scale) if method == 'astar' else None
+        edges = astar(graph, start_node, end_node, banned, heuristic=heuristic, stats=stats, weights=weights)
+    if edges is None:
+        return None
+    return route_from_edges(graph, edges, start_node, profile)
@@ -0,0 +1,84 @@
+"""Dựng các lớp bản đồ dạng GeoJSON FeatureCollection từ mảng của RoadGraph.
+
+Mỗi lớp (tất cả node, tất cả cạnh, các cạnh bị cấm...) là một FeatureCollection
+để frontend vẽ bằng một layer duy nhất thay vì một đối tượng cho mỗi node/cạnh.
+Mỗi feature có 'id' riêng nên folium không phải sửa dữ liệu khi gán style.
+"""
+import numpy as np
+
+
+def nodes_feature_collection(graph):
+    """FeatureCollection các node (Point), thuộc tính 'node' là OSM ID."""
+    features = [{
+        'type': 'Feature',
+        'id': node_id,
+        'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+        'properties': {'node': node_id},
+    } for node_id, lon, lat in zip(graph.node_ids.tolist(), graph.x.tolist(), graph.y.tolist())]
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def edges_feature_collection(graph, edges=None):
+    """FeatureCollection các cạnh (LineString) cho bởi mảng chỉ số edges (mặc định: mọi cạnh).
+
+    Thuộc tính: 'osmid' (int hoặc list) và 'name' (chuỗi, '' nếu không tên).
+    """
+    edges = np.arange(graph.n_edges) if edges is None else np.asarray(edges)
+    geom_x, geom_y = graph.geom_x.tolist(), graph.geom_y.tolist()
+    starts, ends = graph.geom_offsets[edges].tolist(), graph.geom_offsets[edges + 1].tolist()
+    features = []
+    for e, start, end in zip(edges.tolist(), starts, ends):
+        name = graph.edge_name(e) or ''
+        features.append({
+            'type': 'Feature',
+            'id': e,
+            'geometry': {'type': 'LineString',
+                         'coordinates': [[x, y] for x, y in zip(geom_x[start:end], geom_y[start:end])]},
+            'properties': {'osmid': graph.edge_osmid(e), 'name': name if isinstance(name, str) else ', '.join(name)},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def routes_feature_collection(graph, routes):
+    """FeatureCollection các đường đi (mỗi Route một LineString) để vẽ bằng một lớp.
+
+    Thuộc tính: 'rank' (thứ tự trong routes, từ 1) và 'length' (mét, làm tròn).
+    """
+    features = []
+    for rank, route in enumerate(routes, 1):
+        if not route.edges:
+            continue
+        points = []
+        for e in route.edges:
+            xy = graph.edge_coords(e).tolist()
+            points.extend(xy if not points else xy[1:])
+        features.append({
+            'type': 'Feature',
+            'id': rank,
+            'geometry': {'type': 'LineString', 'coordinates': points},
+            'properties': {'rank': rank, 'length': round(route.length)},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def isochrone_feature_collection(graph, isochrone):
+    """FeatureCollection của một Isochrone: polygon vùng tiếp cận và các node đi tới được (MultiPoint).
+
+    Thuộc tính 'kind' là 'area' hoặc 'nodes', 'count' là số node đi tới được.
+    """
+    features = []
+    if isochrone.polygon is not None:
+        features.append({
+            'type': 'Feature',
+            'id': 'area',
+            'geometry': isochrone.polygon.__geo_interface__,
+            'properties': {'kind': 'area', 'count': len(isochrone.nodes)},
+        })
+    idx = np.searchsorted(graph.node_ids, isochrone.nodes)
+    features.append({
+        'type': 'Feature',
+        'id': 'nodes',
+        'geometry': {'type': 'MultiPoint', 'coordinates': np.column_stack((graph.x[idx], graph.y[idx])).tolist()},
+        'properties': {'kind': 'nodes', 'count': len(isochrone.nodes)},
+    })
+    return {'type': 'FeatureCollection', 'features': features}
@@ -0,0 +1,391 @@
+"""Graph đường dạng CSR: toàn bộ node/cạnh nằm trong các mảng NumPy liền khối.
+
+RoadGraph được dựng một lần từ MultiDiGraph của osmnx. Node được đánh chỉ số
+0..n-1 theo thứ tự OSM ID tăng dần, cạnh được sắp theo node nguồn nên các cạnh
+ra của node i là edges[offsets[i]:offsets[i + 1]]. Thuộc tính chuỗi (tên đường,
+loại đường) được lưu một lần trong bảng và cạnh chỉ giữ chỉ số vào bảng.
+"""
+import re
+
+import numpy as np
+
+
+def _number(value, mph=False):
+    """Số đầu tiên trong thuộc tính OSM ('50', '40;30', '30 mph', list...), nan nếu không có."""
+    if isinstance(value, list):
+        value = value[0]
+    match = re.search(r'\d+(\.\d+)?', str(value)) if value is not None else None
+    if match is None:
+        return np.nan
+    number = float(match.group())
+    return number * 1.609344 if mph and 'mph' in str(value) else number
+
+
+def _table_index(table, lookup, value):
+    if value is None:
+        return -1
+    key = tuple(value) if isinstance(value, list) else value
+    idx = lookup.get(key)
+    if idx is None:
+        idx = lookup[key] = len(table)
+        table.append(value)
+    return idx
+
+
+class RoadGraph:
+    """Graph đường chỉ đọc, lưu dưới dạng CSR.
+
+    Mảng theo node (n): node_ids, x, y, offsets (n + 1), rev_offsets (n + 1).
+    Mảng theo cạnh (m): sources, targets, keys, lengths, name_ids, highway_ids,
+    osmid_offsets (m + 1), geom_offsets (m + 1), has_geometry,
+    maxspeeds (km/h, nan nếu không ghi), lanes (nan nếu không ghi), oneway.
+    rev_edges: chỉ số cạnh sắp theo node đích (CSR ngược cho tìm kiếm hai chiều).
+    osmids: OSM way ID của mọi cạnh nối liền; geom_x/geom_y: tọa độ hình học nối liền.
+    way_ids, way_offsets, way_edges: chỉ mục ngược OSM way ID -> cạnh, dựng khi nạp graph;
+    cạnh của way_ids[i] (tăng dần) là way_edges[way_offsets[i]:way_offsets[i + 1]].
+    start_bearings, end_bearings: hướng (độ, theo chiều kim đồng hồ từ hướng bắc) của đoạn
+    hình học đầu và cuối của mỗi cạnh; street_ids: chỉ số tên đường hiển thị trong streets
+    (tên đầu tiên nếu cạnh gộp nhiều tên). Cả hai dựng khi nạp graph, dùng cho hướng dẫn.
+    """
+
+    ARRAYS = (
+        'node_ids', 'x', 'y', 'offsets', 'rev_offsets', 'rev_edges',
+        'sources', 'targets', 'keys', 'lengths', 'name_ids', 'highway_ids',
+        'osmid_offsets', 'osmids', 'geom_offsets', 'geom_x', 'geom_y', 'has_geometry',
+        'maxspeeds', 'lanes', 'oneway',
+    )
+
+    def __init__(self, arrays, names, highways, crs='epsg:4326'):
+        for attr in self.ARRAYS:
+            setattr(self, attr, arrays[attr])
+        self.names = names
+        self.highways = highways
+        self.crs = crs
+        # memoryview cho vòng lặp tìm kiếm: truy cập phần tử nhanh hơn mảng NumPy, không copy
+        self.adjacency = (memoryview(self.offsets), memoryview(self.targets), memoryview(self.lengths))
+        self.rev_adjacency = (memoryview(self.rev_offsets), memoryview(self.sources), memoryview(self.lengths))
+        self.rev_edges_view = memoryview(self.rev_edges)
+        order = np.argsort(self.osmids, kind='stable')
+        self.way_ids, starts = np.unique(self.osmids[order], return_index=True)
+        self.way_offsets = np.append(starts, len(order)).astype(np.int64)
+        self.way_edges = np.repeat(np.arange(len(self.targets)), np.diff(self.osmid_offsets))[order]
+        self.start_bearings, self.end_bearings = self._bearings()
+        self.streets, self.street_ids = self._streets()
+        self._edge_geometries = None
+        self._spatial_index = None
+        self._node_tree = None
+        self._weights = {}
+        self._passable = {}
+        self._hierarchies = {}
+        self._landmarks = {}
+        # Thư mục cache trên đĩa (đặt bởi routing.store), None nếu graph chỉ nằm trong bộ nhớ
+        self.cache_dir = None
+
+    def _bearings(self):
+        """(hướng đoạn đầu, hướng đoạn cuối) của mọi cạnh, tính vector hóa trên geom_x/geom_y."""
+        first = np.asarray(self.geom_offsets[:-1])
+        last = np.maximum(np.asarray(self.geom_offsets[1:]) - 2, first)
+        x, y = np.asarray(self.geom_x), np.asarray(self.geom_y)
+
+        def bearing(i):
+            if not len(i):
+                return np.empty(0)
+            j = np.minimum(i + 1, len(x) - 1)
+            dx = (x[j] - x[i]) * np.cos(np.radians(y[i]))
+            return np.degrees(np.arctan2(dx, y[j] - y[i])) % 360
+        return bearing(first), bearing(last)
+
+    def _streets(self):
+        """(bảng tên đường hiển thị, chỉ số theo cạnh); cạnh không có tên trỏ tới 'Đường không tên'."""
+        streets = ['Đường không tên']
+        lookup = {streets[0]: 0}
+        table = []
+        for name in self.names:
+            if isinstance(name, list):
+                name = name[0] if name else streets[0]
+            table.append(lookup.setdefault(name, len(lookup)))
+            if lookup[name] == len(streets):
+                streets.append(name)
+        table.append(0)  # name_ids = -1
+        return streets, np.array(table, dtype=np.int64)[self.name_ids]
+
+    @classmethod
+    def from_networkx(cls, G):
+        """Dựng RoadGraph từ MultiDiGraph của osmnx (có x/y ở node, length/osmid ở cạnh)."""
+        node_ids = np.array(sorted(G.nodes), dtype=np.int64)
+        n = len(node_ids)
+        index = {node: i for i, node in enumerate(node_ids.tolist())}
+        x = np.array([G.nodes[node]['x'] for node in node_ids.tolist()], dtype=np.float64)
+        y = np.array([G.nodes[node]['y'] for node in node_ids.tolist()], dtype=np.float64)
+
+        edges = sorted(G.edges(keys=True, data=True), key=lambda e: (index[e[0]], index[e[1]], e[2]))
+        m = len(edges)
+        sources = np.empty(m, dtype=np.int32)
+        targets = np.empty(m, dtype=np.int32)
+        keys = np.empty(m, dtype=np.int32)
+        lengths = np.empty(m, dtype=np.float64)
+        name_ids = np.empty(m, dtype=np.int32)
+        highway_ids = np.empty(m, dtype=np.int32)
+        has_geometry = np.zeros(m, dtype=np.bool_)
+        maxspeeds = np.empty(m, dtype=np.float64)
+        lanes = np.empty(m, dtype=np.float64)
+        oneway = np.zeros(m, dtype=np.bool_)
+        osmid_offsets = np.zeros(m + 1, dtype=np.int64)
+        geom_offsets = np.zeros(m + 1, dtype=np.int64)
+        osmids = []
+        geom_x = []
+        geom_y = []
+        names, name_lookup = [], {}
+        highways, highway_lookup = [], {}
+        for e, (u, v, k, data) in enumerate(edges):
+            sources[e] = index[u]
+            targets[e] = index[v]
+            keys[e] = k
+            lengths[e] = data.get('length', 1)
+            name_ids[e] = _table_index(names, name_lookup, data.get('name'))
+            highway_ids[e] = _table_index(highways, highway_lookup, data.get('highway'))
+            maxspeeds[e] = _number(data.get('maxspeed'), mph=True)
+            lanes[e] = _number(data.get('lanes'))
+            oneway[e] = str(data.get('oneway')) in ('True', 'true', 'yes', '1')
+            osmid = data.get('osmid')
+            osmids.extend(osmid if isinstance(osmid, list) else [] if osmid is None else [osmid])
+            osmid_offsets[e + 1] = len(osmids)
+            geom = data.get('geometry')
+            if geom is not None:
+                has_geometry[e] = True
+                parts = geom.geoms if hasattr(geom, 'geoms') else [geom]
+                coords = [c for part in parts for c in part.coords]
+            else:
+                coords = [(G.nodes[u]['x'], G.nodes[u]['y']), (G.nodes[v]['x'], G.nodes[v]['y'])]
+            geom_x.extend(c[0] for c in coords)
+            geom_y.extend(c[1] for c in coords)
+            geom_offsets[e + 1] = len(geom_x)
+
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+        rev_edges = np.argsort(targets, kind='stable').astype(np.int32)
+        rev_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=n), out=rev_offsets[1:])
+        arrays = dict(
+            node_ids=node_ids, x=x, y=y, offsets=offsets, rev_offsets=rev_offsets, rev_edges=rev_edges,
+            sources=sources, targets=targets, keys=keys, lengths=lengths,
+            name_ids=name_ids, highway_ids=highway_ids,
+            osmid_offsets=osmid_offsets, osmids=np.array(osmids, dtype=np.int64),
+            geom_offsets=geom_offsets, geom_x=np.array(geom_x, dtype=np.float64),
+            geom_y=np.array(geom_y, dtype=np.float64), has_geometry=has_geometry,
+            maxspeeds=maxspeeds, lanes=lanes, oneway=oneway,
+        )
+        return cls(arrays, names, highways, crs=G.graph.get('crs', 'epsg:4326'))
+
+    @property
+    def n_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def n_edges(self):
+        return len(self.targets)
+
+    @property
+    def nbytes(self):
+        """Tổng dung lượng các mảng (byte)."""
+        return sum(getattr(self, attr).nbytes for attr in self.ARRAYS)
+
+    def node_index(self, node_id):
+        """Chỉ số của node theo OSM ID, None nếu không có."""
+        i = int(np.searchsorted(self.node_ids, node_id))
+        if i < len(self.node_ids) and self.node_ids[i] == node_id:
+            return i
+        return None
+
+    def edge_index(self, u, v, key=0):
+        """Chỉ số cạnh theo (u, v, key) của MultiDiGraph gốc, None nếu không có."""
+        ui = self.node_index(u)
+        vi = self.node_index(v)
+        if ui is None or vi is None:
+            return None
+        for e in range(self.offsets[ui], self.offsets[ui + 1]):
+            if self.targets[e] == vi and self.keys[e] == key:
+                return e
+        return None
+
+    def edge_tuple(self, e):
+        """(u, v, key) theo OSM ID như trong MultiDiGraph gốc."""
+        return int(self.node_ids[self.sources[e]]), int(self.node_ids[self.targets[e]]), int(self.keys[e])
+
+    def edge_osmids(self, e):
+        return self.osmids[self.osmid_offsets[e]:self.osmid_offsets[e + 1]].tolist()
+
+    def osmid_edges(self, osmids, unique=True):
+        """Chỉ số các cạnh thuộc một trong các OSM way ID, tra qua chỉ mục ngược (không quét mọi cạnh).
+
+        unique=False giữ một lần cho mỗi cặp (way ID, cạnh), kể cả khi cạnh gộp nhiều way bị cấm.
+        """
+        ids = np.fromiter((oid for oid in osmids if isinstance(oid, (int, np.integer))), dtype=np.int64)
+        pos = np.searchsorted(self.way_ids, ids)
+        found = pos[pos < len(self.way_ids)]
+        found = found[self.way_ids[found] == ids[pos < len(self.way_ids)]]
+        starts = self.way_offsets[found]
+        counts = self.way_offsets[found + 1] - starts
+        ranges = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        edges = self.way_edges[ranges]
+        return np.unique(edges) if unique else edges
+
+    def edge_osmid(self, e):
+        """OSM ID của cạnh theo dạng của osmnx: số nguyên, hoặc list nếu cạnh gộp nhiều way."""
+        ids = self.edge_osmids(e)
+        return ids[0] if len(ids) == 1 else ids
+
+    def edge_name(self, e):
+        idx = self.name_ids[e]
+        return self.names[idx] if idx >= 0 else None
+
+    def edge_coords(self, e):
+        """Mảng (k, 2) tọa độ (x, y) của cạnh."""
+        start, end = self.geom_offsets[e], self.geom_offsets[e + 1]
+        return np.column_stack((self.geom_x[start:end], self.geom_y[start:end]))
+
+    def edge_geometry(self, e):
+        return self.edge_geometries[e]
+
+    @property
+    def edge_geometries(self):
+        """Mảng LineString (shapely) của mọi cạnh, dựng vector hóa ở lần dùng đầu tiên."""
+        if self._edge_geometries is None:
+            import shapely
+            counts = np.diff(self.geom_offsets)
+            indices = np.repeat(np.arange(self.n_edges), counts)
+            self._edge_geometries = shapely.linestrings(self.geom_x, self.geom_y, indices=indices)
+        return self._edge_geometries
+
+    @property
+    def spatial_index(self):
+        """EdgeIndex (STRtree trên hình học cạnh), dựng một lần cho mỗi graph."""
+        if self._spatial_index is None:
+            from routing.spatial import EdgeIndex
+            self._spatial_index = EdgeIndex(self)
+        return self._spatial_index
+
+    def weights(self, profile=None):
+        """Trọng số cạnh: lengths (mét) nếu profile là None, nếu không là thời gian đi (giây)
+        theo routing.profiles, tính một lần cho mỗi profile."""
+        if profile is None:
+            return self.lengths
+        if profile not in self._weights:
+            from routing.profiles import travel_times
+            self._weights[profile] = travel_times(self, profile)
+        return self._weights[profile]
+
+    def passable(self, profile=None):
+        """Mảng bool theo cạnh: True nếu weights(profile) hữu hạn (phương tiện đi được), tính một lần
+        cho mỗi profile. Chỉ đọc: kết hợp với mảng cấm bằng & để có mảng mới."""
+        if profile not in self._passable:
+            mask = np.isfinite(self.weights(profile))
+            mask.flags.writeable = False
+            self._passable[profile] = mask
+        return self._passable[profile]
+
+    def weight_view(self, profile=None):
+        """memoryview của weights(profile) cho vòng lặp tìm kiếm."""
+        return self.adjacency[2] if profile is None else memoryview(self.weights(profile))
+
+    def heuristic_scale(self, profile=None):
+        """Hệ số đổi khoảng cách haversine (mét) sang đơn vị trọng số mà vẫn là cận dưới.
+
+        Với profile là số giây mỗi mét ở tốc độ lớn nhất trên graph (nhỏ nhất của weight / length).
+        """
+        if profile is None:
+            return 1.0
+        weights = self.weights(profile)
+        usable = np.isfinite(weights) & (self.lengths > 0)
+        return float((weights[usable] / self.lengths[usable]).min()) if usable.any() else 0.0
+
+    @property
+    def contraction_hierarchy(self):
+        """ContractionHierarchy theo độ dài, như hierarchy()."""
+        return self.hierarchy()
+
+    def hierarchy(self, profile=None):
+        """ContractionHierarchy theo weights(profile): đọc từ cache nếu có, nếu không thì dựng (và lưu)."""
+        if profile not in self._hierarchies:
+            from routing.ch import load_or_build_ch
+            self._hierarchies[profile] = load_or_build_ch(self, profile)
+        return self._hierarchies[profile]
+
+    def warm(self, profile=None, hierarchy=True):
+        """Dựng trước các cấu trúc vốn được dựng lười ở lần dùng đầu: CH theo profile (nếu hierarchy),
+        KD-tree của node và chỉ mục cạnh trong hệ UTM, vd. trước khi fork worker hoặc trước khi đo.
+        """
+        if hierarchy:
+            self.hierarchy(profile)
+        # node_tree là property dựng lười, gán để dựng ngay
+        _ = self.node_tree
+        self.spatial_index.metric_edges()
+        self.passable(profile)
+        return self
+
+    def landmarks(self, count=None, profile=None):
+        """Landmarks (ALT) với count landmark theo weights(profile): đọc từ cache nếu có, nếu không thì dựng (và lưu)."""
+        from routing.alt import DEFAULT_LANDMARKS, load_or_build_landmarks
+        count = count or DEFAULT_LANDMARKS
+        if (count, profile) not in self._landmarks:
+            self._landmarks[count, profile] = load_or_build_landmarks(self, count, profile)
+        return self._landmarks[count, profile]
+
+    def edge_data(self, e):
+        """Dict thuộc tính cạnh theo dạng của osmnx (dùng cho giao diện)."""
+        data = {'osmid': self.edge_osmid(e), 'length': float(self.lengths[e]), 'geometry': self.edge_geometry(e)}
+        name = self.edge_name(e)
+        if name is not None:
+            data['name'] = name
+        highway_idx = self.highway_ids[e]
+        if highway_idx >= 0:
+            data['highway'] = self.highways[highway_idx]
+        return data
+
+    def route_nodes(self, edges, source):
+        """OSM ID các node trên đường đi cho bởi danh sách chỉ số cạnh."""
+        if not edges:
+            return [int(self.node_ids[source])]
+        idx = np.concatenate(([self.sources[edges[0]]], self.targets[edges]))
+        return self.node_ids[idx].tolist()
+
+    @property
+    def node_tree(self):
+        """(cKDTree trên (x * scale, y), scale): dựng một lần cho mỗi graph, scale = cos vĩ độ trung bình."""
+        if self._node_tree is None:
+            from scipy.spatial import cKDTree
+            scale = float(np.cos(np.radians(np.mean(self.y)))) if self.n_nodes else 1.0
+            self._node_tree = (cKDTree(np.column_stack((self.x * scale, self.y))), scale)
+        return self._node_tree
+
+    def nearest_nodes(self, lats, lons, candidates=8):
+        """Chỉ số node gần nhất cho từng điểm (vector hóa), cùng kết quả với nearest_node.
+
+        KD-tree cho vài ứng viên gần nhất theo hệ số vĩ độ chung của graph, rồi chọn lại
+        theo hệ số vĩ độ của từng điểm; điểm nào ứng viên có thể chưa đủ thì quét mọi node.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        tree, scale = self.node_tree
+        k = min(candidates, self.n_nodes)
+        dist, idx = tree.query(np.column_stack((lons * scale, lats)), k=k)
+        dist, idx = dist.reshape(len(lats), k), idx.reshape(len(lats), k)
+        local = np.cos(np.radians(lats))[:, None]
+        d2 = ((self.x[idx] - lons[:, None]) * local) ** 2 + (self.y[idx] - lats[:, None]) ** 2
+        # Hệ số vĩ độ khác nhau làm khoảng cách lệch tối đa ratio lần giữa hai cách đo
+        ratio = np.maximum(local[:, 0] / scale, scale / local[:, 0])
+        order = np.lexsort((idx, d2), axis=1)
+        nearest = np.take_along_axis(idx, order[:, :1], axis=1)[:, 0]
+        unsure = (k < self.n_nodes) & (dist[:, -1] <= dist[:, 0] * ratio * ratio * (1 + 1e-9) + 1e-12)
+        for i in np.flatnonzero(unsure).tolist():
+            nearest[i] = self._scan_nearest(lats[i], lons[i])
+        return nearest
+
+    def _scan_nearest(self, lat, lon):
+        scale = np.cos(np.radians(lat))
+        d2 = ((self.x - lon) * scale) ** 2 + (self.y - lat) ** 2
+        return int(np.argmin(d2))
+
+    def nearest_node(self, lat, lon):
+        """Chỉ số node gần (lat, lon) nhất (khoảng cách phẳng có hiệu chỉnh theo vĩ độ), tra qua KD-tree."""
+        return int(self.nearest_nodes(lat, lon)[0])
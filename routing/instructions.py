@@ -0,0 +1,38 @@
+"""Hướng dẫn đi đường dạng chữ từ một Route trên RoadGraph.
+
+Cả route được xử lý một lần bằng NumPy: hướng đầu/cuối và tên đường hiển thị của
+mỗi cạnh đã tính sẵn khi nạp graph (RoadGraph.start_bearings, end_bearings,
+street_ids), nên chỉ còn gom các cạnh liên tiếp cùng tên đường và xét góc rẽ ở chỗ
+đổi tên, theo đúng các cạnh (và hình học) route đã đi.
+"""
+import numpy as np
+
+from routing.engine import traversed_lengths
+
+# Góc lệch (độ) giữa hướng cuối cạnh trước và hướng đầu cạnh sau để coi là rẽ
+TURN_ANGLE = 30
+
+
+def turn_angles(graph, edges):
+    """Góc rẽ (độ, -180..180, dương là rẽ phải) tại chỗ nối edges[i - 1] -> edges[i], i >= 1."""
+    edges = np.asarray(edges, dtype=np.int64)
+    return (graph.start_bearings[edges[1:]] - graph.end_bearings[edges[:-1]] + 180) % 360 - 180
+
+
+def get_route_instructions(graph, route):
+    """(danh sách câu hướng dẫn, tổng quãng đường theo mét) theo các cạnh thực sự đi qua."""
+    if not route.edges:
+        return [], 0
+    edges = np.asarray(route.edges, dtype=np.int64)
+    lengths = traversed_lengths(graph, route)
+    streets = graph.street_ids[edges]
+    starts = np.concatenate(([0], np.flatnonzero(streets[1:] != streets[:-1]) + 1))
+    distances = np.add.reduceat(lengths, starts).tolist()
+    angles = turn_angles(graph, edges)[starts[1:] - 1].tolist()
+    instructions = []
+    for i, (street, distance) in enumerate(zip(streets[starts].tolist(), distances)):
+        instruction = f"Đi {distance:.0f}m trên {graph.streets[street]}"
+        if i < len(angles) and abs(angles[i]) > TURN_ANGLE:
+            instruction += f", sau đó {'rẽ phải' if angles[i] > 0 else 'rẽ trái'}"
+        instructions.append(instruction)
+    return instructions, float(lengths.sum())
@@ -0,0 +1,93 @@
+"""Vùng tiếp cận (isochrone): mọi nơi đi tới được trong N mét hoặc N giây từ một điểm.
+
+Một lần Dijkstra một-tới-tất-cả có giới hạn (scipy.sparse.csgraph, limit=...) trên
+cùng ma trận kề và cùng lệnh cấm như find_shortest_path cho chi phí tới mọi node.
+Mảng chi phí này dùng lại được cho mọi ngưỡng nhỏ hơn giới hạn đã quét, nên kéo
+thanh trượt bán kính chỉ cần lọc lại mảng và dựng lại polygon.
+
+Polygon được dựng trong hệ UTM (mét) từ các cạnh đi tới được: cạnh đi hết nếu
+chi phí tới đầu cạnh cộng trọng số cạnh không vượt ngưỡng, nếu không thì chỉ lấy
+phần đầu cạnh tương ứng với chi phí còn lại.
+"""
+from collections import namedtuple
+
+import numpy as np
+import shapely
+from scipy.sparse.csgraph import dijkstra
+from shapely.ops import substring
+
+from routing.engine import ban_mask
+from routing.matrix import adjacency_matrix
+
+SHAPES = ('buffer', 'convex', 'concave')
+
+# nodes: OSM ID các node đi tới được, costs: chi phí tới từng node (mét hoặc giây),
+# polygon: shapely Polygon/MultiPolygon theo lon/lat (None nếu không có cạnh nào)
+Isochrone = namedtuple('Isochrone', ['nodes', 'costs', 'polygon'])
+
+
+def reachable_costs(graph, source, banned=None, profile=None, limit=np.inf):
+    """Chi phí (mét, hoặc giây nếu có profile) từ node source tới mọi node; inf nếu vượt limit
+    hoặc không tới được."""
+    matrix, _ = adjacency_matrix(graph, banned, graph.weights(profile))
+    return dijkstra(matrix, indices=source, limit=limit)
+
+
+def isochrone_polygon(graph, costs, limit, banned=None, profile=None, shape='buffer', buffer_m=25):
+    """Polygon (lon/lat) vùng tiếp cận trong limit từ mảng costs của reachable_costs.
+
+    shape: 'buffer' (hợp các đoạn đường đi tới được nới ra buffer_m mét), 'convex' (bao
+    lồi) hoặc 'concave' (bao lõm) của các đoạn đó.
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"shape phải là một trong {SHAPES}, nhận được {shape!r}")
+    weights = graph.weights(profile)
+    start = costs[graph.sources]
+    usable = (start <= limit) & graph.passable(profile)
+    if banned is not None:
+        usable &= ~banned
+    edges = np.flatnonzero(usable)
+    if not len(edges):
+        return None
+    remaining = (limit - start[edges]) / np.where(weights[edges] > 0, weights[edges], 1)
+    metric = graph.spatial_index.metric_edges()
+    # Đường hai chiều có hai cạnh cùng hình học: chỉ giữ một bản của các cạnh đi hết
+    full = metric[edges[remaining >= 1]]
+    _, first = np.unique(shapely.to_wkb(shapely.normalize(full)), return_index=True)
+    partial = np.flatnonzero(remaining < 1)
+    cut = np.empty(len(partial), dtype=object)
+    cut[:] = [substring(line, 0, fraction, normalized=True)
+              for line, fraction in zip(metric[edges[partial]], remaining[partial].tolist())]
+    lines = np.concatenate((full[np.sort(first)], cut))
+    if shape == 'buffer':
+        polygon = shapely.union_all(shapely.buffer(lines, buffer_m, quad_segs=4)).simplify(buffer_m / 5)
+    elif shape == 'convex':
+        polygon = shapely.convex_hull(shapely.multilinestrings(lines)).buffer(buffer_m, quad_segs=4)
+    else:
+        polygon = shapely.concave_hull(shapely.multilinestrings(lines), ratio=0.3).buffer(buffer_m, quad_segs=4)
+    return graph.spatial_index.to_lonlat(polygon)
+
+
+def node_isochrone(graph, source, limit, banned=None, profile=None, shape='buffer', buffer_m=25, costs=None):
+    """Như point_isochrone nhưng nhận chỉ số node và mảng cấm (ban_mask) có sẵn.
+
+    costs: mảng của reachable_costs đã tính với limit không nhỏ hơn limit này (vd. khi
+    chỉ đổi ngưỡng), None để quét mới.
+    """
+    if costs is None:
+        costs = reachable_costs(graph, source, banned, profile, limit)
+    inside = np.flatnonzero(costs <= limit)
+    return Isochrone(graph.node_ids[inside], costs[inside],
+                     isochrone_polygon(graph, costs, limit, banned, profile, shape, buffer_m))
+
+
+def point_isochrone(graph, point, limit, banned_edges=None, banned_osmids=None, profile=None, shape='buffer',
+                    buffer_m=25):
+    """Vùng tiếp cận trong limit (mét, hoặc giây nếu có profile) từ điểm (lat, lon).
+
+    Điểm gắn vào node gần nhất; lệnh cấm và profile giống find_shortest_path.
+    Trả về Isochrone(nodes, costs, polygon).
+    """
+    source = graph.nearest_node(*point)
+    return node_isochrone(graph, source, limit, ban_mask(graph, banned_edges, banned_osmids), profile,
+                          shape, buffer_m)
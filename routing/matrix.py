@@ -0,0 +1,136 @@
+"""Ma trận khoảng cách nhiều-nhiều (N điểm đi x M điểm đến) trên RoadGraph.
+
+Mỗi điểm đi là một lần Dijkstra một-tới-tất-cả (scipy.sparse.csgraph, viết bằng C)
+trên ma trận kề đã bỏ các cạnh bị cấm, nên N điểm đi chỉ cần N lần quét thay vì
+N x M lần tìm đường điểm-điểm. Lệnh cấm giống hệt find_shortest_path (ban_mask).
+
+Các điểm đi được chia thành từng khối; với processes > 1 các khối chạy trên một
+pool process, mỗi process nhận ma trận kề một lần lúc khởi tạo (chỉ vài MB kể cả
+với graph lớn) thay vì cả RoadGraph.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from routing.engine import ban_mask, route_from_edges
+
+# Số điểm đi mỗi lần quét: bộ nhớ tạm là CHUNK_SIZE x số node float64
+CHUNK_SIZE = 64
+
+_worker_state = None
+
+
+def adjacency_matrix(graph, banned=None, weights=None):
+    """(ma trận CSR n x n, chỉ số cạnh ứng với từng phần tử của ma trận).
+
+    weights: trọng số cạnh (graph.weights), mặc định độ dài; cạnh có trọng số inf bị bỏ.
+    Giữa hai node chỉ giữ cạnh không bị cấm có trọng số nhỏ nhất trong các cạnh song song.
+    """
+    weights = graph.lengths if weights is None else np.asarray(weights)
+    usable = np.isfinite(weights) if banned is None else np.isfinite(weights) & ~banned
+    edges = np.flatnonzero(usable)
+    src, tgt, w = graph.sources[edges], graph.targets[edges], weights[edges]
+    order = np.lexsort((w, tgt, src))
+    edges, src, tgt, w = edges[order], src[order], tgt[order], w[order]
+    first = np.ones(len(edges), dtype=np.bool_)
+    first[1:] = (src[1:] != src[:-1]) | (tgt[1:] != tgt[:-1])
+    edges, src, tgt, w = edges[first], src[first], tgt[first], w[first]
+    indptr = np.searchsorted(src, np.arange(graph.n_nodes + 1))
+    # Cạnh độ dài 0 vẫn được csgraph coi là cạnh vì được lưu tường minh trong CSR
+    matrix = csr_matrix((w, tgt, indptr), shape=(graph.n_nodes, graph.n_nodes))
+    return matrix, edges
+
+
+def _path_edges(matrix, edge_of, predecessors, source, target):
+    """Danh sách chỉ số cạnh từ source tới target theo mảng predecessors của csgraph."""
+    edges = []
+    node = target
+    while node != source:
+        prev = predecessors[node]
+        if prev < 0:
+            return None
+        start, end = matrix.indptr[prev], matrix.indptr[prev + 1]
+        edges.append(int(edge_of[start + np.searchsorted(matrix.indices[start:end], node)]))
+        node = prev
+    edges.reverse()
+    return edges
+
+
+def _sweep(matrix, edge_of, sources, targets, return_paths):
+    """Quét Dijkstra từ các node sources, trả về (khoảng cách tới targets, đường đi hoặc None)."""
+    result = dijkstra(matrix, directed=True, indices=sources, return_predecessors=return_paths)
+    dist, predecessors = result if return_paths else (result, None)
+    block = dist[:, targets]
+    if not return_paths:
+        return block, None
+    paths = [[_path_edges(matrix, edge_of, predecessors[i], s, t) for t in targets]
+             for i, s in enumerate(sources)]
+    return block, paths
+
+
+def _init_worker(matrix, edge_of):
+    global _worker_state
+    _worker_state = (matrix, edge_of)
+
+
+def _sweep_worker(sources, targets, return_paths):
+    matrix, edge_of = _worker_state
+    return _sweep(matrix, edge_of, sources, targets, return_paths)
+
+
+def node_distance_matrix(graph, sources, targets, banned=None, return_paths=False,
+                         processes=1, chunk_size=CHUNK_SIZE, profile=None):
+    """Như distance_matrix nhưng nhận chỉ số node và mảng cấm (ban_mask) có sẵn.
+
+    Trả về (mảng khoảng cách len(sources) x len(targets), paths) với paths[i][j] là
+    list chỉ số cạnh hoặc None; paths là None nếu return_paths=False.
+    """
+    matrix, edge_of = adjacency_matrix(graph, banned, graph.weights(profile))
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    chunks = [sources[i:i + chunk_size] for i in range(0, len(sources), chunk_size)]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(chunks)), initializer=_init_worker,
+                                 initargs=(matrix, edge_of)) as pool:
+            blocks = list(pool.map(_sweep_worker, chunks, [targets] * len(chunks),
+                                   [return_paths] * len(chunks)))
+    else:
+        blocks = [_sweep(matrix, edge_of, chunk, targets, return_paths) for chunk in chunks]
+    if not blocks:
+        return np.empty((0, len(targets))), [] if return_paths else None
+    dist = np.vstack([block for block, _ in blocks])
+    if not return_paths:
+        return dist, None
+    return dist, [row for _, paths in blocks for row in paths]
+
+
+def distance_matrix(graph, origins, destinations, banned_edges=None, banned_osmids=None,
+                    return_paths=False, processes=1, chunk_size=CHUNK_SIZE, profile=None):
+    """Ma trận khoảng cách (mét, hoặc giây nếu có profile) từ mỗi điểm trong origins tới mỗi điểm
+    trong destinations.
+
+    origins, destinations: danh sách điểm (lat, lon), gắn vào node gần nhất như find_shortest_path.
+    banned_edges, banned_osmids: các đoạn bị cấm, cùng ý nghĩa với find_shortest_path.
+    return_paths: trả thêm paths[i][j] là Route (None nếu không có đường đi).
+    processes: số process dùng để quét; 1 chạy trong process hiện tại, None dùng mọi CPU.
+    profile: None tối ưu theo độ dài, 'car'/'motorbike'/'bicycle' theo thời gian (routing.profiles).
+    Trả về mảng (N, M) float64 với inf ở các cặp không có đường đi, hoặc
+    (mảng, paths) nếu return_paths=True.
+    """
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+    destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+    sources = graph.nearest_nodes(origins[:, 0], origins[:, 1]).tolist()
+    targets = graph.nearest_nodes(destinations[:, 0], destinations[:, 1]).tolist()
+    banned = ban_mask(graph, banned_edges, banned_osmids)
+    dist, paths = node_distance_matrix(graph, sources, targets, banned, return_paths, processes, chunk_size,
+                                       profile)
+    if not return_paths:
+        return dist
+    routes = [[None if edges is None else route_from_edges(graph, edges, s, profile)
+               for edges in row] for s, row in zip(sources, paths)]
+    return dist, routes
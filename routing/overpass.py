@@ -0,0 +1,216 @@
+"""Tra OSM way ID theo tên đường: Overpass API, chỉ mục trên đĩa và tên cạnh của graph.
+
+Mọi tên chưa biết được tra trong một truy vấn Overpass duy nhất (qua một
+requests.Session dùng lại kết nối). Kết quả được ghi vào chỉ mục tên -> OSM ID
+trên đĩa (graph_cache/osm_names.json) dùng chung cho mọi phiên và process.
+Khi không có mạng (hoặc offline=True) thì khớp tên với thuộc tính 'name' của các
+cạnh trong graph đã nạp.
+
+Địa chỉ Overpass đọc từ biến môi trường OVERPASS_URL nếu có, để trỏ sang server
+giả lập cục bộ (python -m routing.overpass_stub).
+"""
+import json
+import os
+import re
+import tempfile
+
+import numpy as np
+import requests
+
+from routing.store import CACHE_ROOT
+
+OVERPASS_URL = "http://overpass-api.de/api/interpreter"
+INDEX_PATH = os.path.join(CACHE_ROOT, 'osm_names.json')
+INDEX_FORMAT = 1
+
+_session = None
+_default_index = None
+
+
+def overpass_url():
+    return os.environ.get('OVERPASS_URL', OVERPASS_URL)
+
+
+def _http():
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+
+def _regex_escape(name):
+    return re.sub(r'([\\.^$|?*+()\[\]{}"])', r'\\\1', name)
+
+
+def get_ways_by_name_osm(name, city="Hà Nội"):
+    """Truy vấn Overpass API để lấy các đoạn đường (ways) theo tên ở một thành phố."""
+    query = f"""
+    [out:json][timeout:25];
+    area["name"="{city}"]->.searchArea;
+    (
+      way["name"="{name}"](area.searchArea);
+      way["name"~"^{name}$",i](area.searchArea);
+      way["name"~"{name}",i](area.searchArea);
+    );
+    out geom;
+    """
+    try:
+        response = _http().get(overpass_url(), params={'data': query})
+        response.raise_for_status()
+        data = response.json()
+        if 'elements' in data and data['elements']:
+            return data['elements']
+        else:
+            return []
+    except requests.exceptions.HTTPError as http_err:
+        print(f"Lỗi HTTP khi gọi Overpass API cho '{name}': {http_err}")
+        return []
+    except requests.exceptions.RequestException as req_err:
+        print(f"Lỗi Request khi gọi Overpass API cho '{name}': {req_err}")
+        return []
+    except json.JSONDecodeError as json_err:
+        print(f"Lỗi giải mã JSON từ Overpass API cho '{name}': {json_err}")
+        return []
+
+
+def get_ways_by_names_osm(names, city="Hà Nội", timeout=60):
+    """{tên: tập OSM way ID} cho mọi tên trong names bằng một truy vấn Overpass.
+
+    Một way thuộc về tên nếu tên của way chứa tên đó (không phân biệt hoa thường),
+    giống truy vấn từng tên của get_ways_by_name_osm. Trả về None nếu lỗi mạng.
+    """
+    names = list(names)
+    if not names:
+        return {}
+    pattern = '|'.join(_regex_escape(name) for name in names)
+    query = f"""
+    [out:json][timeout:{timeout}];
+    area["name"="{city}"]->.searchArea;
+    way["name"~"{pattern}",i](area.searchArea);
+    out tags;
+    """
+    try:
+        response = _http().post(overpass_url(), data={'data': query}, timeout=timeout)
+        response.raise_for_status()
+        elements = response.json().get('elements', [])
+    except requests.exceptions.RequestException as req_err:
+        print(f"Lỗi Request khi gọi Overpass API cho {len(names)} tên đường: {req_err}")
+        return None
+    except json.JSONDecodeError as json_err:
+        print(f"Lỗi giải mã JSON từ Overpass API cho {len(names)} tên đường: {json_err}")
+        return None
+    results = {name: set() for name in names}
+    lowered = [(name, name.lower()) for name in names]
+    for way in elements:
+        way_name = way.get('tags', {}).get('name', '').lower()
+        for name, low in lowered:
+            if low in way_name:
+                results[name].add(way['id'])
+    return results
+
+
+def match_graph_names(graph, names):
+    """{tên: tập OSM way ID} theo tên các cạnh của graph (chứa tên, không phân biệt hoa thường)."""
+    tables = [name if isinstance(name, list) else [name] for name in graph.names]
+    results = {}
+    for name in names:
+        low = name.lower()
+        ids = [i for i, table in enumerate(tables) if any(low in n.lower() for n in table)]
+        edges = np.flatnonzero(np.isin(graph.name_ids, ids))
+        results[name] = {oid for e in edges.tolist() for oid in graph.edge_osmids(e)}
+    return results
+
+
+class NameIndex:
+    """Chỉ mục tên đường -> tập OSM way ID lưu ở file JSON.
+
+    File được đọc lại khi process khác đã ghi (so mtime) và được ghi thay thế
+    nguyên tử, nên nhiều phiên/process dùng chung một chỉ mục.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self._mtime = None
+        self._entries = {}
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == INDEX_FORMAT:
+                self._entries = data['entries']
+            self._mtime = mtime
+
+    def get(self, city, name):
+        """Tập OSM ID đã lưu của name, None nếu chưa có."""
+        self._reload()
+        ids = self._entries.get(city, {}).get(name)
+        return None if ids is None else set(ids)
+
+    def update(self, city, results):
+        """Ghi thêm {tên: tập OSM ID} vào chỉ mục."""
+        self._reload()
+        self._entries.setdefault(city, {}).update({name: sorted(ids) for name, ids in results.items()})
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.osm_names-', suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'format': INDEX_FORMAT, 'entries': self._entries}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+
+def default_index():
+    global _default_index
+    if _default_index is None:
+        _default_index = NameIndex()
+    return _default_index
+
+
+def road_names(roads_data_json):
+    """Các tên đường trong roads_data_json ({quận: {tên đường: ...}}) cần tra OSM ID."""
+    names = set()
+    for district in roads_data_json:
+        for road_name in roads_data_json[district]:
+            if "xe đạp sông tô lịch" not in road_name.lower():
+                names.add(road_name)
+    return names
+
+
+def ban_all_roads_get_ids(roads_data_json, cache=None, city="Hà Nội", graph=None, index=None, offline=False):
+    """Tập OSM ID của mọi đường có tên trong roads_data_json.
+
+    Thứ tự tra: cache (dict tên -> tập OSM ID do bên gọi giữ, vd. session của app,
+    được cập nhật tại chỗ), chỉ mục trên đĩa, một truy vấn Overpass cho các tên
+    còn lại (bỏ qua nếu offline), cuối cùng là tên cạnh của graph nếu có.
+    Kết quả khớp theo graph không được ghi vào chỉ mục trên đĩa.
+    """
+    if cache is None:
+        cache = {}
+    if index is None:
+        index = default_index()
+    resolved = {}
+    for name in road_names(roads_data_json):
+        ids = cache.get(name)
+        if ids is None:
+            ids = index.get(city, name)
+        resolved[name] = ids
+    missing = [name for name, ids in resolved.items() if ids is None]
+    if missing and not offline:
+        found = get_ways_by_names_osm(missing, city)
+        if found is not None:
+            index.update(city, found)
+            resolved.update(found)
+            missing = []
+    if missing and graph is not None:
+        resolved.update(match_graph_names(graph, missing))
+    banned_ids = set()
+    for name, ids in resolved.items():
+        if ids is not None:
+            cache[name] = ids
+            banned_ids.update(ids)
+    return banned_ids
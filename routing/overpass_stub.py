@@ -0,0 +1,84 @@
+"""Server Overpass giả lập cục bộ, trả lời truy vấn way theo tên từ tên cạnh của graph.
+
+Dùng khi không có mạng hoặc khi kiểm thử:
+    python -m routing.overpass_stub --port 8001
+    OVERPASS_URL=http://127.0.0.1:8001/api/interpreter streamlit run app.py
+
+Chỉ hỗ trợ các bộ lọc way["name"="..."] và way["name"~"...",i] mà routing.overpass gửi.
+"""
+import argparse
+import json
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from routing.store import load_cached_graph
+
+NAME_FILTER = re.compile(r'way\["name"(=|~)"((?:[^"\\]|\\.)*)"(,i)?\]')
+
+
+def graph_ways(graph):
+    """{OSM way ID: tên} theo các cạnh có tên của graph."""
+    ways = {}
+    for e in range(graph.n_edges):
+        name = graph.edge_name(e)
+        if name is None:
+            continue
+        for oid in graph.edge_osmids(e):
+            ways[oid] = name if isinstance(name, str) else name[0]
+    return ways
+
+
+def answer(ways, query):
+    """Kết quả JSON kiểu Overpass cho query (chỉ xét các bộ lọc theo tên)."""
+    filters = []
+    for op, value, flag in NAME_FILTER.findall(query):
+        if op == '=':
+            filters.append(lambda name, value=value: name == value)
+        else:
+            regex = re.compile(value, re.IGNORECASE if flag else 0)
+            filters.append(lambda name, regex=regex: regex.search(name) is not None)
+    elements = [{'type': 'way', 'id': oid, 'tags': {'name': name}}
+                for oid, name in sorted(ways.items()) if any(f(name) for f in filters)]
+    return {'version': 0.6, 'generator': 'routing.overpass_stub', 'elements': elements}
+
+
+def make_handler(ways):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, query):
+            data = json.dumps(answer(ways, query), ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._reply(parse_qs(urlsplit(self.path).query).get('data', [''])[0])
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+            self._reply(parse_qs(body).get('data', [''])[0])
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--graph', default='giang_vo_ba_dinh.graphml')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(graph_ways(load_cached_graph(args.graph))))
+    print(f"Overpass giả lập tại http://{args.host}:{args.port}/api/interpreter")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
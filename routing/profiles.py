@@ -0,0 +1,90 @@
+"""Thời gian đi qua cạnh (giây) theo loại phương tiện, tính vector hóa một lần cho cả graph.
+
+Tốc độ của cạnh lấy từ maxspeed nếu có (không vượt tốc độ tối đa của phương tiện),
+nếu không thì theo loại đường (highway) của profile, nhân thêm hệ số theo số làn mỗi
+chiều (lanes chia đôi nếu đường hai chiều). Loại đường không có trong profile là
+cấm với phương tiện đó (thời gian inf, thuật toán tìm kiếm bỏ qua như cạnh bị cấm).
+Chiều một chiều (oneway) đã có sẵn trong graph: đường hai chiều có cạnh theo cả hai hướng.
+"""
+import hashlib
+
+import numpy as np
+
+# Tốc độ mặc định (km/h) theo highway trong khu nội đô; 'default' dùng cho cạnh không có highway
+PROFILES = {
+    'car': {
+        'label': 'Ô tô',
+        'max_speed': 60,
+        'speeds': {
+            'trunk': 50, 'trunk_link': 35, 'primary': 40, 'primary_link': 30,
+            'secondary': 35, 'secondary_link': 25, 'tertiary': 30, 'tertiary_link': 25,
+            'unclassified': 25, 'residential': 20, 'living_street': 10, 'service': 15,
+            'default': 20,
+        },
+        'lane_bonus': 0.1,
+    },
+    'motorbike': {
+        'label': 'Xe máy',
+        'max_speed': 50,
+        'speeds': {
+            'trunk': 45, 'trunk_link': 35, 'primary': 40, 'primary_link': 30,
+            'secondary': 35, 'secondary_link': 30, 'tertiary': 30, 'tertiary_link': 25,
+            'unclassified': 25, 'residential': 25, 'living_street': 15, 'service': 20,
+            'footway': 8, 'path': 8, 'pedestrian': 8,  # ngõ nhỏ ở Hà Nội thường gắn thẻ lối đi bộ
+            'default': 25,
+        },
+        'lane_bonus': 0.05,
+    },
+    'bicycle': {
+        'label': 'Xe đạp',
+        'max_speed': 18,
+        'speeds': {
+            'primary': 15, 'primary_link': 15, 'secondary': 15, 'secondary_link': 15,
+            'tertiary': 15, 'tertiary_link': 15, 'unclassified': 15, 'residential': 15,
+            'living_street': 12, 'service': 14, 'cycleway': 18, 'path': 10,
+            'footway': 5, 'pedestrian': 5, 'steps': 2,  # dắt xe
+            'default': 12,
+        },
+        'lane_bonus': 0.0,
+    },
+}
+
+
+def highway_speeds(highways, profile):
+    """Tốc độ (km/h) cho từng phần tử bảng highways của graph, thêm phần tử cuối cho highway = -1.
+
+    Cạnh gộp nhiều loại đường (list) lấy tốc độ chậm nhất trong các loại được phép; nan = cấm.
+    """
+    speeds = PROFILES[profile]['speeds']
+    table = []
+    for value in highways:
+        allowed = [speeds[h] for h in (value if isinstance(value, list) else [value]) if h in speeds]
+        table.append(min(allowed) if allowed else np.nan)
+    table.append(speeds['default'])
+    return np.array(table, dtype=np.float64)
+
+
+def travel_times(graph, profile):
+    """Mảng thời gian (giây) theo cạnh của graph cho profile, inf ở cạnh phương tiện không đi được."""
+    if profile not in PROFILES:
+        raise ValueError(f"profile phải là một trong {tuple(PROFILES)}, nhận được {profile!r}")
+    config = PROFILES[profile]
+    speed = highway_speeds(graph.highways, profile)[graph.highway_ids]
+    lanes = np.where(graph.oneway, graph.lanes, graph.lanes / 2)
+    bonus = 1 + config['lane_bonus'] * np.clip(np.nan_to_num(lanes, nan=1.0) - 1, 0, 2)
+    speed = np.minimum(speed * bonus, config['max_speed'])
+    # maxspeed ghi trên đường thay cho tốc độ mặc định, nhưng không làm đường bị cấm thành đi được
+    speed = np.where(np.isnan(graph.maxspeeds) | np.isnan(speed), speed,
+                     np.minimum(graph.maxspeeds, config['max_speed']))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        times = graph.lengths / (speed / 3.6)
+    return np.where(np.isfinite(times), times, np.inf)
+
+
+def cache_suffix(graph, profile):
+    """Hậu tố tên thư mục cache dựng theo weights(profile) (CH, landmarks): '' nếu profile là None,
+    nếu không gồm tên profile và băm của mảng thời gian đi, nên đổi bảng tốc độ là đổi thư mục."""
+    if profile is None:
+        return ''
+    digest = hashlib.sha1(np.ascontiguousarray(graph.weights(profile)).tobytes()).hexdigest()[:12]
+    return f'-{profile}-{digest}'
@@ -0,0 +1,218 @@
+"""Đo thời gian theo giai đoạn (span) và bộ đếm cho một lần chạy, vd. một lần rerun của app.
+
+Chỉ khi có Recorder đang ghi (start_recording) thì span và count mới làm gì; khi
+tắt, mỗi lời gọi chỉ là một lần đọc ContextVar nên đặt được quanh các giai đoạn
+chính (nạp graph, tìm đường, dựng bản đồ...). Không gọi trong vòng lặp tìm kiếm:
+các thuật toán ghi số node mở rộng / cạnh đã duyệt vào dict stats, và
+find_shortest_path cộng chúng vào bộ đếm khi đang ghi.
+
+Khi kết thúc, Recorder ghi một dòng log JSON (logger 'routing.profiling') và, nếu
+được yêu cầu, một file cProfile (.prof) hoặc pyinstrument (.html) cho cả lần chạy.
+cProfile bật cho cả process nên mỗi lúc chỉ một Recorder được chạy profiler; Recorder
+khác (vd. phiên Streamlit thứ hai) vẫn đo span và bộ đếm, bỏ profiler và ghi lý do
+vào 'profile_error'. Recorder bị bỏ rơi (phiên đóng giữa chừng) nhả profiler khi bị thu
+hồi bộ nhớ; Recorder giữ profiler quá PROFILER_TIMEOUT giây thì Recorder mới được lấy lại.
+
+Logger 'routing.profiling' không có handler riêng: gọi log_to_stderr() (app làm khi bật đo
+thời gian) hoặc tự cấu hình logging để thấy các dòng JSON.
+"""
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+logger = logging.getLogger('routing.profiling')
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+_active = contextvars.ContextVar('routing_recorder', default=None)
+# Giữ bởi Recorder đang chạy profiler, nhả khi finish/abandon (có thể ở thread khác)
+_profiler_lock = threading.Lock()
+# (weakref.finalize nhả profiler, thời điểm lấy) của Recorder đang giữ _profiler_lock
+_holder = None
+PROFILER_TIMEOUT = 600  # giây
+
+
+def _release_profiler(profiler):
+    """Dừng profiler nếu còn chạy và nhả _profiler_lock; chỉ gọi qua weakref.finalize (một lần)."""
+    global _holder
+    _holder = None
+    try:
+        if hasattr(profiler, 'dump_stats'):
+            profiler.disable()
+        else:
+            profiler.stop()
+    except RuntimeError:
+        pass  # pyinstrument đã dừng
+    finally:
+        _profiler_lock.release()
+
+
+def _take_stale_profiler():
+    """Nhả profiler của Recorder giữ quá PROFILER_TIMEOUT giây rồi thử lấy lại lock."""
+    holder = _holder
+    if holder is None or time.monotonic() - holder[1] < PROFILER_TIMEOUT:
+        return False
+    holder[0]()
+    return _profiler_lock.acquire(blocking=False)
+
+
+class Recorder:
+    """Các span (tên, bắt đầu, thời gian theo ms, độ sâu lồng nhau) và bộ đếm của một lần chạy."""
+
+    def __init__(self, name='run', profiler=None, dump_dir=None):
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"profiler phải là None hoặc một trong {PROFILERS}, nhận được {profiler!r}")
+        self.name = name
+        self.spans = []
+        self.counters = {}
+        self.total_ms = None
+        self.profile_path = None
+        self.profile_error = None
+        self._depth = 0
+        self._start = time.perf_counter()
+        self._profiler = None
+        self._release = None
+        self._dump_dir = dump_dir
+        if profiler is not None:
+            self._start_profiler(profiler)
+
+    def _start_profiler(self, profiler):
+        global _holder
+        if not _profiler_lock.acquire(blocking=False) and not _take_stale_profiler():
+            self.profile_error = "một lần chạy khác đang chạy profiler"
+            return
+        try:
+            if profiler == 'cprofile':
+                import cProfile
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+            else:
+                from pyinstrument import Profiler
+                self._profiler = Profiler()
+                self._profiler.start()
+            # Không giữ self: phiên bị đóng thì Recorder được thu hồi và profiler được nhả
+            self._release = weakref.finalize(self, _release_profiler, self._profiler)
+            _holder = (self._release, time.monotonic())
+        except (ValueError, RuntimeError) as error:
+            # Công cụ profile khác (ngoài module này) đang bật, vd. "Another profiling tool is already active"
+            self._profiler = None
+            self.profile_error = str(error)
+            _profiler_lock.release()
+
+    def add(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def abandon(self):
+        """Dừng ghi mà không log hay ghi file profile."""
+        if _active.get() is self:
+            _active.set(None)
+        if self._profiler is not None:
+            self._profiler = None
+            self._release()
+
+    def finish(self):
+        """Dừng ghi: ghi file profile (nếu có), log một dòng JSON và trả về as_dict()."""
+        self.total_ms = (time.perf_counter() - self._start) * 1000
+        if _active.get() is self:
+            _active.set(None)
+        if self._profiler is not None:
+            try:
+                os.makedirs(self._dump_dir or '.', exist_ok=True)
+                stamp = time.strftime('%Y%m%d-%H%M%S')
+                if hasattr(self._profiler, 'dump_stats'):
+                    self._profiler.disable()
+                    self.profile_path = os.path.join(self._dump_dir or '.', f"{self.name}-{stamp}.prof")
+                    self._profiler.dump_stats(self.profile_path)
+                else:
+                    self._profiler.stop()
+                    self.profile_path = os.path.join(self._dump_dir or '.', f"{self.name}-{stamp}.html")
+                    with open(self.profile_path, 'w', encoding='utf-8') as f:
+                        f.write(self._profiler.output_html())
+            finally:
+                self._profiler = None
+                self._release()
+        record = self.as_dict()
+        logger.info(json.dumps(record, ensure_ascii=False))
+        return record
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'total_ms': self.total_ms,
+            'spans': [{'name': name, 'start_ms': start, 'ms': ms, 'depth': depth}
+                      for name, start, ms, depth in sorted(self.spans, key=lambda s: s[1])],
+            'counters': dict(self.counters),
+            'profile': self.profile_path,
+            'profile_error': self.profile_error,
+        }
+
+
+def available_profilers():
+    """Các profiler trong PROFILERS cài được trong môi trường này."""
+    import importlib.util
+
+    return tuple(p for p in PROFILERS if p == 'cprofile' or importlib.util.find_spec(p) is not None)
+
+
+def log_to_stderr(level=logging.INFO):
+    """Gắn một StreamHandler (stderr) cho logger 'routing.profiling' nếu chưa có; gọi nhiều lần được."""
+    logger.setLevel(level)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+        logger.addHandler(handler)
+
+
+def start_recording(name='run', profiler=None, dump_dir=None):
+    """Bắt đầu ghi cho context hiện tại (thread của phiên Streamlit), trả về Recorder.
+
+    Recorder cũ chưa finish (vd. lần chạy bị st.rerun cắt ngang) bị bỏ, profiler của nó được dừng.
+    """
+    previous = _active.get()
+    if previous is not None:
+        previous.abandon()
+    recorder = Recorder(name, profiler, dump_dir)
+    _active.set(recorder)
+    return recorder
+
+
+def active_recorder():
+    return _active.get()
+
+
+@contextmanager
+def span(name):
+    """Đo thời gian khối lệnh với tên name nếu đang ghi."""
+    recorder = _active.get()
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    recorder._depth += 1
+    try:
+        yield
+    finally:
+        recorder._depth -= 1
+        end = time.perf_counter()
+        recorder.spans.append((name, (start - recorder._start) * 1000, (end - start) * 1000, recorder._depth))
+
+
+def count(name, value=1):
+    """Cộng value vào bộ đếm name nếu đang ghi."""
+    recorder = _active.get()
+    if recorder is not None:
+        recorder.add(name, value)
+
+
+def count_stats(stats):
+    """Cộng các khóa của dict stats từ thuật toán tìm kiếm ('expanded', 'scanned') vào bộ đếm."""
+    recorder = _active.get()
+    if recorder is not None and stats:
+        recorder.add('nodes_expanded', stats.get('expanded', 0))
+        recorder.add('edges_scanned', stats.get('scanned', 0))
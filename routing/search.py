@@ -0,0 +1,172 @@
+"""Các thuật toán tìm đường điểm-điểm trên RoadGraph: Dijkstra, A* và A* hai chiều.
+
+Heuristic là khoảng cách haversine tới đích tính từ tọa độ x/y của node. Độ dài
+cạnh của osmnx là tổng khoảng cách great-circle dọc theo hình học của cạnh, nên
+heuristic không bao giờ vượt quá quãng đường thật (admissible và nhất quán).
+
+Node là chỉ số 0..n-1 của RoadGraph, đường đi trả về là danh sách chỉ số cạnh.
+banned là mảng bool theo cạnh (True = bị cấm) hoặc None nếu không cấm gì.
+weights là memoryview trọng số cạnh (graph.weight_view), None = độ dài; với trọng
+số thời gian, heuristic nhân thêm scale (graph.heuristic_scale) để vẫn là cận dưới.
+"""
+import heapq
+import math
+from itertools import count
+
+EARTH_RADIUS_M = 6_371_009  # cùng bán kính osmnx dùng để tính 'length'
+
+METHODS = ('dijkstra', 'astar', 'alt', 'bidirectional', 'ch')
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Khoảng cách great-circle (mét) giữa hai điểm theo độ."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_heuristic(graph, target, scale=1.0):
+    """Heuristic haversine (nhân scale) tới target, có nhớ kết quả theo node trong một truy vấn."""
+    xs = memoryview(graph.x)
+    ys = memoryview(graph.y)
+    lat_t = ys[target]
+    lon_t = xs[target]
+    memo = {}
+
+    def h(n):
+        value = memo.get(n)
+        if value is None:
+            value = memo[n] = haversine(ys[n], xs[n], lat_t, lon_t) * scale
+        return value
+    return h
+
+
+def _build_path(pred_edge, sources, node):
+    """Danh sách cạnh từ gốc tìm kiếm tới node theo cạnh cha pred_edge."""
+    path = []
+    e = pred_edge[node]
+    while e is not None:
+        path.append(e)
+        e = pred_edge[sources[e]]
+    path.reverse()
+    return path
+
+
+def astar(graph, source, target, banned=None, heuristic=None, stats=None, weights=None):
+    """A* một chiều; heuristic=None thì là Dijkstra. Trả về list chỉ số cạnh hoặc None.
+
+    stats (dict, tùy chọn) được ghi số node đã mở rộng vào khóa 'expanded'.
+    """
+    h = heuristic or (lambda n: 0)
+    offsets, targets, lengths = graph.adjacency
+    if weights is not None:
+        lengths = weights
+    sources = graph.rev_adjacency[1]
+    blocked = memoryview(banned) if banned is not None else None
+    c = count()
+    queue = [(h(source), next(c), source, 0)]
+    dist = {source: 0}
+    pred_edge = {source: None}
+    settled = set()
+    while queue:
+        _, _, node, d = heapq.heappop(queue)
+        if node in settled:
+            continue
+        settled.add(node)
+        if node == target:
+            break
+        for e in range(offsets[node], offsets[node + 1]):
+            if blocked is not None and blocked[e]:
+                continue
+            nbr = targets[e]
+            if nbr in settled:
+                continue
+            nd = d + lengths[e]
+            if nd < dist.get(nbr, math.inf):
+                dist[nbr] = nd
+                pred_edge[nbr] = e
+                heapq.heappush(queue, (nd + h(nbr), next(c), nbr, nd))
+    if stats is not None:
+        stats['expanded'] = len(settled)
+        stats['scanned'] = sum(offsets[n + 1] - offsets[n] for n in settled)
+    if target not in settled:
+        return None
+    return _build_path(pred_edge, sources, target)
+
+
+def bidirectional_astar(graph, source, target, banned=None, stats=None, weights=None, scale=1.0):
+    """A* hai chiều với potential trung bình (Ikeda): p_f = (h_t - h_s) / 2, p_r = -p_f.
+
+    Hai hướng dùng chung một potential nhất quán nên có thể dừng khi tổng khóa nhỏ
+    nhất của hai hàng đợi không nhỏ hơn độ dài đường tốt nhất đã gặp.
+    """
+    if source == target:
+        if stats is not None:
+            stats['expanded'] = 0
+        return []
+    h_t = distance_heuristic(graph, target, scale)
+    h_s = distance_heuristic(graph, source, scale)
+
+    def p_f(n):
+        return (h_t(n) - h_s(n)) / 2
+
+    blocked = memoryview(banned) if banned is not None else None
+    offsets, targets, lengths = graph.adjacency
+    if weights is not None:
+        lengths = weights
+    rev_offsets, sources, _ = graph.rev_adjacency
+    rev_edges = graph.rev_edges_view
+    c = count()
+    potentials = (p_f, lambda n: -p_f(n))
+    queues = ([(p_f(source), next(c), source, 0)], [(-p_f(target), next(c), target, 0)])
+    dists = ({source: 0}, {target: 0})
+    pred_edges = ({source: None}, {target: None})
+    settled = (set(), set())
+    best = math.inf
+    meet = None
+    while queues[0] and queues[1]:
+        if queues[0][0][0] + queues[1][0][0] >= best:
+            break
+        side = 0 if queues[0][0][0] <= queues[1][0][0] else 1
+        _, _, node, d = heapq.heappop(queues[side])
+        if node in settled[side]:
+            continue
+        settled[side].add(node)
+        potential = potentials[side]
+        dist = dists[side]
+        other_dist = dists[1 - side]
+        if side == 0:
+            edge_ids = range(offsets[node], offsets[node + 1])
+        else:
+            # Hướng ngược duyệt các cạnh đi vào node
+            edge_ids = (rev_edges[i] for i in range(rev_offsets[node], rev_offsets[node + 1]))
+        for e in edge_ids:
+            if blocked is not None and blocked[e]:
+                continue
+            nbr = targets[e] if side == 0 else sources[e]
+            if nbr in settled[side]:
+                continue
+            nd = d + lengths[e]
+            if nd < dist.get(nbr, math.inf):
+                dist[nbr] = nd
+                pred_edges[side][nbr] = e
+                heapq.heappush(queues[side], (nd + potential(nbr), next(c), nbr, nd))
+                if nbr in other_dist and nd + other_dist[nbr] < best:
+                    best = nd + other_dist[nbr]
+                    meet = nbr
+    if stats is not None:
+        stats['expanded'] = len(settled[0]) + len(settled[1])
+        stats['scanned'] = (sum(offsets[n + 1] - offsets[n] for n in settled[0])
+                            + sum(rev_offsets[n + 1] - rev_offsets[n] for n in settled[1]))
+    if meet is None:
+        return None
+    # Ghép nửa đường xuôi (source -> meet) và nửa đường ngược (meet -> target)
+    path = _build_path(pred_edges[0], sources, meet)
+    e = pred_edges[1][meet]
+    while e is not None:
+        path.append(e)
+        e = pred_edges[1][targets[e]]
+    return path
@@ -0,0 +1,388 @@
+"""Dịch vụ HTTP JSON cục bộ cho router: tìm đường, đường gần nhất và tính tập cấm.
+
+Chạy từ thư mục gốc của repo:
+    python -m routing.server --port 8000 --workers 4
+    python -m routing.server --tiles graph_cache/tiles/hanoi-0.02   (graph chia ô, xem routing.tiles)
+
+Tiến trình cha mở graph từ cache (cùng cache với load_map_data trong app), dựng
+sẵn CH và chỉ mục không gian rồi fork các worker. Mảng của graph được memory-map
+nên mọi worker dùng chung một bản trong page cache, chỉ đọc. Mỗi worker chạy một
+vòng lặp asyncio trên cùng socket đang nghe; kernel chia kết nối cho các worker.
+
+Các endpoint (JSON, tọa độ dạng [lat, lon]):
+    GET  /health
+    POST /route    {"start", "end", "method"?, "profile"?, "snap"?, "banned_osmids"?, "banned_edges"?, "circles"?}
+    POST /isochrone {"center", "limit", "profile"?, "shape"?, "banned_osmids"?, "banned_edges"?, "circles"?}
+    GET  /nearest  ?lat=&lon=&k=&max_distance=
+    POST /bans     {"circles": [{"lat", "lon", "radius"}], "banned_osmids"?}
+
+Với --tiles chỉ có GET /health và POST /route {"start", "end", "profile"?, "banned_osmids"?,
+"banned_edges"?} (A* theo ô, không có circles); mỗi worker giữ LRU ô của riêng nó.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import signal
+import socket
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from routing.cache import default_route_cache
+from routing.engine import find_shortest_path, is_point_in_circle, route_coordinates
+from routing.instructions import get_route_instructions
+from routing.isochrone import SHAPES, point_isochrone
+from routing.profiles import PROFILES
+from routing.search import METHODS
+from routing.store import load_cached_graph
+
+MAX_BODY = 1 << 20
+
+logger = logging.getLogger('routing.server')
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _finite(value):
+    """float(value), ValueError nếu không phải số hữu hạn (nan, inf)."""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{value!r} không hữu hạn")
+    return number
+
+
+def _int64(value, minimum=0):
+    """int(value) trong [minimum, 2**63), ValueError nếu không phải số nguyên trong khoảng đó (vd. 1.5e30)."""
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"{value!r} không phải số nguyên")
+    number = int(value)
+    if not minimum <= number < 1 << 63:
+        raise ValueError(f"{value!r} ngoài khoảng")
+    return number
+
+
+def _point(value, name):
+    try:
+        lat, lon = value
+        return _finite(lat), _finite(lon)
+    except (TypeError, ValueError, OverflowError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{name}' phải có dạng [lat, lon] với số hữu hạn")
+
+
+def ban_sets(graph, body):
+    """(banned_edges, banned_osmids, circles) từ request, cùng cách cấm như trong app.
+
+    Vùng tròn cấm mọi cạnh giao với nó và cả các OSM way chứa các cạnh đó.
+    """
+    try:
+        banned_edges = {(_int64(u), _int64(v), _int64(k)) for u, v, k in body.get('banned_edges', ())}
+        banned_osmids = {_int64(oid) for oid in body.get('banned_osmids', ())}
+        circles = [(_finite(c['lat']), _finite(c['lon']), _finite(c['radius'])) for c in body.get('circles', ())]
+        if any(radius < 0 for _, _, radius in circles):
+            raise ValueError("bán kính âm")
+    except (TypeError, ValueError, KeyError, OverflowError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "banned_edges, banned_osmids hoặc circles không hợp lệ")
+    for lat, lon, radius in circles:
+        for e in graph.spatial_index.edges_in_circle(lat, lon, radius).tolist():
+            banned_edges.add(graph.edge_tuple(e))
+            banned_osmids.update(graph.edge_osmids(e))
+    return banned_edges, banned_osmids, circles
+
+
+def _profile(body):
+    profile = body.get('profile')
+    if profile is not None and profile not in PROFILES:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"profile phải là null hoặc một trong {tuple(PROFILES)}")
+    return profile
+
+
+def handle_route(graph, query, body):
+    start = _point(body.get('start'), 'start')
+    end = _point(body.get('end'), 'end')
+    method = body.get('method', 'ch')
+    if method not in METHODS:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"method phải là một trong {METHODS}")
+    profile = _profile(body)
+    banned_edges, banned_osmids, circles = ban_sets(graph, body)
+    for lat, lon, radius in circles:
+        if is_point_in_circle(start, (lat, lon), radius) or is_point_in_circle(end, (lat, lon), radius):
+            return {'route': None, 'reason': 'điểm đi hoặc đến nằm trong vùng cấm'}
+    # snap: gắn điểm vào đoạn đường gần nhất không bị cấm thay vì node gần nhất
+    route = find_shortest_path(graph, start, end, banned_edges, banned_osmids, method=method,
+                               cache=default_route_cache(), profile=profile, snap_to_edge=bool(body.get('snap')))
+    if route is None:
+        return {'route': None, 'reason': 'không có đường đi'}
+    instructions, total_distance = get_route_instructions(graph, route)
+    return {'route': {
+        'nodes': route.nodes,
+        'length': total_distance,
+        'duration': route.duration,
+        'coordinates': route_coordinates(graph, route),
+        'instructions': instructions,
+    }}
+
+
+def handle_isochrone(graph, query, body):
+    center = _point(body.get('center'), 'center')
+    profile = _profile(body)
+    shape = body.get('shape', 'buffer')
+    if shape not in SHAPES:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"shape phải là một trong {SHAPES}")
+    try:
+        limit = float(body['limit'])
+    except (KeyError, TypeError, ValueError):
+        limit = None
+    if limit is None or not (math.isfinite(limit) and limit >= 0):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "cần 'limit' là số không âm (mét, hoặc giây nếu có profile)")
+    banned_edges, banned_osmids, _ = ban_sets(graph, body)
+    result = point_isochrone(graph, center, limit, banned_edges, banned_osmids, profile, shape)
+    return {
+        'nodes': result.nodes.tolist(),
+        'costs': result.costs.tolist(),
+        'polygon': None if result.polygon is None else result.polygon.__geo_interface__,
+    }
+
+
+def handle_nearest(graph, query, body):
+    try:
+        lat = _finite(query['lat'][0])
+        lon = _finite(query['lon'][0])
+        k = int(query.get('k', ['20'])[0])
+        max_distance = _finite(query.get('max_distance', ['0.002'])[0])
+        if k < 0 or max_distance < 0:
+            raise ValueError("k và max_distance không được âm")
+    except (KeyError, ValueError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "cần tham số lat, lon (k, max_distance tùy chọn)")
+    roads = graph.spatial_index.nearest_roads((lon, lat), k, max_distance)
+    return {'roads': [{
+        'u': road['u'],
+        'v': road['v'],
+        'key': road['key'],
+        'osmid': road['data']['osmid'],
+        'name': road['data'].get('name'),
+        'length': road['data']['length'],
+        'distance': road['distance'],
+    } for road in roads]}
+
+
+def handle_bans(graph, query, body):
+    banned_edges, banned_osmids, _ = ban_sets(graph, body)
+    return {'banned_edges': sorted(banned_edges), 'banned_osmids': sorted(banned_osmids)}
+
+
+def handle_health(graph, query, body):
+    return {'status': 'ok', 'nodes': graph.n_nodes, 'edges': graph.n_edges, 'pid': os.getpid()}
+
+
+def handle_tiled_route(tiles, query, body):
+    start = _point(body.get('start'), 'start')
+    end = _point(body.get('end'), 'end')
+    profile = _profile(body)
+    if body.get('circles'):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "graph chia ô không hỗ trợ circles")
+    banned_edges, banned_osmids, _ = ban_sets(tiles, body)
+    route = tiles.find_shortest_path(start, end, banned_edges, banned_osmids, profile=profile)
+    if route is None:
+        return {'route': None, 'reason': 'không có đường đi'}
+    return {'route': {
+        'nodes': route.nodes,
+        'length': route.length,
+        'duration': route.duration,
+        'coordinates': tiles.route_coordinates(route),
+    }}
+
+
+def handle_tiled_health(tiles, query, body):
+    return {'status': 'ok', 'nodes': len(tiles.node_ids), 'pid': os.getpid(), **tiles.stats()}
+
+
+HANDLERS = {
+    ('GET', '/health'): handle_health,
+    ('POST', '/route'): handle_route,
+    ('POST', '/isochrone'): handle_isochrone,
+    ('GET', '/nearest'): handle_nearest,
+    ('POST', '/bans'): handle_bans,
+}
+
+TILED_HANDLERS = {
+    ('GET', '/health'): handle_tiled_health,
+    ('POST', '/route'): handle_tiled_route,
+}
+
+
+def dispatch(graph, method, target, body, handlers=HANDLERS):
+    """(mã HTTP, dict kết quả) cho một request; graph là TiledGraph nếu handlers là TILED_HANDLERS."""
+    url = urlsplit(target)
+    handler = handlers.get((method, url.path))
+    if handler is None:
+        if any(path == url.path for _, path in handlers):
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': f"{method} không hỗ trợ cho {url.path}"}
+        return HTTPStatus.NOT_FOUND, {'error': f"không có endpoint {url.path}"}
+    try:
+        payload = json.loads(body) if body else {}
+        if not isinstance(payload, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "body phải là một object JSON")
+        return HTTPStatus.OK, handler(graph, parse_qs(url.query), payload)
+    except json.JSONDecodeError:
+        return HTTPStatus.BAD_REQUEST, {'error': 'body không phải JSON hợp lệ'}
+    except HTTPError as err:
+        return err.status, {'error': str(err)}
+    except Exception as err:
+        # Lỗi ngoài dự kiến của handler: trả 500 thay vì làm rơi kết nối
+        logger.exception("Lỗi khi xử lý %s %s", method, url.path)
+        return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"lỗi máy chủ: {type(err).__name__}"}
+
+
+async def _readline(reader):
+    try:
+        return await reader.readline()
+    except ValueError:
+        # Dòng dài hơn giới hạn của StreamReader
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "dòng request hoặc header quá dài")
+
+
+async def read_request(reader):
+    """(method, target, version, headers) của request tiếp theo, None nếu kết nối đã đóng.
+
+    HTTPError 400 nếu dòng request hoặc header không đúng dạng.
+    """
+    request_line = await _readline(reader)
+    if not request_line:
+        return None
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "dòng request không hợp lệ")
+    method, target, version = parts
+    headers = {}
+    while True:
+        line = await _readline(reader)
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, sep, value = line.decode('latin-1').partition(':')
+        if not sep:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "header không hợp lệ")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length không hợp lệ")
+    headers['content-length'] = length
+    return method, target, version, headers
+
+
+def _response(status, payload, keep_alive):
+    data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    return (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+    )
+
+
+async def handle_connection(graph, reader, writer, handlers=HANDLERS):
+    """Phục vụ các request HTTP/1.1 (keep-alive) trên một kết nối."""
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except HTTPError as err:
+                writer.write(_response(err.status, {'error': str(err)}, False))
+                await writer.drain()
+                break
+            if request is None:
+                break
+            method, target, version, headers = request
+            length = headers['content-length']
+            if length > MAX_BODY:
+                status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': 'body quá lớn'}
+                keep_alive = False
+            else:
+                body = await reader.readexactly(length) if length else b''
+                status, payload = dispatch(graph, method, target, body, handlers)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+def _run_worker(graph, sock, handlers):
+    async def main():
+        server = await asyncio.start_server(lambda r, w: handle_connection(graph, r, w, handlers), sock=sock)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(graphml_path='giang_vo_ba_dinh.graphml', host='127.0.0.1', port=8000, workers=1, tiles=None):
+    """Mở graph, dựng sẵn các cấu trúc dùng chung rồi phục vụ bằng workers process.
+
+    tiles: thư mục của build_tiles; nếu có thì phục vụ graph chia ô (TiledGraph) thay cho graphml_path.
+    """
+    if tiles is not None:
+        from routing.tiles import TiledGraph
+
+        graph, handlers = TiledGraph(tiles), TILED_HANDLERS
+    else:
+        graph, handlers = load_cached_graph(graphml_path), HANDLERS
+        # Dựng trước khi fork để các worker dùng chung thay vì mỗi worker tự dựng
+        graph.warm()
+    sock = socket.create_server((host, port), backlog=1024)
+    sock.setblocking(False)
+    if not hasattr(os, 'fork'):
+        print("Hệ điều hành không hỗ trợ fork, chạy với 1 worker")
+        workers = 1
+    print(f"Phục vụ http://{host}:{port} với {workers} worker")
+    if workers <= 1:
+        _run_worker(graph, sock, handlers)
+        return
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(graph, sock, handlers)
+            finally:
+                os._exit(0)
+        children.append(pid)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--graph', default='giang_vo_ba_dinh.graphml')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--tiles', help='thư mục graph chia ô (python -m routing.tiles), dùng thay cho --graph')
+    args = parser.parse_args()
+    serve(args.graph, args.host, args.port, args.workers, args.tiles)
+
+
+if __name__ == '__main__':
+    main()
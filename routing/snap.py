@@ -0,0 +1,122 @@
+"""Gắn điểm (lat, lon) vào đoạn đường gần nhất và tìm đường giữa hai điểm đã gắn.
+
+Khác nearest_node (gắn vào node gần nhất, có thể là đầu ngõ cụt hay đầu một đoạn
+bị cấm), điểm được chiếu lên cạnh gần nhất không bị cấm và đi được theo profile.
+Việc tìm cạnh dùng STRtree trên hình học UTM (mét) của EdgeIndex cho cả mảng điểm
+một lần (EdgeIndex.nearest_edges).
+
+Mỗi truy vấn có một node ảo ở đầu và một ở cuối, không ghi gì vào graph dùng
+chung: node ảo đầu nối tới node cuối của cạnh được gắn với chi phí phần cạnh còn
+lại, node ảo cuối nhận từ node đầu của cạnh với chi phí phần cạnh đã đi. Đường hai
+chiều có hai cạnh ngược nhau cùng hình học nên cả hai hướng đều được xét; đường
+tốt nhất là tốt nhất trong các cặp (node đầu, node cuối), mỗi cặp tìm bằng
+route_between nên dùng được mọi method (hoặc bằng DynamicRoute, xem join_snapped).
+"""
+from collections import namedtuple
+
+import numpy as np
+import shapely
+
+from routing.engine import Route, route_between
+
+# edges: các cạnh cách đều gần nhất (vd. hai chiều của một đường), fractions: vị trí điểm
+# chiếu trên từng cạnh theo tỉ lệ độ dài 0..1 theo chiều của cạnh, point: (lat, lon) điểm
+# chiếu, distance: mét từ điểm gốc tới điểm chiếu
+Snap = namedtuple('Snap', ['edges', 'fractions', 'point', 'distance'])
+
+
+def snap_points(graph, points, banned=None, profile=None):
+    """Snap cho từng điểm (lat, lon) trong points, None nếu không có cạnh nào đi được.
+
+    banned: mảng cấm (ban_mask) có sẵn; cạnh bị cấm hoặc có trọng số inf theo profile bị bỏ qua.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    usable = graph.passable(profile)
+    if banned is not None:
+        usable = usable & ~banned
+    index = graph.spatial_index
+    which, edges, distances, fractions = index.nearest_edges(points[:, 0], points[:, 1], usable)
+    # Điểm chiếu (lat, lon) lấy từ cạnh đầu tiên của mỗi điểm, các cạnh cách đều trùng hình học
+    first = np.flatnonzero(np.diff(which, prepend=-1))
+    projected = index.to_lonlat(shapely.line_interpolate_point(index.metric_edges()[edges[first]], fractions[first],
+                                                               normalized=True))
+    snaps = [None] * len(points)
+    bounds = np.append(first, len(which))
+    for j, i in enumerate(which[first].tolist()):
+        part = slice(bounds[j], bounds[j + 1])
+        point = projected[j]
+        snaps[i] = Snap(edges[part].tolist(), fractions[part].tolist(), (point.y, point.x),
+                        float(distances[bounds[j]]))
+    return snaps
+
+
+def snap_point(graph, lat, lon, banned=None, profile=None):
+    """Snap của một điểm, như snap_points."""
+    return snap_points(graph, [(lat, lon)], banned, profile)[0]
+
+
+def snap_route(graph, start, end, banned=None, method='astar', stats=None, profile=None):
+    """Route tốt nhất giữa hai Snap qua node ảo đầu/cuối, None nếu không có đường đi.
+
+    Route.edges gồm cả cạnh được gắn ở hai đầu, Route.fractions là (vị trí bắt đầu trên cạnh
+    đầu, vị trí kết thúc trên cạnh cuối), Route.points là hai điểm chiếu (lat, lon);
+    Route.nodes chỉ gồm các node thật đi qua giữa hai điểm.
+    stats (dict, tùy chọn): 'expanded' và 'scanned' cộng dồn qua các cặp node đầu/cuối.
+    """
+    return join_snapped(graph, start, end,
+                        lambda u, v, part: route_between(graph, u, v, banned, method, part, profile), stats, profile)
+
+
+def join_snapped(graph, start, end, between, stats=None, profile=None):
+    """Như snap_route nhưng đoạn giữa mỗi cặp (node đầu, node cuối) do between(u, v, stats) tìm.
+
+    Cặp không thể cho đường tốt hơn đường đã có (chỉ riêng hai phần cạnh ở hai đầu đã dài hơn) được bỏ qua.
+    """
+    weights = graph.weights(profile)
+    lengths = graph.lengths
+    best = None  # (chi phí, cạnh đầu, vị trí đầu, Route giữa hoặc None, cạnh cuối, vị trí cuối)
+    # Hai điểm trên cùng một cạnh và điểm cuối nằm sau điểm đầu: đi thẳng trên cạnh đó
+    for e, fs in zip(start.edges, start.fractions):
+        for f, fe in zip(end.edges, end.fractions):
+            if e == f and fe >= fs:
+                cost = (fe - fs) * weights[e]
+                if best is None or cost < best[0]:
+                    best = (cost, e, fs, None, e, fe)
+    origins = {}
+    for e, fs in zip(start.edges, start.fractions):
+        node, cost = int(graph.targets[e]), (1 - fs) * weights[e]
+        if node not in origins or cost < origins[node][0]:
+            origins[node] = (cost, e, fs)
+    goals = {}
+    for e, fe in zip(end.edges, end.fractions):
+        node, cost = int(graph.sources[e]), fe * weights[e]
+        if node not in goals or cost < goals[node][0]:
+            goals[node] = (cost, e, fe)
+    expanded = scanned = 0
+    for u, (head, e, fs) in origins.items():
+        for v, (tail, f, fe) in goals.items():
+            if best is not None and head + tail >= best[0]:
+                continue
+            part = {}
+            route = between(u, v, part)
+            expanded += part.get('expanded', 0)
+            scanned += part.get('scanned', 0)
+            if route is None:
+                continue
+            cost = head + (route.length if profile is None else route.duration) + tail
+            if best is None or cost < best[0]:
+                best = (cost, e, fs, route, f, fe)
+    if stats is not None:
+        stats['expanded'] = expanded
+        stats['scanned'] = scanned
+    if best is None:
+        return None
+    cost, e, fs, route, f, fe = best
+    if route is None:
+        edges, nodes = [e], []
+        length = (fe - fs) * lengths[e]
+    else:
+        edges, nodes = [e] + route.edges + [f], route.nodes
+        length = (1 - fs) * lengths[e] + route.length + fe * lengths[f]
+    return Route(nodes, edges, float(length), None if profile is None else float(cost),
+                 (start.point, end.point), (fs, fe))
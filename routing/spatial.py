@@ -0,0 +1,147 @@
+"""Chỉ mục không gian (STRtree) trên hình học cạnh của RoadGraph.
+
+Cây được dựng một lần cho mỗi graph (xem RoadGraph.spatial_index), sau đó các truy
+vấn "k cạnh gần nhất" và "cạnh giao với một vùng" chỉ duyệt các ứng viên do cây
+trả về thay vì toàn bộ cạnh.
+
+Vùng cấm hình tròn được tính trong hệ tọa độ phẳng theo mét (UTM của vùng chứa
+graph, Hà Nội là EPSG:32648) nên bán kính đúng theo mét theo mọi hướng; buffer
+theo độ trên lon/lat sẽ cho ra hình elip.
+"""
+import numpy as np
+import shapely
+
+
+def utm_epsg(lon, lat):
+    """Mã EPSG của múi UTM (WGS 84) chứa điểm (lon, lat)."""
+    zone = int((lon + 180) // 6) % 60 + 1
+    return (32600 if lat >= 0 else 32700) + zone
+
+
+def find_nearest_roads(graph, point, num_roads=20, max_distance=0.002):
+    """Tìm num_roads tuyến đường gần nhất với điểm (lon, lat) cho trước (max_distance ~200m)."""
+    return graph.spatial_index.nearest_roads(point, num_roads, max_distance)
+
+
+class EdgeIndex:
+    """STRtree trên mảng LineString của các cạnh; chỉ số trong cây trùng chỉ số cạnh."""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.geometries = graph.edge_geometries
+        self.tree = shapely.STRtree(self.geometries)
+        self._metric_tree = None
+
+    def _build_metric(self):
+        from pyproj import Transformer
+
+        graph = self.graph
+        self.epsg = utm_epsg(float(np.mean(graph.x)), float(np.mean(graph.y)))
+        self.to_metric = Transformer.from_crs('EPSG:4326', f'EPSG:{self.epsg}', always_xy=True)
+        self.from_metric = Transformer.from_crs(f'EPSG:{self.epsg}', 'EPSG:4326', always_xy=True)
+        mx, my = self.to_metric.transform(np.asarray(graph.geom_x), np.asarray(graph.geom_y))
+        indices = np.repeat(np.arange(graph.n_edges), np.diff(graph.geom_offsets))
+        self.metric_geometries = shapely.linestrings(mx, my, indices=indices)
+        self._metric_tree = shapely.STRtree(self.metric_geometries)
+
+    def metric_edges(self):
+        """Mảng LineString của mọi cạnh trong hệ UTM (mét), cùng chỉ số với cạnh."""
+        if self._metric_tree is None:
+            self._build_metric()
+        return self.metric_geometries
+
+    def to_lonlat(self, geometry):
+        """Chiếu geometry từ hệ UTM của metric_edges về lon/lat."""
+        if self._metric_tree is None:
+            self._build_metric()
+        back = self.from_metric
+        return shapely.transform(geometry, lambda xy: np.column_stack(back.transform(xy[:, 0], xy[:, 1])))
+
+    def edges_in_circle(self, lat, lon, radius_m):
+        """Chỉ số (tăng dần) các cạnh giao với vòng tròn tâm (lat, lon) bán kính radius_m mét.
+
+        Cạnh giao với hình tròn khi khoảng cách từ cạnh tới tâm không quá bán kính, nên
+        dùng predicate 'dwithin' trên hình học đã chiếu sang UTM: STRtree lọc ứng viên
+        theo khung bao rồi GEOS kiểm tra chính xác cả mảng ứng viên một lần, không cần
+        xấp xỉ hình tròn bằng đa giác buffer.
+        """
+        if self._metric_tree is None:
+            self._build_metric()
+        cx, cy = self.to_metric.transform(lon, lat)
+        return np.sort(self._metric_tree.query(shapely.Point(cx, cy), predicate='dwithin', distance=radius_m))
+
+    def nearest_edges(self, lats, lons, usable=None, tolerance=1e-6):
+        """Cạnh gần nhất (theo mét) cho cả mảng điểm, chỉ xét các cạnh có usable[e] = True.
+
+        Trả về (chỉ số điểm, chỉ số cạnh, khoảng cách mét, vị trí chiếu trên cạnh theo tỉ lệ 0..1),
+        gồm mọi cạnh cách đều gần nhất (vd. hai chiều của cùng một đường); điểm không có cạnh
+        usable nào không xuất hiện. Bán kính tìm bắt đầu từ khoảng cách tới cạnh gần nhất bất kỳ
+        và nhân 4 cho tới khi gặp cạnh usable, các điểm được xử lý cùng lúc ở mỗi vòng.
+        """
+        if self._metric_tree is None:
+            self._build_metric()
+        mx, my = self.to_metric.transform(np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64))
+        points = shapely.points(np.atleast_1d(mx), np.atleast_1d(my))
+        (which, _), distances = self._metric_tree.query_nearest(points, return_distance=True)
+        radius = np.full(len(points), np.inf)
+        np.minimum.at(radius, which, distances)
+        radius = np.maximum(radius, 1.0)
+        x0, y0, x1, y1 = shapely.total_bounds(self.metric_geometries)
+        limit = np.hypot(x1 - x0, y1 - y0) + radius.max()
+        pending = np.arange(len(points))
+        found = [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))]
+        while len(pending):
+            which, edges = self._metric_tree.query(points[pending], predicate='dwithin',
+                                                   distance=radius[pending] + 2 * tolerance)
+            if usable is not None:
+                keep = usable[edges]
+                which, edges = which[keep], edges[keep]
+            distances = shapely.distance(self.metric_geometries[edges], points[pending[which]])
+            best = np.full(len(pending), np.inf)
+            np.minimum.at(best, which, distances)
+            keep = distances <= best[which] + tolerance
+            found.append((pending[which[keep]], edges[keep], distances[keep]))
+            pending = pending[~np.isfinite(best)]
+            radius[pending] *= 4
+            pending = pending[radius[pending] <= 4 * limit]
+        which, edges, distances = (np.concatenate(parts) for parts in zip(*found))
+        order = np.lexsort((edges, which))
+        which, edges, distances = which[order], edges[order], distances[order]
+        fractions = shapely.line_locate_point(self.metric_geometries[edges], points[which], normalized=True)
+        return which, edges, distances, np.nan_to_num(fractions)
+
+    def within(self, lon, lat, max_distance):
+        """(chỉ số cạnh, khoảng cách theo độ) của các cạnh cách điểm không quá max_distance,
+        sắp theo khoảng cách tăng dần."""
+        point = shapely.Point(lon, lat)
+        candidates = self.tree.query(point, predicate='dwithin', distance=max_distance)
+        distances = shapely.distance(self.geometries[candidates], point)
+        order = np.lexsort((candidates, distances))
+        return candidates[order], distances[order]
+
+    def intersecting(self, geometry):
+        """Chỉ số (tăng dần) các cạnh giao với geometry (vd. vùng tròn cấm)."""
+        return np.sort(self.tree.query(geometry, predicate='intersects'))
+
+    def nearest_roads(self, point, num_roads=20, max_distance=0.002, geometry_only=True):
+        """num_roads cạnh gần point=(lon, lat) nhất, dạng dict dùng cho danh sách gợi ý.
+
+        Mỗi phần tử có 'u', 'v', 'key', 'data', 'distance' (theo độ, như shapely).
+        geometry_only: chỉ lấy các cạnh có hình học riêng trong GraphML.
+        """
+        lon, lat = point
+        edges, distances = self.within(lon, lat, max_distance)
+        if geometry_only:
+            keep = self.graph.has_geometry[edges]
+            edges, distances = edges[keep], distances[keep]
+        nearest_edges = []
+        for e, distance in zip(edges[:num_roads].tolist(), distances[:num_roads].tolist()):
+            u, v, k = self.graph.edge_tuple(e)
+            nearest_edges.append({
+                'u': u,
+                'v': v,
+                'key': k,
+                'data': self.graph.edge_data(e),
+                'distance': distance
+            })
+        return nearest_edges
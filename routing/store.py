@@ -0,0 +1,110 @@
+"""Lưu RoadGraph ra đĩa dạng mảng phẳng (.npy) và mở lại bằng memory-map.
+
+Mỗi file GraphML có một thư mục cache riêng trong graph_cache/, bên trong là các
+thư mục con đặt tên theo phiên bản định dạng và SHA-1 của file nguồn:
+
+    graph_cache/giang_vo_ba_dinh/v2-<sha1[:16]>/meta.json, offsets.npy, ...
+
+Khi GraphML thay đổi, hash đổi nên cache được dựng lại vào thư mục mới; các
+tiến trình đang mở (memory-map) thư mục cũ không bị ghi đè. Nhiều tiến trình
+cùng map một file nên dùng chung trang bộ nhớ của hệ điều hành.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from routing.graph import RoadGraph
+
+# 2: thêm maxspeeds, lanes, oneway cho trọng số thời gian theo phương tiện
+FORMAT_VERSION = 2
+CACHE_ROOT = 'graph_cache'
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_dir_for(graphml_path, source_hash, cache_root=CACHE_ROOT):
+    stem = os.path.splitext(os.path.basename(graphml_path))[0]
+    return os.path.join(cache_root, stem, f"v{FORMAT_VERSION}-{source_hash[:16]}")
+
+
+def save_arrays(directory, arrays, meta):
+    """Ghi dict mảng NumPy (mỗi mảng một file .npy) và meta.json vào directory.
+
+    Ghi vào thư mục tạm rồi đổi tên để tiến trình khác không bao giờ thấy cache dở dang.
+    """
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(dict(meta, format=FORMAT_VERSION), f, ensure_ascii=False)
+        try:
+            os.rename(tmp, directory)
+        except OSError:
+            # Tiến trình khác đã dựng xong cùng cache này trước
+            if not os.path.exists(os.path.join(directory, 'meta.json')):
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_arrays(directory, names, mmap=True):
+    """Đọc lại (dict mảng, meta) đã ghi bởi save_arrays; mmap=True thì mảng là memory-map chỉ đọc."""
+    with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('format') != FORMAT_VERSION:
+        raise ValueError(f"Cache {directory} có định dạng {meta.get('format')}, cần {FORMAT_VERSION}")
+    mode = 'r' if mmap else None
+    arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in names}
+    return arrays, meta
+
+
+def save_road_graph(graph, directory, meta=None):
+    arrays = {attr: getattr(graph, attr) for attr in RoadGraph.ARRAYS}
+    meta = dict(meta or {}, crs=graph.crs, names=graph.names, highways=graph.highways)
+    save_arrays(directory, arrays, meta)
+
+
+def load_road_graph(directory, mmap=True):
+    """Mở RoadGraph đã lưu; các cấu trúc tiền xử lý khác được lưu trong thư mục con của nó."""
+    arrays, meta = load_arrays(directory, RoadGraph.ARRAYS, mmap)
+    graph = RoadGraph(arrays, meta['names'], meta['highways'], crs=meta['crs'])
+    graph.cache_dir = directory
+    return graph
+
+
+def _remove_stale(directory):
+    """Xóa các phiên bản cache cũ của cùng file nguồn (bỏ qua nếu đang bị dùng)."""
+    parent = os.path.dirname(directory)
+    for name in os.listdir(parent):
+        path = os.path.join(parent, name)
+        if path != directory and not name.startswith('.'):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_cached_graph(graphml_path, cache_root=CACHE_ROOT):
+    """Mở RoadGraph của graphml_path từ cache, dựng lại cache nếu file nguồn đã đổi.
+
+    Chỉ khi phải dựng lại mới cần parse GraphML bằng osmnx.
+    """
+    source_hash = file_sha1(graphml_path)
+    directory = cache_dir_for(graphml_path, source_hash, cache_root)
+    if not os.path.exists(os.path.join(directory, 'meta.json')):
+        import osmnx as ox
+        graph = RoadGraph.from_networkx(ox.load_graphml(graphml_path))
+        save_road_graph(graph, directory, meta={'source': os.path.basename(graphml_path),
+                                                'source_sha1': source_hash})
+        _remove_stale(directory)
+    return load_road_graph(directory)
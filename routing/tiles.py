@@ -0,0 +1,327 @@
+"""Graph cả thành phố chia thành các ô (tile) lưu riêng, chỉ nạp các ô mà truy vấn đi qua.
+
+Mỗi ô là một lưới tile_size độ theo lon/lat. Node thuộc ô chứa nó; cạnh thuộc ô
+của node nguồn. Mỗi ô được lưu như một RoadGraph riêng (cùng định dạng cache, xem
+routing.store) gồm node của ô, mọi cạnh đi ra từ chúng và các node biên ở ô khác
+mà các cạnh đó đi tới (chỉ có tọa độ, không có cạnh ra). Các ô được nối với nhau
+qua OSM ID của node: khi tìm kiếm mở rộng một node biên, node đó được mở rộng
+trong ô của chính nó (nạp nếu chưa có).
+
+    <thư mục>/meta.json, node_ids.npy, node_tiles.npy   (node OSM ID -> ô)
+    <thư mục>/<tx>_<ty>/                                  (RoadGraph của ô)
+
+TiledGraph giữ các ô đã nạp trong LRU giới hạn theo dung lượng; A* với heuristic
+haversine chỉ chạm các ô trong hành lang giữa điểm đầu và điểm cuối. Trong một truy
+vấn chỉ các ô còn node trong hàng đợi bị giữ lại, nên LRU bỏ được các ô frontier đã
+đi qua.
+
+build_tiles cần cả graph trong bộ nhớ (RoadGraph memory-map từ cache của GraphML), chỉ
+việc tìm đường mới nạp theo ô.
+
+Dựng tile từ một file GraphML (vd. cả Hà Nội, tải bằng osmnx.graph_from_place):
+    python -m routing.tiles giang_vo_ba_dinh.graphml --tile-size 0.005
+"""
+import argparse
+import heapq
+import math
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from itertools import count
+
+import numpy as np
+
+from routing.engine import Route, ban_mask
+from routing.graph import RoadGraph
+from routing.profiles import PROFILES
+from routing.search import haversine
+from routing.store import CACHE_ROOT, load_arrays, load_road_graph, save_arrays, save_road_graph
+
+DEFAULT_TILE_SIZE = 0.02        # độ, khoảng 2 km ở Hà Nội
+DEFAULT_MAX_BYTES = 256 << 20   # dung lượng tối đa các ô đang nạp
+
+INDEX_ARRAYS = ('node_ids', 'node_tiles')
+
+
+def _gather(offsets, idx):
+    """(offsets mới, chỉ số phần tử) khi ghép các đoạn offsets[i]:offsets[i + 1] với i trong idx."""
+    starts, ends = offsets[idx], offsets[idx + 1]
+    sizes = ends - starts
+    new_offsets = np.zeros(len(idx) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=new_offsets[1:])
+    positions = np.arange(new_offsets[-1]) - np.repeat(new_offsets[:-1] - starts, sizes)
+    return new_offsets, positions
+
+
+def _local_table(table, ids):
+    """(bảng con, chỉ số mới) chỉ giữ các phần tử của table được ids dùng tới (-1 giữ nguyên)."""
+    used = np.unique(ids[ids >= 0])
+    remap = np.full(len(table) + 1, -1, dtype=np.int32)
+    remap[used] = np.arange(len(used), dtype=np.int32)
+    return [table[i] for i in used.tolist()], remap[ids]
+
+
+def tile_graph(graph, own_nodes, edges):
+    """RoadGraph con gồm own_nodes, các cạnh edges (đi ra từ own_nodes) và các node đích của chúng."""
+    nodes = np.union1d(own_nodes, graph.targets[edges])
+    sources = np.searchsorted(nodes, graph.sources[edges]).astype(np.int32)
+    targets = np.searchsorted(nodes, graph.targets[edges]).astype(np.int32)
+    n = len(nodes)
+    osmid_offsets, osmid_pos = _gather(graph.osmid_offsets, edges)
+    geom_offsets, geom_pos = _gather(graph.geom_offsets, edges)
+    names, name_ids = _local_table(graph.names, graph.name_ids[edges])
+    highways, highway_ids = _local_table(graph.highways, graph.highway_ids[edges])
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+    rev_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(targets, minlength=n), out=rev_offsets[1:])
+    arrays = dict(
+        node_ids=graph.node_ids[nodes], x=graph.x[nodes], y=graph.y[nodes],
+        offsets=offsets, rev_offsets=rev_offsets,
+        rev_edges=np.argsort(targets, kind='stable').astype(np.int32),
+        sources=sources, targets=targets, keys=graph.keys[edges], lengths=graph.lengths[edges],
+        name_ids=name_ids, highway_ids=highway_ids,
+        osmid_offsets=osmid_offsets, osmids=graph.osmids[osmid_pos],
+        geom_offsets=geom_offsets, geom_x=graph.geom_x[geom_pos], geom_y=graph.geom_y[geom_pos],
+        has_geometry=graph.has_geometry[edges],
+        maxspeeds=graph.maxspeeds[edges], lanes=graph.lanes[edges], oneway=graph.oneway[edges],
+    )
+    return RoadGraph(arrays, names, highways, crs=graph.crs)
+
+
+def _tile_coords(x, y, origin, tile_size):
+    return (np.floor((np.asarray(x) - origin[0]) / tile_size).astype(np.int64),
+            np.floor((np.asarray(y) - origin[1]) / tile_size).astype(np.int64))
+
+
+def build_tiles(graph, directory, tile_size=DEFAULT_TILE_SIZE):
+    """Chia graph (RoadGraph) thành các ô tile_size độ và lưu vào directory (ghi đè). Trả về số ô.
+
+    Ghi vào thư mục tạm rồi đổi tên, như save_arrays.
+    """
+    origin = (float(np.min(graph.x)), float(np.min(graph.y)))
+    tx, ty = _tile_coords(graph.x, graph.y, origin, tile_size)
+    keys, node_tiles = np.unique(np.column_stack((tx, ty)), axis=0, return_inverse=True)
+    node_tiles = node_tiles.reshape(-1).astype(np.int32)
+    # Cạnh theo ô của node nguồn, giữ thứ tự cạnh trong mỗi ô (đã sắp theo node nguồn)
+    edge_tiles = node_tiles[graph.sources]
+    edge_order = np.argsort(edge_tiles, kind='stable')
+    edge_splits = np.searchsorted(edge_tiles[edge_order], np.arange(len(keys) + 1))
+    node_order = np.argsort(node_tiles, kind='stable')
+    node_splits = np.searchsorted(node_tiles[node_order], np.arange(len(keys) + 1))
+    names = [f"{kx}_{ky}" for kx, ky in keys.tolist()]
+    tmp = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    save_arrays(tmp, {'node_ids': graph.node_ids, 'node_tiles': node_tiles},
+                {'tile_size': tile_size, 'origin': origin, 'tiles': names})
+    for t, name in enumerate(names):
+        sub = tile_graph(graph, node_order[node_splits[t]:node_splits[t + 1]],
+                         edge_order[edge_splits[t]:edge_splits[t + 1]])
+        save_road_graph(sub, os.path.join(tmp, name))
+    shutil.rmtree(directory, ignore_errors=True)
+    os.rename(tmp, directory)
+    return len(keys)
+
+
+class TiledGraph:
+    """Graph chia ô: nạp ô theo nhu cầu, giữ tối đa max_bytes (LRU, bỏ ô dùng lâu nhất trước)."""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        arrays, meta = load_arrays(directory, INDEX_ARRAYS)
+        self.directory = directory
+        self.node_ids = arrays['node_ids']
+        self.node_tiles = arrays['node_tiles']
+        self.tile_size = meta['tile_size']
+        self.origin = tuple(meta['origin'])
+        self.tile_names = meta['tiles']
+        self._tile_lookup = {name: t for t, name in enumerate(self.tile_names)}
+        self._extent = None
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.loads = 0
+        self.evictions = 0
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def tile(self, t):
+        """RoadGraph của ô thứ t, nạp (memory-map) nếu chưa có."""
+        with self._lock:
+            graph = self._tiles.get(t)
+            if graph is not None:
+                self._tiles.move_to_end(t)
+                return graph
+            graph = load_road_graph(os.path.join(self.directory, self.tile_names[t]))
+            self._tiles[t] = graph
+            self.nbytes += graph.nbytes
+            self.loads += 1
+            # Luôn giữ ô vừa nạp kể cả khi riêng nó đã vượt giới hạn
+            while self.nbytes > self.max_bytes and len(self._tiles) > 1:
+                _, evicted = self._tiles.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+            return graph
+
+    def stats(self):
+        return {'tiles': len(self.tile_names), 'loaded': len(self._tiles), 'bytes': self.nbytes,
+                'loads': self.loads, 'evictions': self.evictions}
+
+    def node_tile(self, node_id):
+        """Chỉ số ô chứa node (OSM ID), None nếu không có."""
+        i = int(np.searchsorted(self.node_ids, node_id))
+        if i < len(self.node_ids) and self.node_ids[i] == node_id:
+            return int(self.node_tiles[i])
+        return None
+
+    def nearest_node(self, lat, lon):
+        """OSM ID node gần (lat, lon) nhất (cùng khoảng cách như RoadGraph.nearest_node), None nếu graph rỗng.
+
+        Xét các vòng ô quanh ô chứa điểm, từ trong ra ngoài; dừng khi vòng đã xét chắc chắn
+        phủ hết các điểm gần hơn node tốt nhất đã gặp.
+        """
+        tx, ty = _tile_coords(lon, lat, self.origin, self.tile_size)
+        scale = math.cos(math.radians(lat))
+        best, best_d2 = None, math.inf
+        for r in range(self._max_ring(tx, ty) + 1):
+            ring = [(tx + dx, ty + dy) for dx in range(-r, r + 1) for dy in range(-r, r + 1)
+                    if max(abs(dx), abs(dy)) == r]
+            for kx, ky in ring:
+                t = self._tile_lookup.get(f"{kx}_{ky}")
+                if t is None:
+                    continue
+                graph = self.tile(t)
+                # Bỏ các node biên (thuộc ô khác), chúng được xét ở ô của chính chúng
+                own = np.flatnonzero(self.node_tiles[np.searchsorted(self.node_ids, graph.node_ids)] == t)
+                if not len(own):
+                    continue
+                d2 = ((graph.x[own] - lon) * scale) ** 2 + (graph.y[own] - lat) ** 2
+                if d2.min() < best_d2:
+                    best, best_d2 = int(graph.node_ids[own[np.argmin(d2)]]), float(d2.min())
+            # Vòng r phủ mọi điểm cách điểm truy vấn không quá r ô (theo chiều ngắn hơn sau khi co lon)
+            if best is not None and math.sqrt(best_d2) <= r * self.tile_size * min(scale, 1.0):
+                break
+        return best
+
+    def _max_ring(self, tx, ty):
+        """Số vòng ô quanh (tx, ty) cần xét để phủ mọi ô của graph."""
+        if self._extent is None:
+            coords = np.array([name.split('_') for name in self.tile_names], dtype=np.int64).reshape(-1, 2)
+            self._extent = coords.min(axis=0), coords.max(axis=0)
+        lo, hi = self._extent
+        return int(max(tx - lo[0], hi[0] - tx, ty - lo[1], hi[1] - ty, 0))
+
+    def find_shortest_path(self, start_point, end_point, banned_edges=None, banned_osmids=None, profile=None,
+                           stats=None):
+        """Như routing.find_shortest_path trên graph chia ô (A*, nạp ô khi tìm kiếm đi tới).
+
+        Route.edges là danh sách (u, v, key) theo OSM ID vì chỉ số cạnh chỉ có nghĩa trong từng ô.
+        stats (dict, tùy chọn): 'expanded' (số node đã mở rộng), 'tiles' (số ô đã dùng).
+        """
+        source = self.nearest_node(*start_point)
+        target = self.nearest_node(*end_point)
+        if source is None or target is None:
+            return None
+        scale = 1.0 if profile is None else 3.6 / PROFILES[profile]['max_speed']
+        target_tile = self.tile(self.node_tile(target))
+        t_idx = target_tile.node_index(target)
+        lat_t, lon_t = float(target_tile.y[t_idx]), float(target_tile.x[t_idx])
+        # Ô đang có node chờ trong hàng đợi: (graph, memoryview offsets/targets/trọng số, mảng cấm, ô của
+        # từng node trong graph của ô). Ô không còn node chờ bị bỏ khỏi views để LRU giải phóng được nó
+        # ngay trong truy vấn; nếu frontier quay lại thì ô được lấy lại (nạp lại nếu đã bị bỏ).
+        views = {}
+        pending = {}  # ô -> số mục của ô trong hàng đợi
+        used = set()
+
+        def view(t):
+            entry = views.get(t)
+            if entry is None:
+                graph = self.tile(t)
+                used.add(t)
+                entry = views[t] = (graph, graph.adjacency[0], graph.adjacency[1], graph.weight_view(profile),
+                                    ban_mask(graph, banned_edges, banned_osmids),
+                                    self.node_tiles[np.searchsorted(self.node_ids, graph.node_ids)].tolist())
+            return entry
+
+        c = count()
+        source_tile = self.node_tile(source)
+        queue = [(0.0, next(c), source, 0.0, source_tile)]
+        pending[source_tile] = 1
+        dist = {source: 0.0}
+        pred = {source: None}  # node -> (ô, cạnh trong ô)
+        settled = set()
+        while queue:
+            _, _, node, d, t = heapq.heappop(queue)
+            pending[t] -= 1
+            if node not in settled:
+                settled.add(node)
+                if node == target:
+                    break
+                graph, offsets, targets, weights, banned, tiles = view(t)
+                i = graph.node_index(node)
+                node_ids, xs, ys = graph.node_ids, graph.x, graph.y
+                for e in range(offsets[i], offsets[i + 1]):
+                    if banned is not None and banned[e]:
+                        continue
+                    j = targets[e]
+                    nbr = int(node_ids[j])
+                    if nbr in settled:
+                        continue
+                    nd = d + weights[e]
+                    if nd < dist.get(nbr, math.inf):
+                        dist[nbr] = nd
+                        pred[nbr] = (t, e)
+                        h = haversine(float(ys[j]), float(xs[j]), lat_t, lon_t) * scale
+                        heapq.heappush(queue, (nd + h, next(c), nbr, nd, tiles[j]))
+                        pending[tiles[j]] = pending.get(tiles[j], 0) + 1
+            if not pending[t]:
+                views.pop(t, None)
+        if stats is not None:
+            stats['expanded'] = len(settled)
+            stats['tiles'] = len(used)
+        if target not in settled:
+            return None
+        nodes, edges, length = [target], [], 0.0
+        node = target
+        while pred[node] is not None:
+            t, e = pred[node]
+            graph = self.tile(t)
+            u, v, k = graph.edge_tuple(e)
+            edges.append((u, v, k))
+            length += float(graph.lengths[e])
+            nodes.append(u)
+            node = u
+        nodes.reverse()
+        edges.reverse()
+        return Route(nodes, edges, length, None if profile is None else float(dist[target]))
+
+    def route_coordinates(self, route):
+        """Tọa độ [lat, lon] dọc đường đi (theo hình học cạnh) của Route từ find_shortest_path."""
+        coords = []
+        for u, v, k in route.edges:
+            graph = self.tile(self.node_tile(u))
+            xy = graph.edge_coords(graph.edge_index(u, v, k))[:, ::-1].tolist()
+            coords.extend(xy if not coords else xy[1:])
+        return coords
+
+
+def tiles_dir_for(graphml_path, tile_size=DEFAULT_TILE_SIZE, cache_root=CACHE_ROOT):
+    stem = os.path.splitext(os.path.basename(graphml_path))[0]
+    return os.path.join(cache_root, 'tiles', f"{stem}-{tile_size:g}")
+
+
+def main():
+    from routing.store import load_cached_graph
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('graphml')
+    parser.add_argument('--tile-size', type=float, default=DEFAULT_TILE_SIZE, help='cạnh ô (độ)')
+    parser.add_argument('--out', help='thư mục tile (mặc định graph_cache/tiles/<tên>-<cạnh ô>)')
+    args = parser.parse_args()
+    out = args.out or tiles_dir_for(args.graphml, args.tile_size)
+    graph = load_cached_graph(args.graphml)
+    n_tiles = build_tiles(graph, out, args.tile_size)
+    print(f"{graph.n_nodes} node, {graph.n_edges} cạnh -> {n_tiles} ô trong {out}")
+
+
+if __name__ == '__main__':
+    main()
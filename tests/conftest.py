@@ -0,0 +1,23 @@
+import networkx as nx
+import pytest
+
+from routing.graph import RoadGraph
+
+
+@pytest.fixture
+def make_graph():
+    """Dựng RoadGraph nhỏ từ {node: (x, y)} (đơn vị 1e-3 độ quanh Hà Nội) và các cạnh một chiều.
+
+    Mỗi cạnh là (u, v, length) hoặc (u, v, length, thuộc tính); osmid mặc định theo thứ tự cạnh.
+    """
+    def build(nodes, edges):
+        G = nx.MultiDiGraph(crs='epsg:4326')
+        for node, (x, y) in nodes.items():
+            G.add_node(node, x=105.8 + x * 1e-3, y=21.0 + y * 1e-3)
+        for i, (u, v, length, *attrs) in enumerate(edges):
+            data = {'osmid': i + 1, 'length': length, 'highway': 'residential'}
+            data.update(*attrs)
+            G.add_edge(u, v, **data)
+        return RoadGraph.from_networkx(G)
+
+    return build
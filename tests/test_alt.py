@@ -0,0 +1,45 @@
+import numpy as np
+
+from routing.alt import BOUNDS_CACHE_SIZE, Landmarks, build_landmarks
+from routing.engine import route_between
+from routing.search import astar, haversine
+
+# Lưới 4 x 4, cạnh 150 m; hàng trên cùng là phố một chiều, node 15 chỉ có đường vào
+NODES = {r * 4 + c: (c, r) for r in range(4) for c in range(4)}
+PAIRS = [(u, u + 1) for u in NODES if u % 4 < 3] + [(u, u + 4) for u in NODES if u + 4 in NODES]
+EDGES = [edge for i, (u, v) in enumerate(PAIRS)
+         for edge in [(u, v, 150, {'osmid': i + 1})] + ([] if u >= 12 or v == 15 else [(v, u, 150, {'osmid': i + 1})])]
+
+
+def dense_bounds(landmarks, graph, target):
+    """Cận dưới tính thẳng trên mảng count x n, để so với lower_bounds."""
+    with np.errstate(invalid='ignore'):
+        forward = landmarks.from_landmarks[:, target, None] - landmarks.from_landmarks
+        backward = landmarks.to_landmarks - landmarks.to_landmarks[:, target, None]
+        bound = np.nan_to_num(np.maximum(forward, backward), nan=0.0, posinf=np.inf, neginf=0.0).max(axis=0)
+    geometric = [haversine(graph.y[v], graph.x[v], graph.y[target], graph.x[target]) for v in range(graph.n_nodes)]
+    return np.maximum(bound, geometric)
+
+
+def test_lower_bounds_and_cache(make_graph):
+    graph = make_graph(NODES, EDGES)
+    landmarks = Landmarks(graph, build_landmarks(graph, count=3))
+    assert np.isinf(landmarks.to_landmarks).any()  # node 15 không đi tới được landmark nào
+    for target in range(graph.n_nodes):
+        bounds = landmarks.lower_bounds(target)
+        assert np.allclose(bounds, dense_bounds(landmarks, graph, target))
+        h = landmarks.heuristic(target)
+        assert [h(v) for v in range(graph.n_nodes)] == bounds.tolist()
+    assert list(landmarks._bounds) == list(range(graph.n_nodes))[-BOUNDS_CACHE_SIZE:]
+
+
+def test_alt_route_matches_astar(make_graph):
+    graph = make_graph(NODES, EDGES)
+    for source in range(graph.n_nodes):
+        for target in range(graph.n_nodes):
+            route = route_between(graph, source, target, method='alt')
+            expected = astar(graph, source, target)
+            if expected is None:
+                assert route is None
+            else:
+                assert np.isclose(route.length, graph.lengths[expected].sum())
@@ -0,0 +1,49 @@
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+from routing.alternatives import _mark_plateau, alternative_routes, overlaps
+from routing.matrix import adjacency_matrix
+
+# 1 -> 2 -> 7 là đường ngắn nhất (10). Hai đường dài 12 cùng đi 6 -> 8 -> 7: qua 1 -> 5 -> 6 và
+# qua 1 -> 4 -> 3 -> 6. Cây xuôi tới 6 qua 5 (pf[6] = 5) nhưng cây ngược từ 3 đi sang 6 (pb[3] = 6).
+NODES = {1: (0, 0), 2: (1, 1), 3: (1, -2), 4: (0.5, -1.5), 5: (1, -1), 6: (2, -1), 7: (3, 0), 8: (2.5, -0.5)}
+EDGES = [(1, 2, 5), (2, 7, 5), (1, 5, 4), (5, 6, 2), (6, 8, 3), (8, 7, 3), (1, 4, 2), (4, 3, 2), (3, 6, 2)]
+
+
+def trees(graph, source, target):
+    matrix, _ = adjacency_matrix(graph, None, graph.weights(None))
+    _, pf = dijkstra(matrix, indices=source, return_predecessors=True)
+    _, pb = dijkstra(matrix.T.tocsr(), indices=target, return_predecessors=True)
+    return pf, pb
+
+
+def test_plateau_stops_at_edge_outside_forward_tree(make_graph):
+    graph = make_graph(NODES, EDGES)
+    index = {node: graph.node_index(node) for node in NODES}
+    pf, pb = trees(graph, index[1], index[7])
+    assert pf[index[6]] == index[5] and pb[index[3]] == index[6]
+    on_plateau = (pf >= 0) & (pb[np.maximum(pf, 0)] == np.arange(graph.n_nodes))
+    visited = np.zeros(graph.n_nodes, dtype=np.bool_)
+    _mark_plateau(pf, pb, on_plateau, visited, index[3], index[7])
+    # 3 -> 6 không thuộc cây xuôi nên 6 (và 8) nằm trên plateau của 5, không phải của 3
+    assert sorted(graph.node_ids[visited].tolist()) == [3, 4]
+
+
+def test_alternatives_through_shared_tail(make_graph):
+    graph = make_graph(NODES, EDGES)
+    stats = {}
+    routes = alternative_routes(graph, graph.node_index(1), graph.node_index(7), k=5, max_stretch=2, stats=stats)
+    assert [list(route.nodes) for route in routes] == [[1, 2, 7], [1, 4, 3, 6, 8, 7], [1, 5, 6, 8, 7]]
+    assert stats['candidates'] == 3
+
+
+def test_overlaps_by_shared_length(make_graph):
+    graph = make_graph(NODES, EDGES)
+    shortest, via_4, via_5 = alternative_routes(graph, graph.node_index(1), graph.node_index(7), k=5, max_stretch=2)
+    # Đường chính gắn điểm vào cạnh vẫn có cùng cạnh với đường ngắn nhất
+    snapped = shortest._replace(points=((21.0, 105.8), (21.0, 105.803)), fractions=(0.5, 0.5))
+    assert overlaps(graph, snapped, shortest)
+    assert not overlaps(graph, shortest, via_4)
+    # 6 -> 8 -> 7 chung dài 6, chưa tới 0.6 x 12
+    assert not overlaps(graph, via_4, via_5)
+    assert overlaps(graph, via_4, via_5, max_overlap=0.4)
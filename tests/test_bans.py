@@ -0,0 +1,65 @@
+import numpy as np
+
+from routing.bans import BanSet
+
+# Đường 1 -> 2 -> 3 -> 4; cạnh 2 -> 3 gộp hai way (10 và 20)
+NODES = {1: (0, 0), 2: (1, 0), 3: (2, 0), 4: (3, 0)}
+EDGES = [(1, 2, 100, {'osmid': 10}), (2, 3, 100, {'osmid': [10, 20]}), (3, 4, 100, {'osmid': 20})]
+
+
+def banned(bans):
+    return bans.edges.tolist()
+
+
+def test_overlapping_bans_are_refcounted(make_graph):
+    graph = make_graph(NODES, EDGES)
+    e12, e23, e34 = (graph.edge_index(u, v, 0) for u, v in ((1, 2), (2, 3), (3, 4)))
+    bans = BanSet(graph)
+    assert bans.add(banned_osmids=[10]).tolist() == [e12, e23]
+    # Cạnh 2 -> 3 đã bị cấm: chỉ 3 -> 4 đổi trạng thái
+    assert bans.add([(2, 3, 0)], [20]).tolist() == [e34]
+    assert banned(bans) == [e12, e23, e34] and len(bans) == 3
+    # Bỏ way 10: 2 -> 3 vẫn bị cấm bởi way 20 và lệnh cấm theo cạnh
+    assert bans.remove(banned_osmids=[10]).tolist() == [e12]
+    assert bans.remove(banned_osmids=[20]).tolist() == [e34]
+    assert e23 in bans and e12 not in bans
+    assert bans.remove([(2, 3, 0)]).tolist() == [e23]
+    assert len(bans) == 0 and not bans.mask.any()
+
+
+def test_removal_order_does_not_matter(make_graph):
+    graph = make_graph(NODES, EDGES)
+    for order in ([('edge', (2, 3, 0)), ('way', 10), ('way', 20)],
+                  [('way', 20), ('edge', (2, 3, 0)), ('way', 10)]):
+        bans = BanSet(graph, [(2, 3, 0)], [10, 20])
+        for kind, item in order:
+            if kind == 'edge':
+                bans.remove([item])
+            else:
+                bans.remove(banned_osmids=[item])
+        assert len(bans) == 0 and not bans._counts.any()
+
+
+def test_unknown_and_repeated_ids_are_ignored(make_graph):
+    graph = make_graph(NODES, EDGES)
+    bans = BanSet(graph, [(4, 1, 0)], [99, 'x'])
+    assert len(bans) == 0 and bans.osmids == {99}
+    assert bans.add(banned_osmids=[20]).size == 2
+    # Cấm lại cùng way không cộng thêm: một lần bỏ là mở lại
+    assert bans.add(banned_osmids=[20]).size == 0
+    assert bans.remove(banned_osmids=[20, 30]).size == 2
+    assert bans.remove([(1, 2, 0)], [10]).size == 0
+    assert len(bans) == 0
+
+
+def test_sync_returns_difference(make_graph):
+    graph = make_graph(NODES, EDGES)
+    e12, e23, e34 = (graph.edge_index(u, v, 0) for u, v in ((1, 2), (2, 3), (3, 4)))
+    bans = BanSet(graph, [(1, 2, 0)], [20])
+    fingerprint = bans.fingerprint()
+    added, removed = bans.sync([(2, 3, 0)], [10])
+    assert added.tolist() == [] and removed.tolist() == [e34]
+    assert banned(bans) == [e12, e23]
+    assert bans.fingerprint() != fingerprint
+    added, removed = bans.sync()
+    assert np.array_equal(removed, [e12, e23]) and added.size == 0
@@ -0,0 +1,39 @@
+import numpy as np
+
+from routing.dynamic import SnappedDynamicRoute
+from routing.engine import find_snapped_path
+
+# Lưới 3 x 3 đường hai chiều, cạnh 100 m; hai điểm nằm giữa cạnh 1-2 và cạnh 8-9
+NODES = {r * 3 + c + 1: (c, r) for r in range(3) for c in range(3)}
+PAIRS = [(1, 2), (2, 3), (4, 5), (5, 6), (7, 8), (8, 9), (1, 4), (4, 7), (2, 5), (5, 8), (3, 6), (6, 9)]
+EDGES = [edge for i, (u, v) in enumerate(PAIRS)
+         for edge in ((u, v, 100, {'osmid': i + 1}), (v, u, 100, {'osmid': i + 1}))]
+
+
+def point(graph, u, v):
+    return ((graph.y[graph.node_index(u)] + graph.y[graph.node_index(v)]) / 2,
+            (graph.x[graph.node_index(u)] + graph.x[graph.node_index(v)]) / 2)
+
+
+def test_snapped_planner_repairs_without_resnapping(make_graph):
+    graph = make_graph(NODES, EDGES)
+    start, end = point(graph, 1, 2), point(graph, 8, 9)
+    planner = SnappedDynamicRoute(graph, start, end)
+    banned = np.zeros(graph.n_edges, dtype=np.bool_)
+    stats = {}
+    route = planner.route(banned, stats)
+    assert stats['repair'] == 'initial'
+    snaps = planner.start, planner.end
+    # Cấm một cạnh giữa đường: điểm gắn giữ nguyên, đường được sửa bằng LPA*
+    u, v = route.nodes[:2]
+    banned[[graph.edge_index(u, v), graph.edge_index(v, u)]] = True
+    route = planner.route(banned, stats)
+    assert (planner.start, planner.end) == snaps
+    assert stats['repair'] == 'lpa'
+    reference = find_snapped_path(graph, start, end, {graph.edge_tuple(e) for e in np.flatnonzero(banned)})
+    assert np.isclose(route.length, reference.length)
+    # Cấm cạnh được gắn: điểm đầu gắn sang cạnh khác
+    banned[snaps[0].edges] = True
+    route = planner.route(banned, stats)
+    assert planner.start.edges != snaps[0].edges
+    assert not banned[route.edges].any()
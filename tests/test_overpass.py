@@ -0,0 +1,68 @@
+import json
+import os
+import socket
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from routing import overpass, overpass_stub
+
+NODES = {1: (0, 0), 2: (1, 0), 3: (2, 0), 4: (2, 1)}
+EDGES = [(1, 2, 100, {'osmid': 11, 'name': 'Phố Giảng Võ'}), (2, 3, 100, {'osmid': 12, 'name': 'Phố Giảng Võ'}),
+         (3, 4, 100, {'osmid': 21, 'name': 'Phố Kim Mã'}), (4, 1, 100, {'osmid': 31, 'name': 'Ngõ 46'})]
+ROADS = {'Ba Đình': {'Giảng Võ': {}, 'Kim Mã': {}, 'Đường xe đạp sông Tô Lịch': {}}}
+
+
+@pytest.fixture
+def stub(make_graph, monkeypatch):
+    """Server Overpass giả lập trên cổng tạm, trả về danh sách các truy vấn nó đã nhận."""
+    queries = []
+    handler = overpass_stub.make_handler(overpass_stub.graph_ways(make_graph(NODES, EDGES)))
+
+    class Recording(handler):
+        def _reply(self, query):
+            queries.append(query)
+            super()._reply(query)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Recording)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('OVERPASS_URL', f"http://127.0.0.1:{server.server_address[1]}/api/interpreter")
+    yield queries
+    server.shutdown()
+    server.server_close()
+
+
+def test_names_batched_and_indexed(stub, tmp_path, monkeypatch):
+    path = tmp_path / 'graph_cache' / 'osm_names.json'
+    replaced = []
+    real_replace = os.replace
+    monkeypatch.setattr(overpass.os, 'replace', lambda src, dst: (replaced.append((src, dst)), real_replace(src, dst)))
+    cache = {}
+    ids = overpass.ban_all_roads_get_ids(ROADS, cache, index=overpass.NameIndex(str(path)))
+    assert ids == {11, 12, 21}
+    assert len(stub) == 1
+    assert cache == {'Giảng Võ': {11, 12}, 'Kim Mã': {21}}
+    # Ghi vào file tạm cùng thư mục rồi đổi tên, không để lại file tạm
+    assert [os.path.dirname(src) for src, dst in replaced] == [str(path.parent)]
+    assert os.listdir(path.parent) == ['osm_names.json']
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    assert data['entries']['Hà Nội'] == {'Giảng Võ': [11, 12], 'Kim Mã': [21]}
+    # Lần sau đọc từ chỉ mục trên đĩa, không gọi lại Overpass
+    assert overpass.ban_all_roads_get_ids(ROADS, {}, index=overpass.NameIndex(str(path))) == ids
+    assert len(stub) == 1
+
+
+def test_falls_back_to_graph_names_when_server_down(make_graph, tmp_path, monkeypatch):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    monkeypatch.setenv('OVERPASS_URL', f"http://127.0.0.1:{port}/api/interpreter")
+    path = tmp_path / 'osm_names.json'
+    ids = overpass.ban_all_roads_get_ids(ROADS, {}, graph=make_graph(NODES, EDGES),
+                                         index=overpass.NameIndex(str(path)))
+    assert ids == {11, 12, 21}
+    # Kết quả khớp theo graph không được ghi vào chỉ mục
+    assert not path.exists()
@@ -0,0 +1,35 @@
+import numpy as np
+
+from routing.profiles import PROFILES, cache_suffix, travel_times
+
+NODES = {1: (0, 0), 2: (1, 0), 3: (2, 0)}
+EDGES = [(1, 2, 100, {'highway': 'footway'}), (2, 3, 100, {'highway': 'service'})]
+
+
+def test_motorbike_uses_footway_alleys(make_graph):
+    graph = make_graph(NODES, EDGES)
+    assert np.isfinite(travel_times(graph, 'motorbike')).all()
+    assert np.isinf(travel_times(graph, 'car')[graph.edge_index(1, 2)])
+
+
+def test_cache_suffix_follows_speed_table(make_graph, monkeypatch):
+    graph = make_graph(NODES, EDGES)
+    assert cache_suffix(graph, None) == ''
+    before = cache_suffix(graph, 'motorbike')
+    monkeypatch.setitem(PROFILES['motorbike']['speeds'], 'footway', 5)
+    assert cache_suffix(make_graph(NODES, EDGES), 'motorbike') != before
+
+
+def test_passable_mask_is_cached_and_used_by_snap(make_graph):
+    from routing.snap import snap_points
+
+    graph = make_graph(NODES, EDGES)
+    mask = graph.passable('car')
+    assert mask.tolist() == [False, True] and graph.passable('car') is mask
+    assert not mask.flags.writeable
+    # Điểm sát cạnh lối đi bộ 1 -> 2: ô tô gắn vào cạnh 2 -> 3, cấm cạnh đó thì không còn cạnh nào
+    point = (21.0, 105.8005)
+    assert snap_points(graph, [point], profile='car')[0].edges == [graph.edge_index(2, 3)]
+    banned = np.array([False, True])
+    assert snap_points(graph, [point], banned, profile='car') == [None]
+    assert graph.passable('car').tolist() == [False, True]
@@ -0,0 +1,66 @@
+import gc
+import json
+import logging
+import threading
+
+from routing import profiling
+from routing.profiling import Recorder, count, span, start_recording
+
+
+def test_spans_and_counters():
+    recorder = start_recording('test')
+    with span('outer'):
+        with span('inner'):
+            count('hits', 2)
+    record = recorder.finish()
+    assert [(s['name'], s['depth']) for s in record['spans']] == [('outer', 0), ('inner', 1)]
+    assert record['counters'] == {'hits': 2}
+    # Không còn ghi: span và count không làm gì
+    with span('ignored'):
+        count('hits')
+    assert recorder.counters == {'hits': 2}
+
+
+def test_second_concurrent_profiler_is_skipped(tmp_path):
+    first = Recorder('first', profiler='cprofile', dump_dir=str(tmp_path))
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(
+        record=Recorder('second', profiler='cprofile', dump_dir=str(tmp_path)).finish()))
+    thread.start()
+    thread.join()
+    assert result['record']['profile'] is None
+    assert result['record']['profile_error']
+    assert first.finish()['profile'].endswith('.prof')
+    # Profiler được nhả sau khi lần chạy đầu kết thúc
+    third = Recorder('third', profiler='cprofile', dump_dir=str(tmp_path))
+    third.abandon()
+    assert third.profile_error is None
+
+
+def test_finish_logs_json_record(caplog):
+    caplog.set_level(logging.INFO, logger='routing.profiling')
+    recorder = start_recording('logged')
+    count('hits')
+    record = recorder.finish()
+    logged = [json.loads(r.getMessage()) for r in caplog.records if r.name == 'routing.profiling']
+    assert logged == [record]
+
+
+def test_abandoned_recorder_releases_profiler(tmp_path):
+    Recorder('dropped', profiler='cprofile', dump_dir=str(tmp_path))
+    gc.collect()
+    recorder = Recorder('next', profiler='cprofile', dump_dir=str(tmp_path))
+    assert recorder.profile_error is None
+    recorder.abandon()
+
+
+def test_stale_profiler_is_taken_over(tmp_path, monkeypatch):
+    stale = Recorder('stale', profiler='cprofile', dump_dir=str(tmp_path))
+    monkeypatch.setattr(profiling, 'PROFILER_TIMEOUT', 0)
+    recorder = Recorder('next', profiler='cprofile', dump_dir=str(tmp_path))
+    assert recorder.profile_error is None
+    # Recorder cũ kết thúc sau đó không nhả lock của Recorder mới
+    assert stale.finish()['profile'].endswith('.prof')
+    assert profiling._profiler_lock.locked()
+    recorder.abandon()
+    assert not profiling._profiler_lock.locked()
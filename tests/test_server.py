@@ -0,0 +1,90 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+
+from routing.server import HANDLERS, HTTPError, dispatch, handle_connection, handle_isochrone
+
+NODES = {1: (0, 0), 2: (1, 0)}
+EDGES = [(1, 2, 100), (2, 1, 100)]
+
+
+@pytest.mark.parametrize('limit', ['nan', 'inf', float('-inf'), -1, 'abc', None])
+def test_isochrone_rejects_bad_limit(make_graph, limit):
+    graph = make_graph(NODES, EDGES)
+    with pytest.raises(HTTPError) as error:
+        handle_isochrone(graph, {}, {'center': [21.0, 105.8], 'limit': limit})
+    assert error.value.status == HTTPStatus.BAD_REQUEST
+
+
+def test_isochrone_accepts_zero_limit(make_graph):
+    graph = make_graph(NODES, EDGES)
+    result = handle_isochrone(graph, {}, {'center': [21.0, 105.8], 'limit': 0})
+    assert result['nodes'] == [1]
+
+
+@pytest.mark.parametrize('body', [
+    {'center': ['nan', 105.8], 'limit': 100},
+    {'center': [21.0, float('inf')], 'limit': 100},
+    {'center': [21.0, 105.8], 'limit': 100, 'circles': [{'lat': 21.0, 'lon': 105.8, 'radius': 'inf'}]},
+    {'center': [21.0, 105.8], 'limit': 100, 'circles': [{'lat': 21.0, 'lon': 105.8, 'radius': -5}]},
+    {'center': [21.0, 105.8], 'limit': 100, 'banned_osmids': [1.5e30]},
+    {'center': [21.0, 105.8], 'limit': 100, 'banned_osmids': [-1]},
+    {'center': [21.0, 105.8], 'limit': 100, 'banned_edges': [[1, 2, 1e300]]},
+])
+def test_non_finite_and_out_of_range_values_are_rejected(make_graph, body):
+    status, payload = dispatch(make_graph(NODES, EDGES), 'POST', '/isochrone', json.dumps(body).encode())
+    assert status == HTTPStatus.BAD_REQUEST and 'error' in payload
+
+
+def test_nearest_rejects_non_finite_point(make_graph):
+    status, _ = dispatch(make_graph(NODES, EDGES), 'GET', '/nearest?lat=nan&lon=105.8', b'')
+    assert status == HTTPStatus.BAD_REQUEST
+
+
+def test_unexpected_handler_error_returns_500(make_graph, monkeypatch):
+    def broken(graph, query, body):
+        raise RuntimeError("hỏng")
+
+    monkeypatch.setitem(HANDLERS, ('GET', '/health'), broken)
+    status, payload = dispatch(make_graph(NODES, EDGES), 'GET', '/health', b'')
+    assert status == HTTPStatus.INTERNAL_SERVER_ERROR and 'RuntimeError' in payload['error']
+
+
+def exchange(graph, raw):
+    """Gửi raw qua handle_connection, trả về toàn bộ byte nhận được."""
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        sent = bytearray()
+
+        class Writer:
+            def write(self, data):
+                sent.extend(data)
+
+            async def drain(self):
+                pass
+
+            def close(self):
+                pass
+
+        await handle_connection(graph, reader, Writer())
+        return bytes(sent)
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('raw', [
+    b'GARBAGE\r\n\r\n',
+    b'GET /health HTTP/1.1\r\nno-colon-header\r\n\r\n',
+    b'POST /route HTTP/1.1\r\nContent-Length: abc\r\n\r\n',
+])
+def test_malformed_request_gets_400(make_graph, raw):
+    assert exchange(make_graph(NODES, EDGES), raw).startswith(b'HTTP/1.1 400 ')
+
+
+def test_well_formed_request_served(make_graph):
+    reply = exchange(make_graph(NODES, EDGES), b'GET /health HTTP/1.1\r\nConnection: close\r\n\r\n')
+    assert reply.startswith(b'HTTP/1.1 200 ') and b'"status": "ok"' in reply
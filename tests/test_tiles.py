@@ -0,0 +1,93 @@
+import json
+import weakref
+
+import numpy as np
+import pytest
+
+from routing.search import astar
+from routing.server import TILED_HANDLERS, dispatch
+from routing.tiles import TiledGraph, build_tiles
+
+TILE_SIZE = 0.002  # 2 đơn vị lưới của make_graph
+
+
+def two_way(pairs, length=150):
+    return [edge for i, (u, v) in enumerate(pairs)
+            for edge in ((u, v, length, {'osmid': i + 1}), (v, u, length, {'osmid': i + 1}))]
+
+
+@pytest.fixture
+def grid(make_graph, tmp_path):
+    """Lưới 8 x 8 (16 ô) và thư mục tile của nó."""
+    size = 8
+    nodes = {r * size + c: (c, r) for r in range(size) for c in range(size)}
+    pairs = [(u, u + 1) for u in nodes if u % size + 1 < size] + [(u, u + size) for u in nodes if u + size in nodes]
+    graph = make_graph(nodes, two_way(pairs))
+    directory = str(tmp_path / 'tiles')
+    assert build_tiles(graph, directory, TILE_SIZE) == 16
+    return graph, directory
+
+
+def json_bytes(body):
+    return json.dumps(body).encode()
+
+
+def point(graph, node):
+    i = graph.node_index(node)
+    return float(graph.y[i]), float(graph.x[i])
+
+
+def test_route_across_tiles_matches_full_graph(grid):
+    graph, directory = grid
+    tiles = TiledGraph(directory)
+    for a, b in ((0, 63), (7, 56), (9, 30)):
+        stats = {}
+        route = tiles.find_shortest_path(point(graph, a), point(graph, b), stats=stats)
+        expected = astar(graph, graph.node_index(a), graph.node_index(b))
+        assert route.nodes[0] == a and route.nodes[-1] == b
+        assert np.isclose(route.length, graph.lengths[expected].sum())
+        assert stats['tiles'] > 1
+    # Cấm một way trên đường: đường mới tránh nó và không ngắn hơn
+    banned = {route.edges[0][:2]}
+    osmids = {graph.edge_osmid(graph.edge_index(u, v, 0)) for u, v in banned}
+    detour = tiles.find_shortest_path(point(graph, 9), point(graph, 30), banned_osmids=osmids)
+    assert not banned & {edge[:2] for edge in detour.edges}
+    assert detour.length >= route.length
+
+
+def test_eviction_during_query(make_graph, tmp_path):
+    # Đường thẳng qua 8 ô: frontier chỉ ở một ô nên các ô đã đi qua phải được giải phóng
+    nodes = {i: (i, 0) for i in range(16)}
+    graph = make_graph(nodes, two_way([(i, i + 1) for i in range(15)]))
+    directory = str(tmp_path / 'line')
+    assert build_tiles(graph, directory, TILE_SIZE) == 8
+    tiles = TiledGraph(directory, max_bytes=1)
+    alive = []
+    peak = []
+    load = tiles.tile
+
+    def tracked(t):
+        tile = load(t)
+        alive.append(weakref.ref(tile))
+        peak.append(len({id(ref()) for ref in alive if ref() is not None}))
+        return tile
+
+    tiles.tile = tracked
+    route = tiles.find_shortest_path(point(graph, 0), point(graph, 15))
+    assert route.nodes == list(range(16))
+    assert tiles.stats()['evictions'] >= 7
+    assert max(peak) <= 3
+
+
+def test_server_routes_on_tiles(grid):
+    graph, directory = grid
+    tiles = TiledGraph(directory)
+    body = {'start': list(point(graph, 0)), 'end': list(point(graph, 63))}
+    status, payload = dispatch(tiles, 'POST', '/route', json_bytes(body), TILED_HANDLERS)
+    assert status == 200 and payload['route']['nodes'][-1] == 63
+    status, _ = dispatch(tiles, 'POST', '/route', json_bytes({**body, 'circles': [{'lat': 21, 'lon': 105.8,
+                                                                                   'radius': 10}]}),
+                         TILED_HANDLERS)
+    assert status == 400
+    status, _ = dispatch(tiles, 'GET', '/nearest?lat=21&lon=105.8', b'', TILED_HANDLERS)
+    assert status == 404